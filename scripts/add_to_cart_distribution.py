@@ -1,21 +1,28 @@
-import pandas as pd
 import os
 
-def analyze_add_to_cart_distribution(event_log_path, report_dir):
+import duckdb_backend
+from event_store import load_event_log
+
+def analyze_add_to_cart_distribution(event_log_path, report_dir, time_range=None, backend='pandas'):
     """
     Analyze Add_to_Cart event distribution per session.
 
     Parameters:
     - event_log_path: Path to the event logs CSV file.
     - report_dir: Directory to save the analysis report.
+    - time_range: Optional (start, end) tuple; only events in [start, end) are counted.
+    - backend: 'pandas' or 'duckdb' (per-session counts in SQL; same results).
 
     Returns:
     - results: dict with textual summary and report file path.
     """
-    df = pd.read_csv(event_log_path)
+    if backend == 'duckdb':
+        cart_events = duckdb_backend.add_to_cart_counts(event_log_path, time_range)
+    else:
+        df = load_event_log(event_log_path, columns=['Session_ID', 'Event'], time_range=time_range, events=['Add_to_Cart'])
 
-    # Count Add_to_Cart events per session
-    cart_events = df[df['Event'] == 'Add_to_Cart'].groupby('Session_ID').size()
+        # Count Add_to_Cart events per session
+        cart_events = df[df['Event'] == 'Add_to_Cart'].groupby('Session_ID').size()
 
     # Summary statistics as string
     stats_str = cart_events.describe().to_string()
@@ -1,13 +1,52 @@
 import pandas as pd
+import os
 
-df = pd.read_csv('D:\\Major Project\\User behaviour analysis using server logs\\data\\processed_logs\\event_logs.csv')
-df['TimeStamp'] = pd.to_datetime(df['TimeStamp'])
+import duckdb_backend
+from event_store import load_event_log
 
-# Calculate session duration (minutes)
-session_duration = df.groupby('Session_ID')['TimeStamp'].agg(lambda x: (x.max() - x.min()).total_seconds() / 60)
-print(f"Average session duration: {session_duration.mean():.2f} minutes")
-print(f"Session duration stats:\n{session_duration.describe()}")
+def analyze_session_durations(event_log_path, report_dir, time_range=None, backend='pandas'):
+    """
+    Calculate session duration statistics.
 
-with open(r'D:\Major Project\User behaviour analysis using server logs\reports\additional_metrics.txt', 'a') as f:
-    f.write(f"\nAverage session duration: {session_duration.mean():.2f} minutes\n")
-    f.write(f"Session duration stats:\n{session_duration.describe().to_string()}\n")
\ No newline at end of file
+    Parameters:
+    - event_log_path: Path to the event logs CSV file or partitioned event store.
+    - report_dir: Directory to save the metrics report.
+    - time_range: Optional (start, end) tuple; only events in [start, end) are used.
+    - backend: 'pandas' or 'duckdb' (per-session aggregation in SQL; same results).
+
+    Returns:
+    - results: dict with textual summary and report file path.
+    """
+    if backend == 'duckdb':
+        session_duration = duckdb_backend.session_durations(event_log_path, time_range)
+    else:
+        df = load_event_log(event_log_path, columns=['Session_ID', 'TimeStamp'], time_range=time_range)
+        df['TimeStamp'] = pd.to_datetime(df['TimeStamp'])
+
+        # Calculate session duration (minutes)
+        session_duration = df.groupby('Session_ID')['TimeStamp'].agg(lambda x: (x.max() - x.min()).total_seconds() / 60)
+
+    summary = (
+        f"Average session duration: {session_duration.mean():.2f} minutes\n"
+        f"Session duration stats:\n{session_duration.describe().to_string()}\n"
+    )
+
+    os.makedirs(report_dir, exist_ok=True)
+    report_path = os.path.join(report_dir, "additional_metrics.txt")
+    with open(report_path, 'a') as f:
+        f.write("\n" + summary)
+
+    return {
+        "textual_data": {
+            "Session Duration Metrics": summary
+        },
+        "report_path": report_path
+    }
+
+
+if __name__ == "__main__":
+    result = analyze_session_durations(
+        'D:\\Major Project\\User behaviour analysis using server logs\\data\\processed_logs\\event_logs.csv',
+        r'D:\Major Project\User behaviour analysis using server logs\reports'
+    )
+    print(result["textual_data"]["Session Duration Metrics"])
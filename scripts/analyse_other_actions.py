@@ -4,17 +4,24 @@ from pathlib import Path
 import plotly.express as px
 import plotly.io as pio
 
-def reclassify_events(input_file, output_dir=r"D:\MAJOR PROJECT\User behaviour analysis using server logs\data\processed_logs", report_dir=r"D:\MAJOR PROJECT\User behaviour analysis using server logs\reports"):
+from instrumentation import instrumented, current_stage, track_stage, file_size
+
+@instrumented('reclassify_events')
+def reclassify_events(input_file, output_dir=r"D:\MAJOR PROJECT\User behaviour analysis using server logs\data\processed_logs", report_dir=r"D:\MAJOR PROJECT\User behaviour analysis using server logs\reports",
+                      in_memory=False, checkpoint=False):
     """
     Reclassify 'Other_Action' events into specific categories and generate a distribution chart.
     
     Args:
-        input_file (str): Path to the input CSV file (e.g., event_logs.csv).
+        input_file (str or pd.DataFrame): Path to the input CSV file (e.g., event_logs.csv), or the event log itself.
         output_dir (str): Directory to save the refined event logs.
         report_dir (str): Directory to save the report and visualization.
+        in_memory (bool): Return the refined DataFrame instead of a path (for the fused pipeline).
+        checkpoint (bool): In memory mode, still write event_logs_refined.csv.
     
     Returns:
-        tuple: (Path to event_logs_refined.csv, Path to refined_event_distribution.png)
+        tuple: (Path to event_logs_refined.csv, or the refined DataFrame when in_memory,
+                Path to refined_event_distribution.png)
     """
     # Ensure output directories exist
     Path(output_dir).mkdir(parents=True, exist_ok=True)
@@ -26,8 +33,12 @@ def reclassify_events(input_file, output_dir=r"D:\MAJOR PROJECT\User behaviour a
     table_file = Path(report_dir) / "refined_event_distribution.md"
     
     # Load event logs
-    df = pd.read_csv(input_file)
-    df['TimeStamp'] = pd.to_datetime(df['TimeStamp'])
+    from_frame = isinstance(input_file, pd.DataFrame)
+    with track_stage('load') as step:
+        df = input_file.copy() if from_frame else pd.read_csv(input_file)
+        df['TimeStamp'] = pd.to_datetime(df['TimeStamp'])
+        step.rows_out, step.bytes_read = len(df), 0 if from_frame else file_size(input_file)
+    bytes_read = step.bytes_read
     
     # Filter "Other_Action" events
     other_actions = df[df['Event'] == 'Other_Action'].copy()
@@ -49,8 +60,10 @@ def reclassify_events(input_file, output_dir=r"D:\MAJOR PROJECT\User behaviour a
         else:
             return 'Other_Action'
     
-    other_actions['Refined_Event'] = other_actions.apply(reclassify_event, axis=1)
-    df.loc[df['Event'] == 'Other_Action', 'Event'] = other_actions['Refined_Event']
+    with track_stage('classify') as step:
+        step.rows_in = len(other_actions)
+        other_actions['Refined_Event'] = other_actions.apply(reclassify_event, axis=1)
+        df.loc[df['Event'] == 'Other_Action', 'Event'] = other_actions['Refined_Event']
     
     # Calculate event distribution
     event_dist = df['Event'].value_counts().reset_index()
@@ -87,7 +100,14 @@ def reclassify_events(input_file, output_dir=r"D:\MAJOR PROJECT\User behaviour a
     )
     pio.write_image(fig, viz_file, format='png', width=800, height=max(400, len(event_dist) * 50))
     
-    # Save updated event logs
-    df.to_csv(output_file, index=False)
+    # Save updated event logs (optional checkpoint in memory mode)
+    write_output = not in_memory or checkpoint
+    if write_output:
+        with track_stage('save') as step:
+            df.to_csv(output_file, index=False)
+            step.rows_in, step.bytes_written = len(df), file_size(output_file)
+    stage = current_stage()
+    stage.rows_in = stage.rows_out = len(df)
+    stage.bytes_read, stage.bytes_written = bytes_read, file_size(output_file) if write_output else 0
     
-    return str(output_file), str(viz_file)
\ No newline at end of file
+    return (df if in_memory else str(output_file)), str(viz_file)
\ No newline at end of file
@@ -0,0 +1,74 @@
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+
+class ArtifactCache:
+    """
+    In-memory cache of report artifacts derived from files on disk.
+
+    Entries are keyed by the file's absolute path, modification time and size plus a
+    variant (e.g. the thumbnail size), so a regenerated file is picked up automatically
+    while unchanged ones are decoded only once. The least recently used entries are
+    evicted beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _file_key(path):
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+    def get(self, path, loader, variant=None):
+        """
+        Return `loader(path)`, computing it only if the file changed since the last call.
+
+        Args:
+            path (str): Source file of the artifact.
+            loader (callable): Builds the artifact from the path.
+            variant (hashable, optional): Distinguishes several artifacts of one file.
+        """
+        key = (self._file_key(path), variant)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        value = loader(path)
+        with self._lock:
+            # Drop stale versions of the same artifact
+            for stale in [k for k in self._entries if k[0][0] == key[0][0] and k[1] == variant]:
+                del self._entries[stale]
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def thumbnail(self, path, size=(800, 600)):
+        """Decoded image resized to `size` (PIL Image)."""
+        def load(p):
+            with Image.open(p) as img:
+                img.load()
+                # reducing_gap first shrinks by an integer factor, which is much faster on 300-dpi charts
+                return img.resize(size, Image.LANCZOS, reducing_gap=3.0)
+        return self.get(path, load, ('thumbnail', tuple(size)))
+
+    def text(self, path, encoding=None):
+        """Contents of a text file."""
+        def load(p):
+            with open(p, 'r', encoding=encoding) as f:
+                return f.read()
+        return self.get(path, load, ('text', encoding))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
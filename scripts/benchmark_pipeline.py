@@ -0,0 +1,340 @@
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from ingest import READERS
+from instrumentation import peak_rss_mb
+from synthetic_logs import generate_eclog
+
+STAGES = [
+    'preprocess_logs',
+    'sessionize_and_classify',
+    'reclassify_events',
+    'map_event_to_proposition',
+    'analyze_ltl_violations',
+    'analyze_ltl_conversion',
+]
+
+# Stages whose outputs another stage reads
+PREREQUISITES = {
+    'preprocess_logs': [],
+    'sessionize_and_classify': ['preprocess_logs'],
+    'reclassify_events': ['sessionize_and_classify'],
+    'map_event_to_proposition': ['reclassify_events'],
+    'analyze_ltl_violations': ['sessionize_and_classify'],
+    'analyze_ltl_conversion': ['sessionize_and_classify'],
+}
+
+
+def _required_stages(stages):
+    required = set()
+    pending = list(stages)
+    while pending:
+        stage = pending.pop()
+        if stage not in required:
+            required.add(stage)
+            pending.extend(PREREQUISITES[stage])
+    return [stage for stage in STAGES if stage in required]
+
+
+# Key under which a stage's output path is passed on to later stages
+OUTPUT_KEYS = {
+    'preprocess_logs': 'processed',
+    'sessionize_and_classify': 'events',
+    'reclassify_events': 'refined',
+}
+
+
+def _run_stage(stage, config, outputs):
+    """
+    Run one pipeline stage on the outputs of the earlier ones.
+
+    A module-level function (wrapped in functools.partial by `_stage_functions`), so a stage
+    can be sent to a separate process by `measure`. Heavy plotting modules are imported here
+    so a missing optional dependency only fails that stage.
+    """
+    processed_dir, report_dir, reader = config['processed_dir'], config['report_dir'], config['reader']
+    if stage == 'preprocess_logs':
+        import preprocess_data
+        output, _ = preprocess_data.preprocess_logs(config['raw_file'], processed_dir, chunksize=config['chunksize'], reader=reader)
+    elif stage == 'sessionize_and_classify':
+        import transform_to_events
+        output = transform_to_events.sessionize_and_classify(outputs['processed'], processed_dir, reader=reader)
+    elif stage == 'reclassify_events':
+        import analyse_other_actions
+        output, _ = analyse_other_actions.reclassify_events(outputs['events'], processed_dir, report_dir)
+    elif stage == 'map_event_to_proposition':
+        import event_mapping
+        output = event_mapping.map_event_to_proposition(outputs['refined'], processed_dir, report_dir, use_refined=True)[0]
+    elif stage == 'analyze_ltl_violations':
+        import ltl_analysis
+        ltl_analysis.analyze_ltl_violations(outputs.get('refined', outputs.get('events')), report_dir, reader=reader)
+        output = None
+    elif stage == 'analyze_ltl_conversion':
+        import ltl_conversion_analysis
+        ltl_conversion_analysis.analyze_ltl_conversion(outputs.get('refined', outputs.get('events')), report_dir, reader=reader)
+        output = None
+    else:
+        raise ValueError(f"Unknown stage: {stage}")
+    if stage in OUTPUT_KEYS:
+        outputs[OUTPUT_KEYS[stage]] = output
+    return output
+
+
+def _stage_functions(workdir, raw_file, chunksize, reader='pandas', outputs=None):
+    """
+    Build the pipeline stages; each stage reads the earlier stages' outputs from `outputs`.
+
+    Returns:
+        dict: Stage name -> picklable callable. Run in-process, a stage records its output in
+            `outputs` itself; after running one elsewhere, store its output under OUTPUT_KEYS.
+    """
+    outputs = {} if outputs is None else outputs
+    config = {
+        'processed_dir': os.path.join(workdir, 'processed_logs'),
+        'report_dir': os.path.join(workdir, 'reports'),
+        'raw_file': raw_file,
+        'chunksize': chunksize,
+        'reader': reader,
+    }
+    os.makedirs(config['report_dir'], exist_ok=True)
+    return {stage: functools.partial(_run_stage, stage, config, outputs) for stage in STAGES}
+
+
+def _timed(func):
+    """Run a function, returning its wall and CPU time, the process's peak RSS and its output or error."""
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    output, error = None, None
+    try:
+        output = func()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return {'seconds': time.perf_counter() - wall_start, 'cpu_seconds': time.process_time() - cpu_start,
+            'peak_mb': peak_rss_mb(), 'output': output, 'error': error}
+
+
+def measure(func, track_memory=True):
+    """
+    Run a function and measure it.
+
+    With `track_memory` the function runs in a fresh worker process and peak_mb is that
+    process's peak resident set size. This includes memory allocated natively by pyarrow
+    or DuckDB, and no allocation tracing slows the timed code. A fresh process per call
+    keeps one stage's peak from showing up in the next one's. The function must be
+    picklable, e.g. a functools.partial of a module-level function.
+
+    Returns:
+        dict: seconds (wall), cpu_seconds, peak_mb (peak RSS in MB including the interpreter
+            and imports, None when not tracked or unavailable), output (return value) and
+            error (message or None).
+    """
+    if not track_memory:
+        return {**_timed(func), 'peak_mb': None}
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            return executor.submit(_timed, func).result()
+    except Exception as e:
+        # The worker died (e.g. killed when out of memory) or the function could not be sent to it
+        return {'seconds': None, 'cpu_seconds': None, 'peak_mb': None, 'output': None, 'error': f"{type(e).__name__}: {e}"}
+
+
+def run_benchmarks(sizes, workdir, stages=None, seed=0, chunksize=1_000_000, track_memory=True, log=print, readers=('pandas',)):
+    """
+    Time every pipeline stage on synthetic logs of each size.
+
+    Args:
+        sizes (list): Raw row counts to benchmark (e.g. [10**5, 10**6]).
+        workdir (str): Directory for generated inputs and stage outputs.
+        stages (list, optional): Subset of STAGES to run; all by default.
+        seed (int): Seed for the synthetic log generator.
+        chunksize (int): Chunk size for generation and chunked preprocessing.
+        track_memory (bool): Whether to run each stage in its own process and report its peak RSS.
+        readers (list): CSV reader backends to run the stages with ('pandas', 'pyarrow').
+
+    Returns:
+        list: One result dict per (size, reader, stage).
+    """
+    stages = stages or STAGES
+    os.makedirs(workdir, exist_ok=True)
+    results = []
+    for rows in sizes:
+        rows = int(rows)
+        raw_file = os.path.join(workdir, f"eclog_{rows}_seed{seed}.csv")
+        if not os.path.isfile(raw_file):
+            log(f"Generating {rows} synthetic rows -> {raw_file}")
+            generate_eclog(raw_file, rows, seed=seed, chunksize=chunksize)
+
+        for reader in readers:
+            size_dir = os.path.join(workdir, f"rows_{rows}", reader)
+            os.makedirs(size_dir, exist_ok=True)
+            outputs = {}
+            functions = _stage_functions(size_dir, raw_file, chunksize, reader, outputs)
+            failed = set()
+            for stage in _required_stages(stages):
+                if failed & set(PREREQUISITES[stage]):
+                    failed.add(stage)
+                    continue
+                measured = measure(functions[stage], track_memory)
+                output = measured.pop('output')
+                if stage in OUTPUT_KEYS and not measured['error']:
+                    outputs[OUTPUT_KEYS[stage]] = output
+                result = {
+                    'stage': stage,
+                    'rows': rows,
+                    'reader': reader,
+                    **measured,
+                    'output_bytes': os.path.getsize(output) if output and os.path.isfile(output) else None,
+                }
+                if stage in stages:
+                    results.append(result)
+                    peak = f", peak {result['peak_mb']:.1f} MB" if result['peak_mb'] is not None else ""
+                    seconds = f"{result['seconds']:.2f}s" if result['seconds'] is not None else "failed"
+                    log(f"{stage} @ {rows} rows ({reader}): {seconds}{peak}" + (f" [{result['error']}]" if result['error'] else ""))
+                if result['error']:
+                    failed.add(stage)
+    return results
+
+
+def resample_event_log(source_file, rows, output_file, seed=0, chunksize=1_000_000):
+    """Write an event log of `rows` rows drawn with replacement from `source_file`, chunk by chunk."""
+    import numpy as np
+    import pandas as pd
+    source = pd.read_csv(source_file)
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, chunksize):
+        sample = source.iloc[rng.integers(0, len(source), min(chunksize, rows - start))]
+        sample.to_csv(output_file, index=False, mode='w' if start == 0 else 'a', header=(start == 0))
+    return output_file
+
+
+def _map_event_log(event_file, size_dir):
+    """Map a resampled event log to propositions, returning the mapping table's path."""
+    import event_mapping
+    return event_mapping.map_event_to_proposition(event_file, size_dir, os.path.join(size_dir, 'reports'), use_refined=True)[1]
+
+
+def run_mapping_benchmarks(event_rows, workdir, seed=0, chunksize=1_000_000, track_memory=True, log=print, base_rows=100_000):
+    """
+    Time map_event_to_proposition on event logs of the given sizes.
+
+    The refined event log of a small synthetic run is resampled to each size, so the
+    mapping-table aggregation can be measured at e.g. 10M events without first
+    generating and sessionizing the tens of millions of raw rows behind them.
+
+    Returns:
+        list: One result dict per size, with stage 'map_event_to_proposition' and reader 'event_log'.
+    """
+    os.makedirs(workdir, exist_ok=True)
+    raw_file = os.path.join(workdir, f"eclog_{base_rows}_seed{seed}.csv")
+    if not os.path.isfile(raw_file):
+        generate_eclog(raw_file, base_rows, seed=seed, chunksize=chunksize)
+    base_dir = os.path.join(workdir, f"rows_{base_rows}", 'pandas')
+    functions = _stage_functions(base_dir, raw_file, chunksize)
+    functions['preprocess_logs']()
+    functions['sessionize_and_classify']()
+    refined = functions['reclassify_events']()
+
+    results = []
+    for rows in event_rows:
+        rows = int(rows)
+        size_dir = os.path.join(workdir, f"events_{rows}")
+        os.makedirs(size_dir, exist_ok=True)
+        event_file = os.path.join(size_dir, "event_logs_refined.csv")
+        if not os.path.isfile(event_file):
+            log(f"Resampling {rows} events -> {event_file}")
+            resample_event_log(refined, rows, event_file, seed=seed, chunksize=chunksize)
+        measured = measure(functools.partial(_map_event_log, event_file, size_dir), track_memory)
+        output = measured.pop('output')
+        result = {'stage': 'map_event_to_proposition', 'rows': rows, 'reader': 'event_log', **measured,
+                  'output_bytes': os.path.getsize(output) if output and os.path.isfile(output) else None}
+        results.append(result)
+        peak = f", peak {result['peak_mb']:.1f} MB" if result['peak_mb'] is not None else ""
+        seconds = f"{result['seconds']:.2f}s" if result['seconds'] is not None else "failed"
+        log(f"map_event_to_proposition @ {rows} events: {seconds}{peak}" + (f" [{result['error']}]" if result['error'] else ""))
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance=0.2, min_seconds=0.05):
+    """
+    Flag stages that got slower or use more memory than the stored baseline.
+
+    A regression needs to exceed the baseline by more than `tolerance` (relative) and,
+    for time, by more than `min_seconds` so that tiny stages don't flap.
+
+    Returns:
+        list: Regression descriptions (empty when everything is within tolerance).
+    """
+    def key(r):
+        return r['stage'], r['rows'], r.get('reader', 'pandas')
+
+    reference = {key(r): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        base = reference.get(key(result))
+        if base is None or result['error'] or base.get('seconds') is None:
+            continue
+        if result['seconds'] > base['seconds'] * (1 + tolerance) and result['seconds'] - base['seconds'] > min_seconds:
+            regressions.append(f"{result['stage']} @ {result['rows']} rows ({result['reader']}): {result['seconds']:.2f}s vs baseline {base['seconds']:.2f}s")
+        if result['peak_mb'] is not None and base.get('peak_mb') is not None and result['peak_mb'] > base['peak_mb'] * (1 + tolerance):
+            regressions.append(f"{result['stage']} @ {result['rows']} rows ({result['reader']}): peak {result['peak_mb']:.1f} MB vs baseline {base['peak_mb']:.1f} MB")
+    return regressions
+
+
+def write_results(results, output_file):
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    with open(output_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    return output_file
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the log analysis pipeline on synthetic eclog data.")
+    parser.add_argument("--sizes", type=float, nargs='+', default=[1e5], help="Raw row counts, e.g. 1e5 1e6 1e7")
+    parser.add_argument("--stages", nargs='+', choices=STAGES, default=None)
+    parser.add_argument("--workdir", default="benchmark_data")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="Baseline results JSON to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunksize", type=int, default=1_000_000)
+    parser.add_argument("--no-memory", action="store_true", help="Run stages in-process without measuring peak RSS")
+    parser.add_argument("--readers", nargs='+', choices=READERS, default=['pandas'], help="CSV reader backends to compare")
+    parser.add_argument("--mapping-rows", type=float, nargs='+', default=[],
+                        help="Also time event mapping on resampled event logs of these sizes, e.g. 1e7")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.workdir, args.stages, args.seed, args.chunksize, not args.no_memory,
+                             readers=args.readers)
+    if args.mapping_rows:
+        results += run_mapping_benchmarks(args.mapping_rows, args.workdir, args.seed, args.chunksize, not args.no_memory)
+    write_results(results, args.output)
+    print(f"Results written to {args.output}")
+
+    if args.baseline and args.update_baseline:
+        write_results(results, args.baseline)
+        print(f"Baseline updated at {args.baseline}")
+    elif args.baseline and os.path.isfile(args.baseline):
+        with open(args.baseline, 'r') as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+
+NO_TIME = np.iinfo(np.int64).min
+
+# Order in which the checks are reported when an IP trips several of them
+FLAG_REASONS = ('rate', 'fast', 'regular')
+
+
+def window_counts(codes, times, window_ns):
+    """
+    Requests of the same key in the trailing window (t - window, t] of every row.
+
+    Rows must be sorted by (codes, times). Timestamps are replaced by their rank among the
+    distinct timestamps so that (code, rank) packs into one sorted int64 key without
+    overflow, and each row's window start is found with a single searchsorted.
+
+    Args:
+        codes (np.ndarray): Integer key (e.g. factorized IP) of each row.
+        times (np.ndarray): int64 nanosecond timestamps.
+        window_ns (int): Window length in nanoseconds.
+
+    Returns:
+        np.ndarray: int64 count for each row, the row itself included.
+    """
+    if len(times) == 0:
+        return np.zeros(0, dtype=np.int64)
+    distinct = np.unique(times)
+    rank = np.searchsorted(distinct, times)
+    start_rank = np.searchsorted(distinct, times - window_ns, side='right')
+    base = codes.astype(np.int64) * (len(distinct) + 1)
+    start = np.searchsorted(base + rank, base + start_rank, side='left')
+    return np.arange(len(times), dtype=np.int64) - start + 1
+
+
+class RequestRateDetector:
+    """
+    Flags IPs whose request pattern looks automated, independently of their User_Agent.
+
+    Feed it the cleaned chunks in (roughly) time order with `update`; a request older than its
+    IP's last one counts as a request but adds no gap. Per chunk the rows are
+    sorted by IP and time and, fully vectorized, it computes each request's count within
+    the trailing `window` and the gap to the IP's previous request. Across chunks each IP
+    keeps a fixed-size summary (request and gap totals, peak window count, last timestamp)
+    plus its requests still inside the window, at most `max_requests` of them, so the state
+    does not grow with the length of the log. IPs idle for `idle_timeout` are forgotten.
+
+    An IP is flagged when
+        'rate':    more than `max_requests` requests fall in one `window`;
+        'fast':    after `min_requests` requests, the mean gap is below `min_mean_gap` seconds;
+        'regular': after `min_requests` requests, the gaps' coefficient of variation is below
+                   `max_gap_cv` (clockwork polling; None disables the check).
+
+    Once flagged, the IP's rows are dropped from the chunk it was flagged in onwards;
+    requests in earlier chunks have already been passed on.
+    """
+
+    def __init__(self, window=60, max_requests=60, min_requests=50, min_mean_gap=2.0, max_gap_cv=0.1,
+                 idle_timeout=3600, ip_column='IP'):
+        self.window_ns = int(window * 1e9)
+        self.max_requests = max_requests
+        self.min_requests = min_requests
+        self.min_mean_gap = min_mean_gap
+        self.max_gap_cv = max_gap_cv
+        self.idle_ns = int(idle_timeout * 1e9) if idle_timeout else None
+        self.ip_column = ip_column
+        self.flagged = {}
+        self._ips = pd.Index([])
+        self._state = {
+            'requests': np.zeros(0, dtype=np.int64),
+            'gaps': np.zeros(0, dtype=np.int64),
+            'gap_sum': np.zeros(0),
+            'gap_sq': np.zeros(0),
+            'peak': np.zeros(0, dtype=np.int64),
+            'last': np.zeros(0, dtype=np.int64),
+        }
+        self._recent_ips = np.zeros(0, dtype=object)
+        self._recent_times = np.zeros(0, dtype=np.int64)
+        self._newest = NO_TIME
+
+    def _slots(self, ips):
+        """State positions of `ips`, adding fresh entries for unseen ones."""
+        slots = self._ips.get_indexer(ips)
+        missing = slots < 0
+        if missing.any():
+            n = int(missing.sum())
+            slots[missing] = np.arange(len(self._ips), len(self._ips) + n)
+            self._ips = self._ips.append(pd.Index(ips[missing]))
+            for key, values in self._state.items():
+                fill = NO_TIME if key == 'last' else 0
+                self._state[key] = np.concatenate([values, np.full(n, fill, dtype=values.dtype)])
+        return slots
+
+    def update(self, df):
+        """
+        Add a chunk of requests and flag IPs that crossed a threshold.
+
+        Args:
+            df (pd.DataFrame): Requests with the IP column and a datetime TimeStamp column.
+
+        Returns:
+            np.ndarray: Boolean mask of the rows to keep (IP not flagged).
+        """
+        ips = df[self.ip_column].to_numpy(dtype=object)
+        active = ~df[self.ip_column].isin(list(self.flagged)).to_numpy()
+        if not active.any():
+            return active
+        times = pd.DatetimeIndex(df['TimeStamp']).as_unit('ns').asi8[active]
+
+        # The IPs' requests still in the window from earlier chunks go in front, so that
+        # they sort before the new ones and only contribute to counts and gaps
+        all_ips = np.concatenate([self._recent_ips, ips[active]])
+        all_times = np.concatenate([self._recent_times, times])
+        is_new = np.concatenate([np.zeros(len(self._recent_times), dtype=bool), np.ones(len(times), dtype=bool)])
+        codes, uniques = pd.factorize(all_ips)
+        order = np.lexsort((all_times, codes))
+        codes, all_times, is_new = codes[order], all_times[order], is_new[order]
+
+        counts = window_counts(codes, all_times, self.window_ns)
+        same_ip = np.r_[False, codes[1:] == codes[:-1]]
+        starts = np.flatnonzero(~same_ip)
+
+        slots = self._slots(np.asarray(uniques, dtype=object))
+        state = self._state
+        # Gap to the previous request of the IP, from this chunk, the carried rows or its last timestamp
+        previous = np.r_[NO_TIME, all_times[:-1]]
+        first_last = state['last'][slots][codes]
+        previous = np.where(same_ip, previous, first_last)
+        # A chunk older than the IP's last request (out-of-order multi-file ingest) would give a
+        # negative gap that drags the mean under min_mean_gap; its true gap is unknown, so skip it
+        has_gap = is_new & (previous != NO_TIME) & (all_times >= previous)
+        gaps = np.where(has_gap, (all_times - previous) / 1e9, 0.0)
+
+        n_ips = len(uniques)
+        state['requests'][slots] += np.bincount(codes, weights=is_new, minlength=n_ips).astype(np.int64)
+        state['gaps'][slots] += np.bincount(codes, weights=has_gap, minlength=n_ips).astype(np.int64)
+        state['gap_sum'][slots] += np.bincount(codes, weights=gaps, minlength=n_ips)
+        state['gap_sq'][slots] += np.bincount(codes, weights=gaps ** 2, minlength=n_ips)
+        state['peak'][slots] = np.maximum(state['peak'][slots], np.maximum.reduceat(np.where(is_new, counts, 0), starts))
+        state['last'][slots] = np.maximum(state['last'][slots], np.maximum.reduceat(all_times, starts))
+        self._newest = max(self._newest, int(all_times.max()))
+
+        reasons = self._reasons(slots)
+        flagged_now = reasons != ''
+        self.flagged.update(zip(uniques[flagged_now], reasons[flagged_now]))
+
+        # Carry the unflagged IPs' requests that can still share a window with later ones
+        keep = ~flagged_now[codes] & (all_times > self._newest - self.window_ns)
+        self._recent_ips = np.asarray(uniques, dtype=object)[codes[keep]]
+        self._recent_times = all_times[keep]
+        self._evict_idle()
+
+        return ~df[self.ip_column].isin(list(self.flagged)).to_numpy()
+
+    def _statistics(self, slots):
+        """Mean gap (seconds) and gap coefficient of variation of the given state slots."""
+        state = self._state
+        n = state['gaps'][slots]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = state['gap_sum'][slots] / n
+            variance = np.maximum(state['gap_sq'][slots] / n - mean ** 2, 0.0)
+            cv = np.sqrt(variance) / mean
+        return mean, cv
+
+    def _reasons(self, slots):
+        """First threshold each IP trips, or '' for none."""
+        state = self._state
+        mean, cv = self._statistics(slots)
+        enough = state['requests'][slots] >= self.min_requests
+        checks = {
+            'rate': state['peak'][slots] > self.max_requests,
+            'fast': enough & (mean < self.min_mean_gap),
+            'regular': (enough & (cv < self.max_gap_cv)) if self.max_gap_cv is not None else np.zeros(len(slots), dtype=bool),
+        }
+        reasons = np.full(len(slots), '', dtype=object)
+        for reason in reversed(FLAG_REASONS):
+            reasons[checks[reason]] = reason
+        return reasons
+
+    def _evict_idle(self):
+        """Forget unflagged IPs that have not made a request for idle_timeout."""
+        if self.idle_ns is None:
+            return
+        idle = (self._state['last'] < self._newest - self.idle_ns) & ~self._ips.isin(list(self.flagged))
+        if idle.any():
+            self._ips = self._ips[~idle]
+            for key, values in self._state.items():
+                self._state[key] = values[~idle]
+
+    def report(self):
+        """
+        Flagged IPs with their request statistics at the end of the run.
+
+        Returns:
+            pd.DataFrame: IP, reason, requests, peak_requests_per_window, mean_gap_seconds and
+                gap_cv, most requests first.
+        """
+        slots = self._ips.get_indexer(list(self.flagged))
+        mean, cv = self._statistics(slots)
+        report = pd.DataFrame({
+            'IP': list(self.flagged),
+            'reason': list(self.flagged.values()),
+            'requests': self._state['requests'][slots],
+            'peak_requests_per_window': self._state['peak'][slots],
+            'mean_gap_seconds': mean,
+            'gap_cv': cv,
+        })
+        return report.sort_values(['requests', 'IP'], ascending=[False, True], ignore_index=True)
@@ -0,0 +1,225 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pathlib import Path
+
+from event_store import is_partitioned_store, parse_time_range, select_partitions
+from ingest import EVENT_LOG_DTYPES
+from request_filters import STATIC_EXTENSIONS
+
+BACKENDS = ('pandas', 'duckdb')
+
+# Columns of the event log written by sessionize_and_classify, in order
+EVENT_LOG_COLUMNS = ['Session_ID', 'IP', 'TimeStamp', 'Event', 'Page_URL', 'Method', 'Response', 'Bytes_Sent', 'Referrer_URL', 'User_Agent']
+
+
+def connect(threads=None, memory_limit=None, temp_directory=None):
+    """
+    Open an in-memory DuckDB connection.
+
+    Args:
+        threads (int, optional): Worker threads; all cores by default.
+        memory_limit (str, optional): e.g. '4GB'; larger intermediates spill to `temp_directory`.
+        temp_directory (str, optional): Where out-of-core operators spill.
+    """
+    import duckdb
+    config = {}
+    if threads:
+        config['threads'] = int(threads)
+    if memory_limit:
+        config['memory_limit'] = str(memory_limit)
+    if temp_directory:
+        config['temp_directory'] = str(temp_directory)
+    return duckdb.connect(config=config)
+
+
+def _quote(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def register_source(con, source, columns, name='events', time_range=None, events=None):
+    """
+    Expose an event log or processed log as the view `name`.
+
+    The view has the requested columns, TimeStamp as a UTC TIMESTAMP_NS (full nanosecond
+    precision, as in pandas), the original TimeStamp text as `_ts_text` for CSV sources,
+    and `_row`, the row's position in the source, for order-sensitive window functions.
+
+    Args:
+        con: DuckDB connection.
+        source (str or pd.DataFrame): CSV file, partitioned Parquet store or DataFrame.
+        columns (list): Columns to expose.
+        name (str): View name.
+        time_range (tuple, optional): (start, end) half-open range on TimeStamp.
+        events (list, optional): Keep only these Event values.
+    """
+    columns = list(dict.fromkeys(list(columns) + ['TimeStamp']))
+    where = []
+    start, end = parse_time_range(time_range)
+    if start is not None:
+        where.append(f"epoch_ns(TimeStamp) >= {start.value}")
+    if end is not None:
+        where.append(f"epoch_ns(TimeStamp) < {end.value}")
+
+    if isinstance(source, pd.DataFrame) or is_partitioned_store(source):
+        if isinstance(source, pd.DataFrame):
+            frame = source[columns].copy()
+            frame['TimeStamp'] = pd.to_datetime(frame['TimeStamp'], utc=True).dt.tz_convert(None)
+            frame['_row'] = np.arange(len(frame), dtype=np.int64)
+            if events is not None:
+                frame = frame[frame['Event'].isin(events)]
+            data = frame
+        else:
+            # Partitions in the same order as read_partitioned; the timestamp is cast to a naive
+            # UTC nanosecond timestamp, since DuckDB reads tz-aware ones at microsecond precision
+            paths = [str(Path(source) / entry['path']) for entry in select_partitions(source, time_range, events)]
+            dataset = ds.dataset(paths, format='parquet')
+            projection = {column: ds.field(column) for column in columns}
+            projection['TimeStamp'] = ds.field('TimeStamp').cast(pa.timestamp('ns'))
+            scanner = dataset.scanner(columns=projection,
+                                      filter=ds.field('Event').isin(list(events)) if events is not None else None)
+            data = scanner.to_table()
+            data = data.append_column('_row', pa.array(np.arange(data.num_rows, dtype=np.int64)))
+        con.register(f"{name}_data", data)
+        select = "*"
+        relation = f"{name}_data"
+    else:
+        selected = ', '.join(f'"{column}"' for column in columns if column != 'TimeStamp')
+        select = f"{selected + ', ' if selected else ''}TimeStamp::TIMESTAMP_NS AS TimeStamp, TimeStamp AS _ts_text, row_number() OVER () AS _row"
+        relation = f"read_csv({_quote(str(source))}, header=true, all_varchar=true, delim=',', quote='\"', escape='\"')"
+        if events is not None:
+            where.append("Event IN (" + ', '.join(_quote(event) for event in events) + ")")
+    con.execute(f"CREATE OR REPLACE TEMP VIEW {name} AS SELECT * FROM (SELECT {select} FROM {relation})"
+                + (" WHERE " + " AND ".join(where) if where else ""))
+    return name
+
+
+def _extension_sql(column):
+    """SQL for the lowercased extension of a URL's last path segment (as request_filters.url_extension)."""
+    segment = f"regexp_extract(regexp_replace({column}, '[?#].*$', ''), '[^/]*$')"
+    return f"lower(regexp_extract({segment}, '^.*[^.].*(\\.[^.]*)$', 1))"
+
+
+# Same rules as transform_to_events.get_domain and categorize_event
+DOMAIN_SQL = ("CASE WHEN Referrer_URL IS NULL OR Referrer_URL = '-' THEN '' "
+              "ELSE lower(regexp_extract(Referrer_URL, '^(?:[A-Za-z][A-Za-z0-9+.-]*:)?//([^/?#]*)', 1)) END")
+EVENT_SQL = ("CASE WHEN contains(Page_URL, '/inne/informacja_online.php') THEN 'Info_Page_View' "
+             "WHEN contains(Page_URL, 'p-') THEN 'Product_View' "
+             "WHEN contains(Page_URL, 'koszyk') THEN 'Add_to_Cart' ELSE 'Other_Action' END")
+
+
+def sessionize(source, session_timeout=15, exclude_extensions=STATIC_EXTENSIONS, con=None, session_columns=False):
+    """
+    SQL version of sessionize_and_classify's sessionization and event classification.
+
+    Rows are ordered by IP and TimeStamp with ties kept in source order (as pandas'
+    stable multi-column sort), static assets are dropped, and a session starts at an
+    IP's first request, after a gap longer than `session_timeout` minutes or when the
+    referrer domain changes or is empty.
+
+    Args:
+        source (str or pd.DataFrame): Processed logs (processed_data.csv) or a DataFrame of them.
+        session_timeout (float): Session timeout in minutes.
+        exclude_extensions (iterable, optional): Static asset extensions to drop.
+        con: DuckDB connection; a new one by default.
+        session_columns (bool): Also return the intermediate time_diff (minutes) and
+            referrer_domain columns, e.g. for the summary sketches.
+
+    Returns:
+        pd.DataFrame: The event log, identical to the pandas path (plus the session columns).
+    """
+    con = con or connect()
+    from_frame = isinstance(source, pd.DataFrame)
+    register_source(con, source, ['IP', 'Method', 'Page_URL', 'Response', 'Bytes_Sent', 'Referrer_URL', 'User_Agent'],
+                    name='processed')
+    static = "false"
+    if exclude_extensions:
+        static = f"coalesce({_extension_sql('Page_URL')} IN ({', '.join(_quote(e) for e in sorted(exclude_extensions))}), false)"
+    order = "PARTITION BY IP ORDER BY TimeStamp, _row"
+    if from_frame:
+        columns = f"_row, {EVENT_SQL} AS Event"
+    else:
+        columns = (f"IP, _ts_text, {EVENT_SQL} AS Event, Page_URL, Method, Response::BIGINT AS Response, "
+                   "Bytes_Sent::BIGINT AS Bytes_Sent, Referrer_URL, User_Agent")
+    extra_columns = ['time_diff', 'referrer_domain'] if session_columns else []
+    columns += ''.join(f", {column}" for column in extra_columns)
+    # Timedelta.total_seconds() / 60 of the pandas path, on nanosecond epochs
+    gap = f"(epoch_ns(TimeStamp) - epoch_ns(lag(TimeStamp) OVER ({order}))) / 1e9 / 60"
+    query = f"""
+        WITH requests AS (
+            SELECT *, {gap} AS time_diff, {DOMAIN_SQL} AS referrer_domain
+            FROM processed WHERE NOT {static}
+        ), marked AS (
+            SELECT *, (time_diff IS NULL OR time_diff > $timeout OR referrer_domain = ''
+                       OR referrer_domain IS DISTINCT FROM lag(referrer_domain) OVER ({order})) AS new_session
+            FROM requests
+        )
+        SELECT IP || '_' || sum(new_session::BIGINT) OVER ({order} ROWS UNBOUNDED PRECEDING) AS Session_ID,
+               {columns}
+        FROM marked ORDER BY IP, TimeStamp, _row
+    """
+    result = con.execute(query, {'timeout': float(session_timeout)}).fetch_df()
+    if from_frame:
+        # Take the other columns straight from the frame, as the pandas path does
+        df = source.iloc[result['_row'].to_numpy()].reset_index(drop=True)
+        df['TimeStamp'] = pd.to_datetime(df['TimeStamp'], utc=True)
+        df['Session_ID'], df['Event'] = result['Session_ID'], result['Event']
+        for column in extra_columns:
+            df[column] = result[column]
+        return df[EVENT_LOG_COLUMNS + extra_columns]
+    df = result.rename(columns={'_ts_text': 'TimeStamp'})
+    for column in EVENT_LOG_COLUMNS:
+        df[column] = df[column].astype(EVENT_LOG_DTYPES[column])
+    df['TimeStamp'] = pd.to_datetime(df['TimeStamp'], utc=True)
+    return df[EVENT_LOG_COLUMNS + extra_columns]
+
+
+def session_durations(source, time_range=None, con=None):
+    """Session duration in minutes per Session_ID (sorted), as additional_metrics computes it."""
+    con = con or connect()
+    register_source(con, source, ['Session_ID'], time_range=time_range)
+    # Timedelta.total_seconds(): whole seconds plus microseconds / 1e6 (nanoseconds truncated)
+    result = con.execute("""
+        WITH spans AS (
+            SELECT Session_ID, (epoch_ns(max(TimeStamp)) - epoch_ns(min(TimeStamp))) // 1000 AS us
+            FROM events WHERE Session_ID IS NOT NULL GROUP BY Session_ID
+        )
+        SELECT Session_ID, (us // 1000000 + (us % 1000000) / 1e6) / 60 AS minutes FROM spans ORDER BY Session_ID
+    """).fetch_df()
+    return pd.Series(result['minutes'].to_numpy(), index=pd.Index(result['Session_ID'], name='Session_ID'), name='TimeStamp')
+
+
+def conversion_and_transitions(source, time_range=None, con=None):
+    """
+    Sessions with an Add_to_Cart, total sessions, and event -> next event counts within sessions.
+
+    Returns:
+        tuple: (cart_sessions, total_sessions, DataFrame of Event, next_event, count sorted by Event and next_event).
+    """
+    con = con or connect()
+    register_source(con, source, ['Session_ID', 'Event'], time_range=time_range)
+    cart_sessions, total_sessions = con.execute("""
+        SELECT count(DISTINCT Session_ID) FILTER (WHERE Event = 'Add_to_Cart'), count(DISTINCT Session_ID) FROM events
+    """).fetchone()
+    transitions = con.execute("""
+        WITH pairs AS (
+            SELECT Event, CASE WHEN Session_ID IS NOT NULL THEN lead(Event) OVER (PARTITION BY Session_ID ORDER BY _row) END AS next_event
+            FROM events
+        )
+        SELECT Event, next_event, count(*) AS count FROM pairs
+        WHERE Event IS NOT NULL AND next_event IS NOT NULL
+        GROUP BY Event, next_event ORDER BY Event, next_event
+    """).fetch_df()
+    return int(cart_sessions), int(total_sessions), transitions
+
+
+def add_to_cart_counts(source, time_range=None, con=None):
+    """Add_to_Cart events per session (sessions with at least one, sorted by Session_ID)."""
+    con = con or connect()
+    register_source(con, source, ['Session_ID', 'Event'], time_range=time_range, events=['Add_to_Cart'])
+    result = con.execute("""
+        SELECT Session_ID, count(*) AS n FROM events
+        WHERE Event = 'Add_to_Cart' AND Session_ID IS NOT NULL GROUP BY Session_ID ORDER BY Session_ID
+    """).fetch_df()
+    return pd.Series(result['n'].to_numpy(dtype=np.int64), index=pd.Index(result['Session_ID'], name='Session_ID'))
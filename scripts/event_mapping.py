@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import re
 import matplotlib
@@ -9,18 +10,64 @@ from pathlib import Path
 import plotly.io as pio
 import logging
 
+from event_store import write_partitioned
+from instrumentation import instrumented
+from report_builder import build_html_report
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def map_event_to_proposition(input_file, output_dir=r"D:\MAJOR PROJECT\User behaviour analysis using server logs\data\processed_logs", report_dir=r"D:\MAJOR PROJECT\User behaviour analysis using server logs\reports", use_refined=False):
+def map_unique(values, func):
+    """Apply `func` once per distinct value of a Series (missing values included) and broadcast the results."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return pd.Series(np.asarray([func(value) for value in uniques], dtype=object)[codes], index=values.index)
+
+
+def group_modes(group_ids, values, n_groups, default="N/A"):
+    """
+    Most frequent value per group (the smallest one on ties, like Series.mode()[0]).
+
+    Counts every (group, value) pair once with a value_counts over integer codes, then
+    keeps the first pair per group after sorting by count (descending) and value.
+
+    Args:
+        group_ids (np.ndarray): Group number of every row (-1 rows are ignored).
+        values (pd.Series): Values to take the mode of; missing values are ignored.
+        n_groups (int): Number of groups.
+        default: Mode of groups without any non-missing value.
+
+    Returns:
+        np.ndarray: Mode of each group, indexed by group number.
+    """
+    codes, uniques = pd.factorize(values, sort=True)
+    keep = (group_ids >= 0) & (codes >= 0)
+    pairs = pd.DataFrame({'group': group_ids[keep], 'value': codes[keep]}).value_counts(sort=False)
+    modes = np.full(n_groups, default, dtype=object)
+    if pairs.empty:
+        return modes
+    group, value, count = (pairs.index.get_level_values('group').to_numpy(),
+                           pairs.index.get_level_values('value').to_numpy(), pairs.to_numpy())
+    order = np.lexsort((value, -count, group))
+    first = order[np.r_[True, group[order][1:] != group[order][:-1]]]
+    modes[group[first]] = np.asarray(uniques, dtype=object)[value[first]]
+    return modes
+
+
+@instrumented('map_event_to_proposition')
+def map_event_to_proposition(input_file, output_dir=r"D:\MAJOR PROJECT\User behaviour analysis using server logs\data\processed_logs", report_dir=r"D:\MAJOR PROJECT\User behaviour analysis using server logs\reports", use_refined=False, store_dir=None,
+                             cube=None, cube_source=None):
     """
     Map events to LTL propositions and generate mapping table and visualizations.
     
     Args:
-        input_file (str): Path to the input CSV file (e.g., event_logs.csv or event_logs_refined.csv).
+        input_file (str or pd.DataFrame): Path to the input CSV file (e.g., event_logs.csv or
+            event_logs_refined.csv), or the event log itself.
         output_dir (str): Directory to save output CSV files.
         report_dir (str): Directory to save visualizations and HTML report.
         use_refined (bool): Whether to use refined event logs.
+        store_dir (str, optional): Also write the mapped event log as a date/hour partitioned store under this directory.
+        cube (rollup_cube.RollupCube, optional): Rollup cube to add the mapped event log to.
+        cube_source (str, optional): Source key passed to the cube, so the same logs are only added once.
     
     Returns:
         tuple: (Path to event_logs_with_propositions.csv, Path to event_mapping_table.csv,
@@ -29,7 +76,8 @@ def map_event_to_proposition(input_file, output_dir=r"D:\MAJOR PROJECT\User beha
     """
     try:
         # Validate input file
-        if not Path(input_file).is_file():
+        from_frame = isinstance(input_file, pd.DataFrame)
+        if not from_frame and not Path(input_file).is_file():
             raise FileNotFoundError(f"Input file {input_file} does not exist")
 
         # Ensure output directories exist
@@ -50,9 +98,9 @@ def map_event_to_proposition(input_file, output_dir=r"D:\MAJOR PROJECT\User beha
         sns.set_style("whitegrid")
         
         # Load event logs
-        logging.info(f"Loading event logs from {input_file}")
+        logging.info(f"Loading event logs from {'memory' if from_frame else input_file}")
         required_columns = ['Event', 'TimeStamp']
-        df = pd.read_csv(input_file)
+        df = input_file.copy() if from_frame else pd.read_csv(input_file)
         missing_cols = [col for col in required_columns if col not in df.columns]
         if missing_cols:
             raise ValueError(f"Missing required columns in input file: {missing_cols}")
@@ -72,7 +120,8 @@ def map_event_to_proposition(input_file, output_dir=r"D:\MAJOR PROJECT\User beha
             match = re.search(r'/(.*?)(?:\.html|$|\?)', url)
             return match.group(1) if match else url.split('/')[-1] or "N/A"
         
-        df['Simplified_Page_URL'] = df.get('Page_URL', pd.Series(dtype=str)).apply(simplify_url)
+        # URLs repeat heavily, so the regex runs once per distinct URL
+        df['Simplified_Page_URL'] = map_unique(df['Page_URL'], simplify_url) if 'Page_URL' in df.columns else np.nan
         
         # Define website structure and mapping rules
         def infer_category(page_url, referrer_url):
@@ -194,21 +243,25 @@ def map_event_to_proposition(input_file, output_dir=r"D:\MAJOR PROJECT\User beha
                 prop = f"{level} & {main_category.lower()}"
             return prop, level, main_category, event_group, event_type, prop_desc
         
-        # Apply mapping
+        # Apply mapping once per distinct (Event, Page_URL, Referrer_URL) and broadcast the results
         logging.info("Mapping events to propositions")
-        mapping_results = df.apply(
-            lambda row: map_event_to_proposition(row['Event'], row.get('Page_URL', None), row.get('Referrer_URL', None)),
-            axis=1
-        )
-        df['Proposition'], df['Level'], df['Main_Category'], df['Event_Group'], df['Event_Type'], df['Proposition_Desc'] = zip(*mapping_results)
+        key_columns = [column for column in ('Event', 'Page_URL', 'Referrer_URL') if column in df.columns]
+        codes = df.groupby(key_columns, sort=False, dropna=False).ngroup().to_numpy()
+        _, first_rows = np.unique(codes, return_index=True)
+        distinct = df[key_columns].iloc[first_rows]
+        mapping_results = [map_event_to_proposition(row.Event, getattr(row, 'Page_URL', None), getattr(row, 'Referrer_URL', None))
+                           for row in distinct.itertuples(index=False)]
+        for column, values in zip(['Proposition', 'Level', 'Main_Category', 'Event_Group', 'Event_Type', 'Proposition_Desc'],
+                                  zip(*mapping_results)):
+            df[column] = np.asarray(values, dtype=object)[codes]
         
         # Create grouped mapping table
         logging.info("Creating event mapping table")
-        mapping_table = df.groupby(['Event', 'Event_Group', 'Event_Type', 'Proposition', 'Proposition_Desc', 'Main_Category']).agg({
-            'Simplified_Page_URL': lambda x: x.mode()[0] if not x.mode().empty else "N/A",
-            'TimeStamp': 'count'
-        }).reset_index()
-        mapping_table.rename(columns={'TimeStamp': 'Count'}, inplace=True)
+        group_columns = ['Event', 'Event_Group', 'Event_Type', 'Proposition', 'Proposition_Desc', 'Main_Category']
+        grouped = df.groupby(group_columns)
+        mapping_table = grouped['TimeStamp'].count().reset_index(name='Count')
+        mapping_table.insert(len(group_columns), 'Simplified_Page_URL', group_modes(grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64),
+                                                                                 df['Simplified_Page_URL'], len(mapping_table)))
         
         # Add Event_Type counts
         event_type_counts = mapping_table.groupby('Event_Type')['Count'].sum().reset_index(name='Event_Type_Count')
@@ -218,10 +271,11 @@ def map_event_to_proposition(input_file, output_dir=r"D:\MAJOR PROJECT\User beha
         # Limit to top 5 Main_Category for summary rows
         category_counts = df.groupby('Main_Category').size().reset_index(name='Total_Count')
         top_categories = category_counts.nlargest(5, 'Total_Count')
-        category_summary = pd.DataFrame(
-            [['Summary', '', '', '', '', cat['Main_Category'], cat['Total_Count'], '', ''] for _, cat in top_categories.iterrows()],
-            columns=['Event', 'Event_Group', 'Event_Type', 'Proposition', 'Proposition_Desc', 'Main_Category', 'Count', 'Event_Type_Count', '']
-        )
+        category_summary = pd.DataFrame({
+            'Event': 'Summary', 'Event_Group': '', 'Event_Type': '', 'Proposition': '', 'Proposition_Desc': '',
+            'Main_Category': top_categories['Main_Category'].to_numpy(dtype=object),
+            'Count': top_categories['Total_Count'].to_numpy(), 'Event_Type_Count': '', '': '',
+        }, index=pd.RangeIndex(len(top_categories)))
         
         # Limit mapping_table to top rows to fit within 10 total rows
         remaining_rows = 10 - len(category_summary)  # e.g., 10 - 5 = 5 rows for event mappings
@@ -264,16 +318,22 @@ def map_event_to_proposition(input_file, output_dir=r"D:\MAJOR PROJECT\User beha
         plt.savefig(table_viz, bbox_inches='tight', dpi=300)  # Reduced DPI for smaller file size
         plt.close()
         
+        # Proposition counts for the summary chart, from the mapping table instead of another pass over df
+        proposition_counts = (mapping_table.groupby(['Proposition', 'Proposition_Desc', 'Event_Group', 'Event_Type', 'Main_Category'])
+                              ['Count'].sum().reset_index())
+        
         # For CSV, combine Proposition and Description
-        mapping_table['Proposition'] = mapping_table.apply(lambda x: f"{x['Proposition']} ({x['Proposition_Desc']})", axis=1)
+        mapping_table['Proposition'] = mapping_table['Proposition'].astype(str) + ' (' + mapping_table['Proposition_Desc'].astype(str) + ')'
         mapping_table.drop(columns=['Proposition_Desc'], inplace=True)
         mapping_table.to_csv(mapping_table_output, index=False)
         df.to_csv(event_logs_output, index=False)
+        if store_dir:
+            write_partitioned(df, Path(store_dir) / "event_logs_with_propositions")
+        if cube is not None:
+            cube.update(df, source=cube_source)
         
         # Generate proposition summary chart (limit propositions)
         logging.info("Generating proposition summary chart")
-        proposition_counts = df.groupby(['Proposition', 'Proposition_Desc', 'Event_Group', 'Event_Type', 'Main_Category']).size().reset_index(name='Count')
-        
         # Log the number of unique propositions
         num_unique_props = len(proposition_counts['Proposition_Desc'].unique())
         logging.info(f"Number of unique Proposition_Desc values: {num_unique_props}")
@@ -294,7 +354,10 @@ def map_event_to_proposition(input_file, output_dir=r"D:\MAJOR PROJECT\User beha
         
         # Generate summary text based on top propositions
         top_propositions_summary = proposition_counts.groupby(['Event_Type', 'Proposition_Desc'])['Count'].sum().reset_index()
-        top_propositions_summary = top_propositions_summary.groupby('Event_Type').apply(lambda x: x.nlargest(3, 'Count')).reset_index(drop=True)
+        # (sort + head instead of groupby.apply, which drops the grouping column on newer pandas)
+        top_propositions_summary = (top_propositions_summary
+                                    .sort_values(['Event_Type', 'Count'], ascending=[True, False], kind='stable')
+                                    .groupby('Event_Type').head(3).reset_index(drop=True))
         summary_text = "Top Propositions by Event Type:\n"
         for etype in top_propositions_summary['Event_Type'].unique():
             group_data = top_propositions_summary[top_propositions_summary['Event_Type'] == etype]
@@ -358,41 +421,15 @@ def map_event_to_proposition(input_file, output_dir=r"D:\MAJOR PROJECT\User beha
         with open(summary_insights, 'w') as f:
             f.write(summary_text)
         
-        # Generate HTML report
-        html_content = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Event Mapping Report</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                h1 {{ color: #333; text-align: center; }}
-                h2 {{ color: #555; }}
-                table {{ border-collapse: collapse; width: 100%; margin: 20px 0; }}
-                th, td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-                th {{ background-color: #f2f2f2; font-weight: bold; }}
-                tr:nth-child(even) {{ background-color: #f9f9f9; }}
-                img {{ max-width: 100%; height: auto; display: block; margin: 20px auto; }}
-                pre {{ background-color: #f9f9f9; padding: 10px; border: 1px solid #ddd; }}
-            </style>
-        </head>
-        <body>
-            <h1>Event Mapping Report</h1>
-            <h2>Event Mapping Table (Top 5 Categories + Top Events)</h2>
-            {mapping_table_html}
-            <h2>Summary of Propositions</h2>
-            <iframe src="proposition_summary.html" width="100%" height="600px" frameborder="0"></iframe>
-            <h2>Summary Insights</h2>
-            <pre>{summary_text}</pre>
-            <h2>Proposition Help</h2>
-            <pre>{help_text}</pre>
-        </body>
-        </html>
-        """
+        # Generate HTML report (images are the cached downscaled variants the PDF export also uses)
         mapping_table_html = mapping_table_display[columns_to_display].to_html(index=False, classes='table', border=0)
-        html_content = html_content.format(mapping_table_html=mapping_table_html, summary_text=summary_text, help_text=help_text)
-        with open(html_report, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        build_html_report([
+            {'title': 'Event Mapping Table (Top 5 Categories + Top Events)', 'html': mapping_table_html, 'image': str(table_viz)},
+            {'title': 'Summary of Propositions',
+             'html': '<iframe src="proposition_summary.html" width="100%" height="600px" frameborder="0"></iframe>'},
+            {'title': 'Summary Insights', 'text': summary_text},
+            {'title': 'Proposition Help', 'text': help_text},
+        ], str(html_report), title="Event Mapping Report")
         
         logging.info("Event mapping completed successfully")
         return str(event_logs_output), str(mapping_table_output), str(table_viz), str(prop_viz_html), str(prop_viz_png), str(summary_insights)
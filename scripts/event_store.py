@@ -0,0 +1,192 @@
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ingest import EVENT_LOG_DTYPES, read_csv
+
+INDEX_FILE = "_index.json"
+
+
+def parse_time_range(time_range):
+    """
+    Normalize a time range to a pair of UTC timestamps.
+
+    Args:
+        time_range (tuple or None): (start, end) where either bound may be None; bounds can be
+            strings, datetimes or pd.Timestamp. The range is half-open: start <= t < end.
+
+    Returns:
+        tuple: (start, end) as tz-aware pd.Timestamp or None.
+    """
+    if time_range is None:
+        return None, None
+    start, end = time_range
+
+    def to_utc(value):
+        if value is None:
+            return None
+        value = pd.Timestamp(value)
+        return value.tz_localize('UTC') if value.tzinfo is None else value.tz_convert('UTC')
+
+    return to_utc(start), to_utc(end)
+
+
+def filter_time_range(df, time_range, time_column='TimeStamp'):
+    """Keep rows whose timestamp falls inside the half-open time range."""
+    start, end = parse_time_range(time_range)
+    if start is None and end is None:
+        return df
+    timestamps = pd.to_datetime(df[time_column], utc=True)
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= timestamps >= start
+    if end is not None:
+        mask &= timestamps < end
+    return df[mask]
+
+
+def load_index(store_dir):
+    index_path = Path(store_dir) / INDEX_FILE
+    if not index_path.is_file():
+        return {'partitions': []}
+    with open(index_path, 'r') as f:
+        return json.load(f)
+
+
+def write_partitioned(df, store_dir, time_column='TimeStamp', mode='overwrite'):
+    """
+    Write an event log as Parquet files partitioned by date and hour.
+
+    Files are laid out as `date=YYYY-MM-DD/hour=HH/part-NNNNN.parquet`, and `_index.json`
+    records the row count, min/max timestamp and distinct Events of every file.
+
+    Args:
+        df (pd.DataFrame): Event log with a timestamp column.
+        store_dir (str): Root directory of the partitioned store.
+        time_column (str): Column used for partitioning.
+        mode (str): 'overwrite' to replace the store, 'append' to add new part files.
+
+    Returns:
+        str: Path to the store directory.
+    """
+    store_dir = Path(store_dir)
+    if mode == 'overwrite' and store_dir.exists():
+        shutil.rmtree(store_dir)
+    elif mode not in ('overwrite', 'append'):
+        raise ValueError(f"Unknown write mode: {mode}")
+    store_dir.mkdir(parents=True, exist_ok=True)
+
+    index = load_index(store_dir)
+    df = df.copy()
+    df[time_column] = pd.to_datetime(df[time_column], utc=True)
+    hour_bucket = df[time_column].dt.floor('h')
+
+    for bucket, part in df.groupby(hour_bucket, sort=True):
+        partition_dir = store_dir / f"date={bucket.strftime('%Y-%m-%d')}" / f"hour={bucket.strftime('%H')}"
+        partition_dir.mkdir(parents=True, exist_ok=True)
+        part_file = partition_dir / f"part-{len(list(partition_dir.glob('part-*.parquet'))):05d}.parquet"
+        pq.write_table(pa.Table.from_pandas(part, preserve_index=False), part_file)
+        index['partitions'].append({
+            'path': part_file.relative_to(store_dir).as_posix(),
+            'rows': len(part),
+            'min_time': part[time_column].min().isoformat(),
+            'max_time': part[time_column].max().isoformat(),
+            'events': sorted(part['Event'].dropna().unique().tolist()) if 'Event' in part.columns else None,
+        })
+
+    with open(store_dir / INDEX_FILE, 'w') as f:
+        json.dump(index, f, indent=2)
+    return str(store_dir)
+
+
+def select_partitions(store_dir, time_range=None, events=None):
+    """
+    Use the store index to pick only the partitions that can contain matching rows.
+
+    Returns:
+        list: Index entries of the selected partitions.
+    """
+    start, end = parse_time_range(time_range)
+    selected = []
+    for entry in load_index(store_dir)['partitions']:
+        if start is not None and pd.Timestamp(entry['max_time']) < start:
+            continue
+        if end is not None and pd.Timestamp(entry['min_time']) >= end:
+            continue
+        if events is not None and entry.get('events') is not None and not set(events) & set(entry['events']):
+            continue
+        selected.append(entry)
+    return sorted(selected, key=lambda entry: (entry['min_time'], entry['path']))
+
+
+def read_partitioned(store_dir, time_range=None, columns=None, events=None, time_column='TimeStamp'):
+    """
+    Load only the partitions and columns needed for a time-range / Event query.
+
+    Args:
+        store_dir (str): Root directory written by write_partitioned.
+        time_range (tuple, optional): (start, end) half-open range.
+        columns (list, optional): Columns to read; all columns when None.
+        events (list, optional): Keep only rows whose Event is in this list.
+
+    Returns:
+        pd.DataFrame: Matching rows, partition by partition in time order; rows of each
+            session keep their order from the source log.
+    """
+    partitions = select_partitions(store_dir, time_range, events)
+    read_columns = None
+    if columns is not None:
+        read_columns = list(dict.fromkeys(list(columns) + ([time_column] if time_range else [])))
+    filters = [('Event', 'in', list(events))] if events is not None else None
+
+    tables = [pq.read_table(Path(store_dir) / entry['path'], columns=read_columns, filters=filters) for entry in partitions]
+    if not tables:
+        return pd.DataFrame(columns=list(columns) if columns is not None else [])
+    df = pa.concat_tables(tables).to_pandas()
+    df = filter_time_range(df, time_range, time_column)
+    if columns is not None:
+        df = df[list(columns)]
+    return df.reset_index(drop=True)
+
+
+def is_partitioned_store(path):
+    return os.path.isdir(path) and os.path.isfile(os.path.join(path, INDEX_FILE))
+
+
+def event_log_columns(source):
+    """Column names of an event log CSV file or partitioned store, without reading its rows."""
+    if is_partitioned_store(source):
+        partitions = load_index(source)['partitions']
+        return pq.read_schema(Path(source) / partitions[0]['path']).names if partitions else []
+    return list(pd.read_csv(source, nrows=0).columns)
+
+
+def load_event_log(source, columns=None, time_range=None, events=None, reader='pandas'):
+    """
+    Load an event log from a CSV file or a partitioned store, with optional pushdown.
+
+    For a store directory only the matching partitions and columns are read. For a CSV
+    file only the requested columns are parsed, with the 'pandas' or multithreaded 'pyarrow'
+    CSV reader, and the filters are applied after loading.
+
+    Returns:
+        pd.DataFrame: Event log rows matching the filters.
+    """
+    if is_partitioned_store(source):
+        return read_partitioned(source, time_range=time_range, columns=columns, events=events)
+
+    usecols = None
+    if columns is not None:
+        usecols = list(dict.fromkeys(list(columns) + (['TimeStamp'] if time_range else []) + (['Event'] if events else [])))
+    df = read_csv(source, reader, columns=usecols, dtypes=EVENT_LOG_DTYPES)
+    if events is not None:
+        df = df[df['Event'].isin(events)]
+    df = filter_time_range(df, time_range)
+    if columns is not None:
+        df = df[list(columns)]
+    return df.reset_index(drop=True)
@@ -0,0 +1,282 @@
+import logging
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import os
+
+from session_traces import encode_traces
+from transform_to_events import get_domain
+
+# Category_View and Checkout_View only exist in refined event logs (see resolve_steps)
+DEFAULT_FUNNEL_STEPS = ['Info_Page_View', 'Category_View', 'Product_View', 'Add_to_Cart', 'Checkout_View']
+
+
+def _range_max(values, lo, hi):
+    """
+    Maximum of values[lo:hi] for every query (all lo < hi), from a sparse table whose level k
+    holds the maxima of the windows of 2**k values, so each query is two lookups.
+    """
+    result = np.empty(len(lo), dtype=values.dtype)
+    if len(lo) == 0:
+        return result
+    levels = np.frexp((hi - lo).astype(np.float64))[1] - 1
+    table, width = values, 1
+    for level in range(int(levels.max()) + 1):
+        if level:
+            table = np.maximum(table[:-width], table[width:])
+            width *= 2
+        queries = levels == level
+        result[queries] = np.maximum(table[lo[queries]], table[hi[queries] - width])
+    return result
+
+
+def _match_windowed(traces, step_codes, step_gap, total_gap):
+    """
+    Exact funnel matching under time windows.
+
+    Greedy earliest matching can miss a funnel under a window (A, A, B with only the second
+    A close enough to B), so every occurrence of a step is kept as a match when some match
+    of the previous step qualifies for it. Sessions are in time order, so the qualifying
+    previous matches of an occurrence are one contiguous run: those before it and no more
+    than `step_gap` older. Of all the chains ending at a match only the one with the latest
+    first step matters for `total_gap`, so each match carries that start time, taken as the
+    maximum over its run. Every candidate start event is thereby tried, one vectorized pass
+    per step.
+    """
+    n_sessions = len(traces)
+    reached = np.zeros((n_sessions, len(step_codes)), dtype=bool)
+    times = traces.timestamps
+    session_of_row = traces.session_of_row
+    if step_gap is not None:
+        # (session, timestamp rank) packed into one key that increases along the flat trace
+        distinct = np.unique(times)
+        stride = len(distinct) + 1
+        row_key = session_of_row.astype(np.int64) * stride + np.searchsorted(distinct, times)
+
+    for k, codes in enumerate(step_codes):
+        occurrences = np.flatnonzero(np.isin(traces.codes, codes))
+        if k == 0:
+            matched, chain_start = occurrences, times[occurrences]
+        else:
+            sessions = session_of_row[occurrences]
+            hi = np.searchsorted(matched, occurrences)
+            if step_gap is not None:
+                earliest = np.searchsorted(distinct, times[occurrences] - step_gap)
+                lo = np.searchsorted(row_key[matched], sessions.astype(np.int64) * stride + earliest)
+            else:
+                lo = np.searchsorted(matched, traces.offsets[sessions])
+            qualifies = lo < hi
+            matched, lo, hi = occurrences[qualifies], lo[qualifies], hi[qualifies]
+            chain_start = _range_max(chain_start, lo, hi)
+            if total_gap is not None:
+                within = times[matched] - chain_start <= total_gap
+                matched, chain_start = matched[within], chain_start[within]
+        reached[session_of_row[matched], k] = True
+    return reached
+
+
+def match_funnel(traces, steps, step_window=None, conversion_window=None):
+    """
+    Match an ordered funnel against every session at once.
+
+    Without time windows each step is matched at its earliest occurrence after the previous
+    step, which finds the funnel whenever the session contains it. With a window that is
+    no longer enough, and every qualifying occurrence of each step is tracked instead (see
+    `_match_windowed`). Either way the funnel is evaluated with vectorized passes over the
+    encoded trace per step instead of a Python loop per session.
+
+    Args:
+        traces (SessionTraces): Encoded session traces, each session's rows in time order.
+        steps (list): Ordered steps; each is an Event name or a tuple of alternative Event names.
+        step_window (pd.Timedelta, optional): Maximum time allowed between consecutive steps.
+        conversion_window (pd.Timedelta, optional): Maximum time allowed from the first step.
+
+    Returns:
+        np.ndarray: Boolean matrix (sessions x steps), True where the session reached the step.
+    """
+    if (step_window is not None or conversion_window is not None) and traces.timestamps is None:
+        raise ValueError("Time windows require traces encoded with timestamps")
+
+    step_codes = []
+    for step in steps:
+        alternatives = step if isinstance(step, (tuple, list, set)) else (step,)
+        step_codes.append([traces.code_of(event) for event in alternatives])
+    if step_window is not None or conversion_window is not None:
+        step_gap = pd.Timedelta(step_window).value if step_window is not None else None
+        total_gap = pd.Timedelta(conversion_window).value if conversion_window is not None else None
+        return _match_windowed(traces, step_codes, step_gap, total_gap)
+
+    n_sessions = len(traces)
+    starts, ends = traces.offsets[:-1], traces.offsets[1:]
+    reached = np.zeros((n_sessions, len(steps)), dtype=bool)
+
+    # Row index of the matched event for each session, -1 once the session drops out
+    position = np.full(n_sessions, -1, dtype=np.int64)
+    active = np.ones(n_sessions, dtype=bool)
+
+    for k, codes in enumerate(step_codes):
+        occurrences = np.flatnonzero(np.isin(traces.codes, codes))
+
+        search_from = starts if k == 0 else position + 1
+        candidate_slot = np.searchsorted(occurrences, search_from)
+        found = candidate_slot < len(occurrences)
+        candidate = np.full(n_sessions, -1, dtype=np.int64)
+        candidate[found] = occurrences[candidate_slot[found]]
+        hit = active & found & (candidate < ends)
+
+        position = np.where(hit, candidate, -1)
+        active = hit
+        reached[:, k] = hit
+
+    return reached
+
+
+def resolve_steps(steps, events):
+    """
+    Check funnel steps against the Event values of a log.
+
+    A step none of whose alternatives occur in the log would silently report zero sessions
+    from there on (e.g. Category_View on an unrefined event log). Such steps are dropped from
+    the default funnel, and logged as a warning for an explicit one.
+
+    Args:
+        steps (list or None): Ordered steps; None for DEFAULT_FUNNEL_STEPS.
+        events (iterable): Distinct Event values of the log.
+
+    Returns:
+        tuple: (steps to match, list of missing steps).
+    """
+    events = set(events)
+    default = steps is None
+    steps = list(DEFAULT_FUNNEL_STEPS if default else steps)
+    missing = [step for step in steps
+               if not events & set(step if isinstance(step, (tuple, list, set)) else (step,))]
+    if missing:
+        logging.warning(f"Funnel steps not in the event log: {missing}"
+                        + (" (left out of the default funnel)" if default else ""))
+    if default:
+        steps = [step for step in steps if step not in missing]
+    return steps, missing
+
+
+def summarize_funnel(reached, steps):
+    """
+    Turn a reach matrix into per-step reach and drop-off counts.
+
+    Returns:
+        pd.DataFrame: One row per step with Sessions, Drop_Off and conversion percentages.
+    """
+    counts = reached.sum(axis=0).astype(np.int64)
+    previous = np.concatenate(([counts[0] if len(counts) else 0], counts[:-1]))
+    first = counts[0] if len(counts) else 0
+    summary = pd.DataFrame({
+        'Step': np.arange(1, len(steps) + 1),
+        'Event': [' | '.join(s) if isinstance(s, (tuple, list, set)) else s for s in steps],
+        'Sessions': counts,
+        'Drop_Off': previous - counts,
+    })
+    with np.errstate(divide='ignore', invalid='ignore'):
+        summary['Conversion_From_Previous'] = np.where(previous > 0, counts / previous * 100, 0.0).round(2)
+        summary['Conversion_From_Start'] = np.where(first > 0, counts / first * 100, 0.0).round(2)
+    return summary
+
+
+def funnel_breakdown(reached, steps, labels, dimension):
+    """
+    Break funnel reach down by a per-session label (e.g. referrer domain or hour).
+
+    Returns:
+        pd.DataFrame: Long-format table with one row per (label, step).
+    """
+    step_names = [' | '.join(s) if isinstance(s, (tuple, list, set)) else s for s in steps]
+    per_label = pd.DataFrame(reached.astype(np.int64), columns=step_names)
+    per_label[dimension] = labels
+    counts = per_label.groupby(dimension, sort=True)[step_names].sum()
+    long = counts.reset_index().melt(id_vars=dimension, var_name='Event', value_name='Sessions')
+    long['Step'] = long['Event'].map({name: i + 1 for i, name in enumerate(step_names)})
+    entered = counts[step_names[0]].rename('Entered') if step_names else None
+    long = long.merge(entered, left_on=dimension, right_index=True)
+    long['Conversion_From_Start'] = np.where(long['Entered'] > 0, long['Sessions'] / long['Entered'] * 100, 0.0).round(2)
+    return long.drop(columns='Entered').sort_values([dimension, 'Step'], ignore_index=True)
+
+
+def session_dimensions(df, traces):
+    """
+    Entry referrer domain and starting hour of each session, aligned with the traces.
+
+    Returns:
+        pd.DataFrame: Columns 'referrer_domain' and 'hour', one row per session.
+    """
+    first_rows = traces.row_index[traces.offsets[:-1]]
+    dims = pd.DataFrame(index=np.arange(len(traces)))
+    if 'Referrer_URL' in df.columns:
+        referrers = df['Referrer_URL'].iloc[first_rows]
+        unique_urls = pd.unique(referrers)
+        domain_of = {url: get_domain(url) for url in unique_urls}
+        dims['referrer_domain'] = referrers.map(domain_of).to_numpy()
+    else:
+        dims['referrer_domain'] = ''
+    dims['hour'] = (traces.timestamps[traces.offsets[:-1]] // 3_600_000_000_000) % 24 if traces.timestamps is not None else -1
+    return dims
+
+
+def analyze_funnel(file_path, report_dir, steps=None, step_window=None, conversion_window=None, top_domains=10):
+    """
+    Compute an ordered conversion funnel with per-referrer-domain and per-hour breakdowns.
+
+    Args:
+        file_path (str): Path to the (refined) event logs CSV file.
+        report_dir (str): Directory to save the funnel report and chart.
+        steps (list, optional): Ordered funnel steps. Defaults to the DEFAULT_FUNNEL_STEPS present in the log.
+        step_window (str or pd.Timedelta, optional): Max time between consecutive steps (e.g. '30min').
+        conversion_window (str or pd.Timedelta, optional): Max time from the first step (e.g. '2h').
+        top_domains (int): Number of referrer domains shown in the textual report.
+
+    Returns:
+        dict: visualizations and textual_data, as produced by the other analysis modules.
+    """
+    os.makedirs(report_dir, exist_ok=True)
+    df = pd.read_csv(file_path)
+
+    traces = encode_traces(df)
+    steps, missing = resolve_steps(steps or None, traces.event_names)
+    reached = match_funnel(traces, steps, step_window=step_window, conversion_window=conversion_window)
+    summary = summarize_funnel(reached, steps)
+
+    dims = session_dimensions(df, traces)
+    by_domain = funnel_breakdown(reached, steps, dims['referrer_domain'].to_numpy(), 'referrer_domain')
+    by_hour = funnel_breakdown(reached, steps, dims['hour'].to_numpy(), 'hour')
+
+    summary.to_csv(os.path.join(report_dir, 'funnel_summary.csv'), index=False)
+    by_domain.to_csv(os.path.join(report_dir, 'funnel_by_referrer_domain.csv'), index=False)
+    by_hour.to_csv(os.path.join(report_dir, 'funnel_by_hour.csv'), index=False)
+
+    # Visualization
+    plt.figure(figsize=(8, 5))
+    plt.barh(summary['Event'][::-1], summary['Sessions'][::-1], color='steelblue')
+    plt.title('Conversion Funnel')
+    plt.xlabel('Number of Sessions')
+    plt.tight_layout()
+    img_path = os.path.join(report_dir, 'conversion_funnel.png')
+    plt.savefig(img_path)
+    plt.close()
+
+    # Text Summary
+    top = (by_domain[by_domain['Step'] == 1].nlargest(top_domains, 'Sessions')['referrer_domain'])
+    domain_table = by_domain[by_domain['referrer_domain'].isin(top)].pivot(
+        index='referrer_domain', columns='Step', values='Sessions')
+    windows = f"step window: {step_window or 'none'}, conversion window: {conversion_window or 'none'}"
+    missing_note = f"Steps not in the event log: {missing}\n" if missing else ""
+    report = (
+        f"Funnel: {' → '.join(summary['Event'])}\n"
+        f"Total Sessions: {len(traces)} ({windows})\n"
+        f"{missing_note}\n"
+        f"{summary.to_string(index=False)}\n\n"
+        f"Sessions per Step by Entry Referrer Domain (Top {top_domains}):\n"
+        f"{domain_table.to_string() if not domain_table.empty else 'No data'}\n"
+    )
+
+    return {
+        "visualizations": {"Conversion Funnel": img_path},
+        "textual_data": {"Funnel Analysis": report}
+    }
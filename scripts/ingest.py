@@ -0,0 +1,242 @@
+import glob
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+# Magic bytes of the compressed formats we receive rotated logs in
+MAGIC_BYTES = {
+    b'\x1f\x8b': 'gzip',
+    b'\x28\xb5\x2f\xfd': 'zstd',
+    b'BZh': 'bz2',
+    b'\xfd7zXZ\x00': 'xz',
+}
+LOG_FILE_PATTERNS = ('*.csv', '*.csv.gz', '*.csv.zst', '*.csv.bz2', '*.csv.xz', '*.gz', '*.zst')
+
+READERS = ('pandas', 'pyarrow')
+
+# Raw eclog columns the pipeline uses (HttpVersion and UserId are never read) and their types
+RAW_COLUMNS = ['IpId', 'TimeStamp', 'HttpMethod', 'Uri', 'ResponseCode', 'Bytes', 'Referrer', 'UserAgent']
+RAW_DTYPES = {
+    'IpId': 'string', 'UserId': 'int64', 'TimeStamp': 'int64', 'HttpMethod': 'string', 'Uri': 'string',
+    'HttpVersion': 'string', 'ResponseCode': 'int64', 'Bytes': 'int64', 'Referrer': 'string', 'UserAgent': 'string',
+}
+# Processed logs and event logs; TimeStamp stays a string and is parsed by the stages
+EVENT_LOG_DTYPES = {
+    'Session_ID': 'string', 'IP': 'string', 'TimeStamp': 'string', 'Event': 'string', 'Page_URL': 'string',
+    'Method': 'string', 'Response': 'int64', 'Bytes_Sent': 'int64', 'Referrer_URL': 'string', 'User_Agent': 'string',
+    'Refined_Event': 'string', 'Proposition': 'string', 'UA_Code': 'int32',
+}
+
+# pyarrow input stream codecs (xz is not supported by Arrow)
+ARROW_COMPRESSION = {'gzip': 'gzip', 'zstd': 'zstd', 'bz2': 'bz2'}
+
+_DONE = object()
+
+
+def expand_sources(sources):
+    """
+    Expand files, directories and glob patterns into a sorted list of log files.
+
+    Args:
+        sources (str or list): File paths, directories (their CSV / compressed files) or globs.
+
+    Returns:
+        list: Unique file paths in a stable order.
+
+    Raises:
+        FileNotFoundError: If a plain path does not exist, or nothing matches at all.
+    """
+    if isinstance(sources, (str, os.PathLike)):
+        sources = [sources]
+    files = []
+    for source in sources:
+        source = os.fspath(source)
+        if os.path.isdir(source):
+            for pattern in LOG_FILE_PATTERNS:
+                files.extend(glob.glob(os.path.join(source, pattern)))
+        elif glob.has_magic(source):
+            files.extend(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+        elif os.path.isfile(source):
+            files.append(source)
+        else:
+            raise FileNotFoundError(f"Log source {source} does not exist")
+    if not files:
+        raise FileNotFoundError(f"No log files found in {', '.join(os.fspath(source) for source in sources) or 'no sources'}")
+    return sorted(dict.fromkeys(files))
+
+
+def detect_compression(path):
+    """Compression of a file from its magic bytes ('gzip', 'zstd', 'bz2', 'xz') or None."""
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    for magic, compression in MAGIC_BYTES.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def is_plain_csv(source):
+    """True for a single uncompressed file path, which the plain pd.read_csv path handles."""
+    return isinstance(source, (str, os.PathLike)) and os.path.isfile(source) and detect_compression(source) is None
+
+
+def arrow_source(path):
+    """Memory-map an uncompressed file, or open a decompressing stream for a compressed one."""
+    compression = detect_compression(path)
+    if compression is None:
+        return pa.memory_map(path, 'r')
+    if compression not in ARROW_COMPRESSION:
+        raise ValueError(f"The pyarrow reader cannot decompress {compression} files: {path}")
+    return pa.input_stream(path, compression=ARROW_COMPRESSION[compression])
+
+
+def arrow_csv_options(columns, dtypes):
+    """Multithreaded read options and typed convert options for pyarrow.csv, limited to `columns`."""
+    column_types = {name: pa.type_for_alias(alias) for name, alias in (dtypes or {}).items()
+                    if columns is None or name in columns}
+    convert_options = pa_csv.ConvertOptions(include_columns=list(columns) if columns is not None else None,
+                                            column_types=column_types, strings_can_be_null=True)
+    return pa_csv.ReadOptions(use_threads=True), convert_options
+
+
+def _arrow_chunks(batches, chunksize):
+    """Re-slice Arrow record batches (sized in bytes) into DataFrames of `chunksize` rows."""
+    pending, pending_rows = [], 0
+    for batch in batches:
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        while pending_rows >= chunksize:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, chunksize).to_pandas()
+            rest = table.slice(chunksize)
+            pending, pending_rows = rest.to_batches(), rest.num_rows
+    if pending_rows:
+        yield pa.Table.from_batches(pending).to_pandas()
+
+
+def read_csv_chunks(path, reader='pandas', chunksize=None, columns=None, dtypes=None):
+    """
+    Read a CSV file with the chosen reader backend, whole or in chunks.
+
+    'pandas' is the single-threaded C parser. 'pyarrow' parses a memory-mapped file (or a
+    decompressing stream) with Arrow's multithreaded reader, only materialising `columns`
+    and using the explicit `dtypes` instead of type inference.
+
+    Args:
+        path (str): CSV file, optionally gzip/zstd/bz2 compressed.
+        reader (str): 'pandas' or 'pyarrow'.
+        chunksize (int, optional): Yield chunks of this many rows instead of one DataFrame.
+        columns (list, optional): Columns to read; all by default.
+        dtypes (dict, optional): Column -> type alias ('int64', 'string', ...) for the pyarrow reader.
+
+    Yields:
+        pd.DataFrame: The file, or consecutive chunks of it (columns in the order of `columns` when given).
+    """
+    if reader == 'pandas':
+        compression = detect_compression(path)
+        # pandas decompresses zstd only with the optional zstandard package; use Arrow's codec instead
+        arrow_zstd = compression == 'zstd' and pa is not None
+        with (arrow_source(path) if arrow_zstd else nullcontext(path)) as source:
+            compression = None if arrow_zstd else compression
+            if chunksize:
+                with pd.read_csv(source, usecols=columns, chunksize=chunksize, compression=compression) as chunks:
+                    for chunk in chunks:
+                        yield chunk if columns is None else chunk[list(columns)]
+            else:
+                df = pd.read_csv(source, usecols=columns, compression=compression)
+                yield df if columns is None else df[list(columns)]
+        return
+    if reader != 'pyarrow':
+        raise ValueError(f"Unknown reader: {reader} (expected one of {READERS})")
+    if pa is None:
+        raise ImportError("The pyarrow reader requires the pyarrow package")
+
+    read_options, convert_options = arrow_csv_options(columns, dtypes)
+    with arrow_source(path) as source:
+        if chunksize:
+            yield from _arrow_chunks(pa_csv.open_csv(source, read_options=read_options, convert_options=convert_options), chunksize)
+        else:
+            yield pa_csv.read_csv(source, read_options=read_options, convert_options=convert_options).to_pandas()
+
+
+def read_csv(path, reader='pandas', columns=None, dtypes=None):
+    """Read a whole CSV file into a DataFrame with the chosen reader backend (see read_csv_chunks)."""
+    return next(read_csv_chunks(path, reader, columns=columns, dtypes=dtypes))
+
+
+def _put(out, item, stop):
+    """Put onto a bounded queue, giving up once the consumer has stopped."""
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _read_file(path, chunksize, out, stop, read_kwargs):
+    """Worker: decompress and parse one file into chunks on its own bounded queue."""
+    try:
+        chunks = read_csv_chunks(path, chunksize=chunksize, **read_kwargs)
+        try:
+            for chunk in chunks:
+                if not _put(out, chunk, stop):
+                    return
+        finally:
+            chunks.close()
+    except Exception as e:
+        _put(out, e, stop)
+        return
+    _put(out, _DONE, stop)
+
+
+def iter_raw_chunks(sources, chunksize=100_000, workers=4, max_buffered=4, reader='pandas', columns=None, dtypes=None):
+    """
+    Read many (possibly compressed) log files as DataFrame chunks with threaded read-ahead.
+
+    Up to `workers` files are decompressed and parsed concurrently in a thread pool while
+    the caller processes earlier chunks. Each file has a queue of at most `max_buffered`
+    chunks, so memory stays bounded; chunks are yielded file by file in sorted order.
+
+    Args:
+        sources (str or list): Files, directories or glob patterns (see expand_sources).
+        chunksize (int): Rows per chunk.
+        workers (int): Number of files read ahead in parallel.
+        max_buffered (int): Maximum parsed chunks buffered per file.
+        reader (str): CSV reader backend, 'pandas' or 'pyarrow' (see read_csv_chunks).
+        columns (list, optional): Columns to read; all by default.
+        dtypes (dict, optional): Column types for the pyarrow reader.
+
+    Yields:
+        pd.DataFrame: Raw log chunks.
+    """
+    files = expand_sources(sources)
+    read_kwargs = {'reader': reader, 'columns': columns, 'dtypes': dtypes}
+    stop = threading.Event()
+    queues = [queue.Queue(maxsize=max_buffered) for _ in files]
+    executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='ingest')
+    try:
+        for path, out in zip(files, queues):
+            executor.submit(_read_file, path, chunksize, out, stop, read_kwargs)
+        for path, out in zip(files, queues):
+            while True:
+                item = out.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise RuntimeError(f"Failed to read {path}: {item}") from item
+                yield item
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,294 @@
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def _linux_peak_rss_mb():
+    """VmHWM of this process in MB, or None where /proc is not available."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far in MB, or None if it cannot be read."""
+    # On Linux ru_maxrss survives fork and exec, so a freshly spawned process would report
+    # at least its parent's peak; VmHWM belongs to the process's own address space
+    peak = _linux_peak_rss_mb() if sys.platform.startswith('linux') else None
+    if peak is not None:
+        return peak
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+        return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / 2**20
+    return None
+
+
+def file_size(path):
+    return os.path.getsize(path) if path and os.path.isfile(path) else 0
+
+
+def get_stage_logger(name, log_file=None, level=logging.INFO):
+    """
+    Logger for a pipeline stage that writes to its own log file.
+
+    Unlike `logging.basicConfig`, which only configures the root logger on its first
+    call, every stage gets its file handler attached (once) even when several stages
+    run in the same process. A stage logs to one file at a time: the handlers of
+    earlier log files (e.g. of a previous run's output_dir) are closed and removed.
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    if log_file:
+        log_file = os.path.abspath(log_file)
+        for handler in [h for h in logger.handlers if isinstance(h, logging.FileHandler)]:
+            if handler.baseFilename != log_file:
+                logger.removeHandler(handler)
+                handler.close()
+        if not any(getattr(h, 'baseFilename', None) == log_file for h in logger.handlers):
+            handler = logging.FileHandler(log_file)
+            handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+            logger.addHandler(handler)
+    return logger
+
+
+class StageRecord:
+    """Measurements for one stage or sub-step; repeated entries (e.g. per chunk) accumulate."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_rss_mb = None
+        self.rows_in = 0
+        self.rows_out = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.started_at = None
+
+    def to_dict(self):
+        return {
+            'stage': self.name,
+            'calls': self.calls,
+            'wall_seconds': round(self.wall_seconds, 6),
+            'cpu_seconds': round(self.cpu_seconds, 6),
+            'peak_rss_mb': round(self.peak_rss_mb, 2) if self.peak_rss_mb is not None else None,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'started_at': self.started_at,
+        }
+
+
+def _escape_label(value):
+    """Escape a Prometheus label value (backslash, double quote and newline)."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """
+    Collects StageRecords for the current process.
+
+    Stage names nest with dots: a `track_stage('sort')` inside `track_stage('sessionize_and_classify')`
+    is recorded as 'sessionize_and_classify.sort'. Entering a top-level stage again clears
+    its previous records, so the registry always shows the latest run of each stage.
+    """
+
+    def __init__(self):
+        self.records = {}
+        self.profiler = None
+        self.profile_dir = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def reset(self):
+        with self._lock:
+            self.records = {}
+
+    def enable_profiling(self, kind='cprofile', output_dir='.'):
+        """
+        Profile every top-level stage with cProfile ('cprofile') or pyinstrument ('pyinstrument').
+
+        Profiles are written to `output_dir` as <stage>.prof or <stage>.html.
+        """
+        if kind == 'pyinstrument':
+            import pyinstrument  # noqa: F401 -- fail early if the optional dependency is missing
+        elif kind not in ('cprofile', None):
+            raise ValueError(f"Unknown profiler: {kind}")
+        os.makedirs(output_dir, exist_ok=True)
+        self.profiler = kind
+        self.profile_dir = output_dir
+
+    def disable_profiling(self):
+        self.profiler = None
+
+    def _start_profiler(self):
+        if self.profiler == 'cprofile':
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+            return profiler
+        if self.profiler == 'pyinstrument':
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+        return None
+
+    def _stop_profiler(self, profiler, name):
+        if profiler is None:
+            return
+        if self.profiler == 'pyinstrument':
+            profiler.stop()
+            with open(os.path.join(self.profile_dir, f"{name}.html"), 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+        else:
+            profiler.disable()
+            profiler.dump_stats(os.path.join(self.profile_dir, f"{name}.prof"))
+
+    @contextmanager
+    def track(self, name):
+        stack = self._stack
+        full_name = '.'.join([s.name for s in stack[-1:]] + [name])
+        with self._lock:
+            if not stack:
+                self.records = {k: v for k, v in self.records.items() if k != name and not k.startswith(name + '.')}
+            record = self.records.setdefault(full_name, StageRecord(full_name))
+        if record.started_at is None:
+            record.started_at = datetime.now().isoformat(timespec='seconds')
+        profiler = self._start_profiler() if not stack else None
+        stack.append(record)
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall_seconds += time.perf_counter() - wall_start
+            record.cpu_seconds += time.process_time() - cpu_start
+            record.calls += 1
+            rss = peak_rss_mb()
+            if rss is not None:
+                record.peak_rss_mb = max(record.peak_rss_mb or 0.0, rss)
+            stack.pop()
+            self._stop_profiler(profiler, name)
+
+    def to_list(self):
+        return [record.to_dict() for record in self.records.values()]
+
+    def summary(self):
+        """Fixed-width text table of all records."""
+        header = f"{'Stage':<45}{'Calls':>6}{'Wall s':>10}{'CPU s':>10}{'Peak RSS MB':>13}{'Rows in':>12}{'Rows out':>12}{'MB read':>10}{'MB written':>12}"
+        lines = [header, '-' * len(header)]
+        for r in self.records.values():
+            rss = f"{r.peak_rss_mb:.1f}" if r.peak_rss_mb is not None else '-'
+            lines.append(
+                f"{r.name:<45}{r.calls:>6}{r.wall_seconds:>10.3f}{r.cpu_seconds:>10.3f}{rss:>13}"
+                f"{r.rows_in:>12}{r.rows_out:>12}{r.bytes_read / 2**20:>10.2f}{r.bytes_written / 2**20:>12.2f}"
+            )
+        return '\n'.join(lines)
+
+    def export_json(self, path):
+        with open(path, 'w') as f:
+            json.dump({'generated_at': datetime.now().isoformat(timespec='seconds'), 'stages': self.to_list()}, f, indent=2)
+        return path
+
+    def to_prometheus(self, prefix='pipeline_stage'):
+        """Metrics in the Prometheus text exposition format."""
+        metrics = [
+            ('calls_total', 'counter', 'Number of times the stage ran', 'calls', 1),
+            ('wall_seconds', 'gauge', 'Wall-clock time spent in the stage', 'wall_seconds', 1),
+            ('cpu_seconds', 'gauge', 'CPU time spent in the stage', 'cpu_seconds', 1),
+            ('peak_rss_bytes', 'gauge', 'Peak resident set size of the process at the end of the stage', 'peak_rss_mb', 2**20),
+            ('rows_in', 'gauge', 'Rows read by the stage', 'rows_in', 1),
+            ('rows_out', 'gauge', 'Rows produced by the stage', 'rows_out', 1),
+            ('bytes_read', 'gauge', 'Bytes read by the stage', 'bytes_read', 1),
+            ('bytes_written', 'gauge', 'Bytes written by the stage', 'bytes_written', 1),
+        ]
+        lines = []
+        for suffix, kind, help_text, attribute, scale in metrics:
+            lines.append(f"# HELP {prefix}_{suffix} {help_text}")
+            lines.append(f"# TYPE {prefix}_{suffix} {kind}")
+            for r in self.records.values():
+                value = getattr(r, attribute)
+                if value is not None:
+                    lines.append(f'{prefix}_{suffix}{{stage="{_escape_label(r.name)}"}} {value * scale:g}')
+        return '\n'.join(lines) + '\n'
+
+    def export_prometheus(self, path):
+        with open(path, 'w') as f:
+            f.write(self.to_prometheus())
+        return path
+
+
+METRICS = MetricsRegistry()
+
+
+def track_stage(name):
+    """
+    Context manager measuring wall time, CPU time and peak RSS of a stage or sub-step.
+
+    The yielded StageRecord can be updated with rows_in, rows_out, bytes_read and bytes_written.
+    """
+    return METRICS.track(name)
+
+
+def current_stage():
+    """StageRecord of the innermost running stage in this thread, or None outside any stage."""
+    stack = METRICS._stack
+    return stack[-1] if stack else None
+
+
+def instrumented(name):
+    """Decorator form of track_stage for whole stage functions."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track_stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_iter(iterable, name):
+    """Yield from an iterable (e.g. a chunked CSV reader), timing each `next()` as a sub-step."""
+    iterator = iter(iterable)
+    while True:
+        with track_stage(name) as stage:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                stage.calls -= 1  # the exhausted call is not a chunk
+                return
+            stage.rows_out += len(item) if hasattr(item, '__len__') else 0
+        yield item
@@ -1,40 +1,135 @@
-import pandas as pd
 import matplotlib.pyplot as plt
+import heapq
 import os
+import random
 
-def analyze_ltl_violations(input_file, report_dir, session_to_inspect="3560PL_6"):
-    os.makedirs(report_dir, exist_ok=True)
-    df = pd.read_csv(input_file)
+from event_store import filter_time_range, load_event_log
+from parallel_ltl import check_sessions
+from session_index import SessionIndex, open_session_index
+from session_traces import encode_traces
+from instrumentation import instrumented
 
-    ltl_property = "G !(Add_to_Cart ∧ X Add_to_Cart)"
 
-    # Event sequences by session
-    event_sequences = df.groupby('Session_ID')['Event'].apply(list).reset_index()
+def iter_consecutive_adds(sequence):
+    """Yield (index, event, next_event) for every Add_to_Cart directly followed by another Add_to_Cart."""
+    for i in range(len(sequence) - 1):
+        if sequence[i] == 'Add_to_Cart' and sequence[i + 1] == 'Add_to_Cart':
+            yield (i, sequence[i], sequence[i + 1])
 
-    # Save event_sequences for reference (optional)
-    event_sequences.to_csv(os.path.join(report_dir, 'event_sequences.csv'), index=False)
 
-    # LTL violation check function
-    def check_consecutive_adds(sequence):
-        return [(i, sequence[i], sequence[i+1]) for i in range(len(sequence)-1)
-                if sequence[i] == 'Add_to_Cart' and sequence[i+1] == 'Add_to_Cart']
+def check_consecutive_adds(sequence):
+    """All violations of G !(Add_to_Cart ∧ X Add_to_Cart) in one session."""
+    return list(iter_consecutive_adds(sequence))
 
-    # Session-specific inspection
-    inspect_sequence = df[df['Session_ID'] == session_to_inspect]['Event'].tolist()
-    inspect_violations = check_consecutive_adds(inspect_sequence)
 
-    # All sessions
-    all_violations = {
-        session: check_consecutive_adds(seq)
-        for session, seq in zip(event_sequences['Session_ID'], event_sequences['Event'])
-        if any(check_consecutive_adds(seq))
+def iter_violations(sessions, sequences, check=iter_consecutive_adds, first_n=None):
+    """
+    Stream the violating sessions, running the check once per session.
+
+    Args:
+        sessions (iterable): Session IDs.
+        sequences (iterable): Event list of each session, aligned with `sessions`.
+        check (callable): Generator of witnesses (violation tuples) for one sequence.
+        first_n (int, optional): Keep only the first n witnesses of each session.
+
+    Yields:
+        tuple: (session ID, list of kept witnesses, total number of witnesses).
+    """
+    for session, sequence in zip(sessions, sequences):
+        witnesses, count = [], 0
+        for witness in check(sequence):
+            count += 1
+            if first_n is None or count <= first_n:
+                witnesses.append(witness)
+        if count:
+            yield session, witnesses, count
+
+
+def summarize_violations(violations, top_k=10, sample_size=5, seed=0):
+    """
+    Reduce a stream of violations to bounded summaries.
+
+    Memory is O(top_k + sample_size) regardless of how many sessions violate the property.
+
+    Args:
+        violations (iterable): (session, witnesses, count) tuples, e.g. from iter_violations.
+        top_k (int): Number of sessions with the most violations to keep.
+        sample_size (int): Size of the uniform reservoir sample of violating sessions.
+        seed (int): Seed for the reservoir sample.
+
+    Returns:
+        dict: sessions (violating session count), witnesses (total violation count),
+            top (list of (session, count, witnesses), most violations first) and
+            sample (list of (session, count, witnesses)).
+    """
+    rng = random.Random(seed)
+    top, sample = [], []
+    sessions = witnesses_total = 0
+    for session, witnesses, count in violations:
+        # Ties keep the earliest sessions: a larger -position survives heappushpop
+        item = (count, -sessions, session, witnesses)
+        if len(top) < top_k:
+            heapq.heappush(top, item)
+        elif top_k:
+            heapq.heappushpop(top, item)
+        if len(sample) < sample_size:
+            sample.append((session, count, witnesses))
+        else:
+            j = rng.randint(0, sessions)
+            if j < sample_size:
+                sample[j] = (session, count, witnesses)
+        sessions += 1
+        witnesses_total += count
+    return {
+        'sessions': sessions,
+        'witnesses': witnesses_total,
+        'top': [(session, count, witnesses) for count, _, session, witnesses in sorted(top, reverse=True)],
+        'sample': sample,
     }
 
+
+def _format_witnesses(rows):
+    return '\n'.join(f"- {session}: {count} violation(s), e.g. {witnesses}" for session, count, witnesses in rows) or "- None"
+
+
+@instrumented('analyze_ltl_violations')
+def analyze_ltl_violations(input_file, report_dir, session_to_inspect="3560PL_6", time_range=None, index_dir=None, reader='pandas',
+                           parallel=False, workers=None, top_k=10, first_n=3, sample_size=5, seed=0):
+    os.makedirs(report_dir, exist_ok=True)
+    df = load_event_log(input_file, columns=['Session_ID', 'Event'], time_range=time_range, reader=reader)
+
+    ltl_property = "G !(Add_to_Cart ∧ X Add_to_Cart)"
+
+    # Session-specific inspection (index lookup avoids a full scan of the log)
+    if index_dir:
+        index = index_dir if isinstance(index_dir, SessionIndex) else open_session_index(index_dir)
+        session_rows = index.session_rows(session_to_inspect, columns=['TimeStamp', 'Event'])
+        inspect_sequence = filter_time_range(session_rows, time_range)['Event'].tolist()
+    else:
+        inspect_sequence = df[df['Session_ID'] == session_to_inspect]['Event'].tolist()
+    inspect_violations = check_consecutive_adds(inspect_sequence)
+
+    # All sessions (parallel mode checks integer traces in shared memory on a process pool,
+    # then extracts witnesses from the violating sessions only; it builds no per-session
+    # event lists, so the event_sequences.csv reference dump is skipped)
+    if parallel:
+        traces = encode_traces(df, with_timestamps=False)
+        total_sessions = len(traces)
+        violating = check_sessions(traces, 'repeated_event', 'Add_to_Cart', parallel=True, workers=workers).nonzero()[0]
+        violations = iter_violations(traces.session_ids[violating], (traces.sequence(p) for p in violating), first_n=first_n)
+    else:
+        # Event sequences by session, saved for reference (optional)
+        event_sequences = df.groupby('Session_ID')['Event'].apply(list).reset_index()
+        event_sequences.to_csv(os.path.join(report_dir, 'event_sequences.csv'), index=False)
+        total_sessions = len(event_sequences)
+        violations = iter_violations(event_sequences['Session_ID'], event_sequences['Event'], first_n=first_n)
+    summary = summarize_violations(violations, top_k=top_k, sample_size=sample_size, seed=seed)
+    violation_count = summary['sessions']
+
     # Plot
-    violation_count = len(all_violations)
     plt.figure(figsize=(6, 4))
     plt.bar(['Sessions with Violations', 'Sessions without Violations'],
-            [violation_count, len(event_sequences) - violation_count],
+            [violation_count, total_sessions - violation_count],
             color=['red', 'green'])
     plt.title('Sessions with Consecutive Add_to_Cart Violations')
     plt.ylabel('Number of Sessions')
@@ -47,7 +142,8 @@ def analyze_ltl_violations(input_file, report_dir, session_to_inspect="3560PL_6"
 ### LTL Property Checked
 - **Property**: {ltl_property}
 - **Session Analyzed**: {session_to_inspect}
-- **Total Sessions**: {len(event_sequences)}
+- **Time Range**: {time_range or 'All'}
+- **Total Sessions**: {total_sessions}
 - **Violations Found**: {violation_count}
 
 ### Example: {session_to_inspect}
@@ -56,6 +152,13 @@ def analyze_ltl_violations(input_file, report_dir, session_to_inspect="3560PL_6"
 
 ### Sessions with Violations:
 - Count: {violation_count}
+- Total Violations: {summary['witnesses']}
+
+### Top {top_k} Sessions by Violations (first {first_n} witnesses each):
+{_format_witnesses(summary['top'])}
+
+### Random Sample of Violating Sessions:
+{_format_witnesses(summary['sample'])}
 """
 
     return {
@@ -1,14 +1,28 @@
 # ltl_conversion_analysis.py
-import pandas as pd
 import matplotlib.pyplot as plt
 import os
 
-def analyze_ltl_conversion(file_path, report_dir):
-    df = pd.read_csv(file_path)
+from event_store import load_event_log
+from instrumentation import instrumented
+from parallel_ltl import check_sessions
+from session_traces import encode_traces
+
+@instrumented('analyze_ltl_conversion')
+def analyze_ltl_conversion(file_path, report_dir, time_range=None, reader='pandas', parallel=False, workers=None):
+    df = load_event_log(file_path, columns=['Session_ID', 'Event'], time_range=time_range, reader=reader)
 
     # Define LTL Property
     ltl_property = "G (Product_View → F Add_to_Cart)"
 
+    # Parallel mode: check integer traces in shared memory on a process pool (no per-session
+    # event lists are built, so the event_sequences_conversion.csv reference dump is skipped)
+    if parallel:
+        traces = encode_traces(df, with_timestamps=False)
+        with_product_view = check_sessions(traces, 'contains', 'Product_View')
+        violating = check_sessions(traces, 'response', 'Product_View', 'Add_to_Cart', parallel=True, workers=workers)
+        return _conversion_report(ltl_property, time_range, report_dir, int(with_product_view.sum()),
+                                  traces.session_ids[violating].tolist())
+
     # Prepare Event Sequences
     event_sequences = df.groupby('Session_ID')['Event'].apply(list).reset_index()
     output_csv = os.path.join(report_dir, "event_sequences_conversion.csv")
@@ -33,8 +47,12 @@ def analyze_ltl_conversion(file_path, report_dir):
         if not check_conversion_property(seq)
     }
 
-    violation_count = len(conversion_violations)
-    total_product_sessions = len(sessions_with_product_view)
+    return _conversion_report(ltl_property, time_range, report_dir, len(sessions_with_product_view),
+                              list(conversion_violations.keys()))
+
+
+def _conversion_report(ltl_property, time_range, report_dir, total_product_sessions, violation_sessions):
+    violation_count = len(violation_sessions)
 
     # Visualization
     plt.figure(figsize=(6, 4))
@@ -50,9 +68,10 @@ def analyze_ltl_conversion(file_path, report_dir):
     # Text Summary
     summary = (
         f"LTL Property: {ltl_property}\n"
+        f"Time Range: {time_range or 'All'}\n"
         f"Total Sessions with Product_View: {total_product_sessions}\n"
         f"Violations Found: {violation_count}\n"
-        f"Violation Session IDs (Sample): {list(conversion_violations.keys())[:5]}\n"
+        f"Violation Session IDs (Sample): {violation_sessions[:5]}\n"
     )
 
     return {
@@ -0,0 +1,236 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from event_store import load_event_log
+from instrumentation import instrumented
+from session_traces import SessionTraces, encode_traces
+
+_INTERVAL = re.compile(r'^\s*([\[(])\s*0\s*,\s*([^\])]+?)\s*([\])])\s*$')
+
+
+def parse_duration(text):
+    """Duration such as '5m', '2s', '500ms' or '1h' (or a number of seconds) in nanoseconds."""
+    if isinstance(text, (int, float)):
+        return int(text * 10**9)
+    return int(pd.Timedelta(text.strip()).value)
+
+
+def parse_interval(text):
+    """
+    Metric interval such as '[0,5m]', '(0,2s]' or '[0,5m)'.
+
+    Only intervals starting at 0 are supported. An open lower bound excludes events at the
+    same timestamp as the trigger; an open upper bound excludes events exactly at the bound.
+
+    Returns:
+        tuple: (upper bound in nanoseconds, lower_open, upper_open).
+    """
+    match = _INTERVAL.match(text)
+    if not match:
+        raise ValueError(f"Unsupported interval {text!r}: expected [0,<duration>] with [ or ( and ] or )")
+    return parse_duration(match.group(2)), match.group(1) == '(', match.group(3) == ')'
+
+
+def _interval(within):
+    """(upper, lower_open, upper_open) of an interval string, a duration string ([0,d]) or nanoseconds."""
+    if isinstance(within, tuple):
+        return within
+    if isinstance(within, str):
+        return parse_interval(within) if within.strip()[:1] in '[(' else (parse_duration(within), False, False)
+    return int(within), False, False
+
+
+def _within(delay, upper, upper_open):
+    return delay < upper if upper_open else delay <= upper
+
+
+def _time_ordered(traces):
+    """Traces whose rows are in timestamp order within every session (reordered only if needed)."""
+    ts = traces.timestamps
+    if ts is None:
+        raise ValueError("Metric temporal properties need traces encoded with timestamps")
+    session_of_row = traces.session_of_row
+    backwards = (np.diff(ts) < 0) & (session_of_row[1:] == session_of_row[:-1])
+    if not backwards.any():
+        return traces
+    order = np.lexsort((ts, session_of_row))
+    return SessionTraces(traces.session_ids, traces.event_names, traces.codes[order], traces.offsets,
+                         ts[order], traces.row_index[order] if traces.row_index is not None else None)
+
+
+def _next_occurrence(codes, code):
+    """Position of the next row at or after each row with the given code (len(codes) if none)."""
+    positions = np.where(codes == code, np.arange(len(codes)), len(codes))
+    return np.minimum.accumulate(positions[::-1])[::-1]
+
+
+def _session_end(traces):
+    return np.repeat(traces.offsets[1:], traces.lengths)
+
+
+def _first_later_row(traces):
+    """Position of the first row of the same session with a later timestamp (the session end if none)."""
+    distinct = np.unique(traces.timestamps)
+    # (session, timestamp rank) packed into one key that increases along the time-ordered trace
+    key = traces.session_of_row.astype(np.int64) * (len(distinct) + 1) + np.searchsorted(distinct, traces.timestamps)
+    return np.searchsorted(key, key, side='right')
+
+
+def bounded_response(traces, trigger, target, within):
+    """
+    Evaluate G (trigger → F[0,within] target) on every session.
+
+    Each trigger is matched to the next target in its session (from the first later
+    timestamp if the interval's lower bound is open); since timestamps are ordered within
+    a session, that is also the earliest one. The next-occurrence pointers are computed in
+    one backward pass, so cost is linear in the number of rows.
+
+    Args:
+        traces (SessionTraces): Traces encoded with timestamps.
+        trigger (str): Event that must be answered.
+        target (str): Event that has to follow within the bound.
+        within (str, int or tuple): Interval ('[0,5m)'), upper bound of [0,d] ('5m') or
+            nanoseconds, or a parse_interval tuple.
+
+    Returns:
+        pd.DataFrame: Per session: Session_ID, triggers, unanswered (triggers without a
+            timely target) and violated.
+    """
+    traces = _time_ordered(traces)
+    upper, lower_open, upper_open = _interval(within)
+    trigger_code, target_code = traces.code_of(trigger), traces.code_of(target)
+    is_trigger = traces.codes == trigger_code if trigger_code >= 0 else np.zeros(len(traces.codes), dtype=bool)
+
+    unanswered = is_trigger.copy()
+    if target_code >= 0 and len(traces.codes):
+        next_target = np.append(_next_occurrence(traces.codes, target_code), len(traces.codes))
+        rows = np.flatnonzero(is_trigger)
+        start = _first_later_row(traces)[rows] if lower_open else rows
+        candidate = next_target[start]
+        found = candidate < _session_end(traces)[rows]
+        answered, candidate = rows[found], candidate[found]
+        timely = _within(traces.timestamps[candidate] - traces.timestamps[answered], upper, upper_open)
+        unanswered[answered[timely]] = False
+    return _per_session(traces, is_trigger, unanswered, 'triggers', 'unanswered')
+
+
+def bounded_absence(traces, trigger, forbidden, within):
+    """
+    Evaluate G (trigger → G(0,within] ¬forbidden) on every session.
+
+    With trigger == forbidden this flags repeats of an event within a short time, e.g.
+    two Add_to_Cart requests within 2 seconds (double clicks or bots). Only the next
+    forbidden event after each trigger (the trigger itself excluded, and events at its
+    timestamp too if the lower bound is open) has to be inspected, so cost is linear.
+
+    Args:
+        within (str, int or tuple): As for bounded_response.
+
+    Returns:
+        pd.DataFrame: Per session: Session_ID, triggers, followed (triggers followed by the
+            forbidden event within the bound) and violated.
+    """
+    traces = _time_ordered(traces)
+    upper, lower_open, upper_open = _interval(within)
+    trigger_code, forbidden_code = traces.code_of(trigger), traces.code_of(forbidden)
+    is_trigger = traces.codes == trigger_code if trigger_code >= 0 else np.zeros(len(traces.codes), dtype=bool)
+
+    followed = np.zeros(len(traces.codes), dtype=bool)
+    if forbidden_code >= 0 and len(traces.codes) > 1:
+        next_forbidden = np.append(_next_occurrence(traces.codes, forbidden_code), len(traces.codes))
+        rows = np.flatnonzero(is_trigger)
+        # Strictly after the trigger: look up the next occurrence from the following row
+        start = _first_later_row(traces)[rows] if lower_open else rows + 1
+        candidate = next_forbidden[start]
+        found = candidate < _session_end(traces)[rows]
+        hits, candidate = rows[found], candidate[found]
+        soon = _within(traces.timestamps[candidate] - traces.timestamps[hits], upper, upper_open)
+        followed[hits[soon]] = True
+    return _per_session(traces, is_trigger, followed, 'triggers', 'followed')
+
+
+def _per_session(traces, is_trigger, failed, trigger_column, failed_column):
+    session_of_row = traces.session_of_row
+    triggers = np.bincount(session_of_row, weights=is_trigger, minlength=len(traces)).astype(np.int64)
+    failures = np.bincount(session_of_row, weights=failed, minlength=len(traces)).astype(np.int64)
+    return pd.DataFrame({
+        'Session_ID': traces.session_ids,
+        trigger_column: triggers,
+        failed_column: failures,
+        'violated': failures > 0,
+    })
+
+
+@instrumented('analyze_mtl_properties')
+def analyze_mtl_properties(file_path, report_dir, response_window="[0,5m]", repeat_window="(0,2s]",
+                           time_range=None, reader='pandas'):
+    """
+    Check time-bounded (metric temporal) properties on every session.
+
+    - G (Product_View → F[0,5m] Add_to_Cart): product views followed by an add within the window.
+    - G (Add_to_Cart → G(0,2s] ¬Add_to_Cart): no second add within the window (double-click / bot signal).
+
+    Args:
+        file_path (str): Event log CSV or partitioned store.
+        report_dir (str): Directory for the plot and per-session results.
+        response_window (str): Interval of the response property, e.g. '[0,5m]'.
+        repeat_window (str): Interval of the repeat property, e.g. '(0,2s]' (repeats at the same
+            timestamp are not counted; '[0,2s]' counts them).
+        time_range (tuple, optional): (start, end) to restrict the analysis to.
+        reader (str): CSV reader backend, 'pandas' or 'pyarrow'.
+
+    Returns:
+        dict: visualizations and textual_data for the UI.
+    """
+    os.makedirs(report_dir, exist_ok=True)
+    df = load_event_log(file_path, columns=['Session_ID', 'TimeStamp', 'Event'], time_range=time_range, reader=reader)
+    traces = encode_traces(df)
+
+    response_property = f"G (Product_View → F{response_window} Add_to_Cart)"
+    repeat_property = f"G (Add_to_Cart → G{repeat_window} ¬Add_to_Cart)"
+    response = bounded_response(traces, 'Product_View', 'Add_to_Cart', parse_interval(response_window))
+    repeat = bounded_absence(traces, 'Add_to_Cart', 'Add_to_Cart', parse_interval(repeat_window))
+
+    response = response[response['triggers'] > 0]
+    repeat = repeat[repeat['triggers'] > 0]
+    response.to_csv(os.path.join(report_dir, 'mtl_response_by_session.csv'), index=False)
+    repeat.to_csv(os.path.join(report_dir, 'mtl_repeat_by_session.csv'), index=False)
+
+    response_violations = int(response['violated'].sum())
+    repeat_violations = int(repeat['violated'].sum())
+
+    # Visualization
+    plt.figure(figsize=(7, 4))
+    labels = [f"Product_View → F{response_window}", f"Add_to_Cart repeat {repeat_window}"]
+    plt.bar(labels, [response_violations, repeat_violations], color='red', label='Violating sessions')
+    plt.bar(labels, [len(response) - response_violations, len(repeat) - repeat_violations],
+            bottom=[response_violations, repeat_violations], color='green', label='Satisfying sessions')
+    plt.title('Time-Bounded Property Violations')
+    plt.ylabel('Number of Sessions')
+    plt.legend()
+    img_path = os.path.join(report_dir, "mtl_violation_distribution.png")
+    plt.savefig(img_path)
+    plt.close()
+
+    summary = (
+        f"Time Range: {time_range or 'All'}\n\n"
+        f"MTL Property: {response_property}\n"
+        f"Sessions with Product_View: {len(response)}\n"
+        f"Product views without Add_to_Cart in time: {int(response['unanswered'].sum())} of {int(response['triggers'].sum())}\n"
+        f"Violations Found: {response_violations}\n"
+        f"Violation Session IDs (Sample): {response.loc[response['violated'], 'Session_ID'].head(5).tolist()}\n\n"
+        f"MTL Property: {repeat_property}\n"
+        f"Sessions with Add_to_Cart: {len(repeat)}\n"
+        f"Add_to_Cart repeated within the window: {int(repeat['followed'].sum())} of {int(repeat['triggers'].sum())}\n"
+        f"Violations Found: {repeat_violations}\n"
+        f"Violation Session IDs (Sample): {repeat.loc[repeat['violated'], 'Session_ID'].head(5).tolist()}\n"
+    )
+
+    return {
+        "visualizations": {"MTL Violation Distribution": img_path},
+        "textual_data": {"LTL Analysis": summary}
+    }
@@ -0,0 +1,137 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def repeated_event(codes, offsets, event):
+    """
+    Sessions violating G !(event ∧ X event): the event occurs twice in a row.
+
+    Args:
+        codes (np.ndarray): Event codes of a contiguous range of sessions.
+        offsets (np.ndarray): Session starts within `codes` (starting at 0) plus the end offset.
+        event (int): Event code (-1 if the event never occurs).
+
+    Returns:
+        np.ndarray: Boolean violation flag per session.
+    """
+    violated = np.zeros(len(offsets) - 1, dtype=bool)
+    if event < 0 or len(codes) < 2:
+        return violated
+    hit = (codes[:-1] == event) & (codes[1:] == event)
+    # Pairs that straddle two sessions do not count
+    hit[offsets[1:-1] - 1] = False
+    positions = np.flatnonzero(hit)
+    violated[np.searchsorted(offsets, positions, side='right') - 1] = True
+    return violated
+
+
+def response(codes, offsets, trigger, target):
+    """
+    Sessions violating G (trigger → F target): some trigger is not followed by the target.
+
+    That is the case exactly when the last trigger comes after the last target.
+    """
+    if trigger < 0 or len(codes) == 0:
+        return np.zeros(len(offsets) - 1, dtype=bool)
+    positions = np.arange(len(codes))
+    last_trigger = np.maximum.reduceat(np.where(codes == trigger, positions, -1), offsets[:-1])
+    last_target = np.maximum.reduceat(np.where(codes == target, positions, -1), offsets[:-1])
+    return last_trigger > last_target
+
+
+def contains(codes, offsets, event):
+    """Sessions in which the event occurs at least once."""
+    if event < 0 or len(codes) == 0:
+        return np.zeros(len(offsets) - 1, dtype=bool)
+    return np.maximum.reduceat(codes == event, offsets[:-1])
+
+
+CHECKS = {
+    'repeated_event': repeated_event,
+    'response': response,
+    'contains': contains,
+}
+
+
+def _split_sessions(offsets, parts):
+    """Cut the sessions into up to `parts` contiguous ranges with roughly equal event counts."""
+    targets = np.linspace(0, offsets[-1], parts + 1)
+    bounds = np.unique(np.searchsorted(offsets, targets))
+    bounds[0], bounds[-1] = 0, len(offsets) - 1
+    return np.unique(bounds)
+
+
+def _attach(name, length, dtype):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray((length,), dtype=dtype, buffer=shm.buf)
+
+
+def _check_range(codes_block, offsets_block, first, last, check, args):
+    """Worker: run a check over sessions [first, last) of the shared traces, returning a packed bitmap."""
+    codes_shm, codes = _attach(*codes_block)
+    offsets_shm, offsets = _attach(*offsets_block)
+    try:
+        start, end = offsets[first], offsets[last]
+        local_offsets = offsets[first:last + 1] - start
+        violated = CHECKS[check](codes[start:end], local_offsets, *args)
+        return first, last, np.packbits(violated)
+    finally:
+        del codes, offsets
+        codes_shm.close()
+        offsets_shm.close()
+
+
+def _to_shared(array):
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+    return shm
+
+
+def check_sessions(traces, check, *events, parallel=False, workers=None, chunks_per_worker=4):
+    """
+    Evaluate a per-session check over encoded traces, optionally on a process pool.
+
+    In parallel mode the codes and offsets are placed in shared memory once; every worker
+    attaches to them, checks a contiguous range of sessions and sends back a packed
+    violation bitmap, so no event lists are pickled.
+
+    Args:
+        traces (session_traces.SessionTraces): Encoded event log.
+        check (str): Name of a check in CHECKS ('repeated_event', 'response', 'contains').
+        *events (str): Event names the check takes (e.g. trigger and target for 'response').
+        parallel (bool): Use a process pool instead of checking in-process.
+        workers (int, optional): Number of worker processes; os.cpu_count() by default.
+        chunks_per_worker (int): Session ranges per worker, for load balancing.
+
+    Returns:
+        np.ndarray: Boolean flag per session, aligned with traces.session_ids.
+    """
+    if check not in CHECKS:
+        raise ValueError(f"Unknown check: {check} (expected one of {list(CHECKS)})")
+    args = tuple(traces.code_of(event) for event in events)
+    codes, offsets = np.ascontiguousarray(traces.codes), np.ascontiguousarray(traces.offsets)
+    workers = workers or os.cpu_count() or 1
+    if not parallel or len(traces) == 0:
+        return CHECKS[check](codes, offsets, *args)
+
+    bounds = _split_sessions(offsets, workers * chunks_per_worker)
+    codes_shm, offsets_shm = _to_shared(codes), _to_shared(offsets)
+    try:
+        codes_block = (codes_shm.name, len(codes), codes.dtype.str)
+        offsets_block = (offsets_shm.name, len(offsets), offsets.dtype.str)
+        violated = np.zeros(len(traces), dtype=bool)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_check_range, codes_block, offsets_block, int(first), int(last), check, args)
+                       for first, last in zip(bounds[:-1], bounds[1:])]
+            for future in futures:
+                first, last, bitmap = future.result()
+                violated[first:last] = np.unpackbits(bitmap, count=last - first).astype(bool)
+        return violated
+    finally:
+        codes_shm.close()
+        codes_shm.unlink()
+        offsets_shm.close()
+        offsets_shm.unlink()
@@ -0,0 +1,308 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from event_store import load_event_log
+from session_traces import encode_traces
+
+TRIE_FILE = "session_paths.npz"
+
+
+def _smallest_uint(values):
+    """`values` in the narrowest unsigned dtype that holds them (for compact files)."""
+    top = int(values.max()) if len(values) else 0
+    return values.astype(np.min_scalar_type(top))
+
+
+class PathTrie:
+    """
+    Prefix trie of session event sequences with a session count at every node.
+
+    Node 0 is the root (all sessions); a node at depth d stands for the first d events of
+    the sessions passing through it. Nodes are stored level by level, each level sorted by
+    (parent, event), so a node's children are one contiguous, event-sorted slice: finding
+    a path is one binary search per step, and the structure is fully described by each
+    node's event, number of children and count, which is what `save` writes.
+
+    Attributes:
+        event_names (list): Event name for each code.
+        parent (np.ndarray): Parent node of every node (-1 for the root).
+        event (np.ndarray): Event code of every node (-1 for the root).
+        count (np.ndarray): Sessions whose path starts with the node's prefix.
+        child_start (np.ndarray): Start of each node's children, plus a final end offset.
+        level_offsets (np.ndarray): Start of each depth's nodes, plus a final end offset.
+    """
+
+    def __init__(self, event_names, event, degree, count):
+        self.event_names = list(event_names)
+        self.event = np.asarray(event, dtype=np.int32)
+        self.count = np.asarray(count, dtype=np.int64)
+        degree = np.asarray(degree, dtype=np.int64)
+        self.child_start = np.concatenate(([1], 1 + np.cumsum(degree))).astype(np.int64)
+        self.parent = np.concatenate(([-1], np.repeat(np.arange(len(degree)), degree))).astype(np.int64)
+        levels = [0, 1]
+        while levels[-1] < len(self.event):
+            levels.append(int(self.child_start[levels[-1]]))
+        self.level_offsets = np.array(levels, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.event)
+
+    @property
+    def degree(self):
+        return np.diff(self.child_start)
+
+    @property
+    def ends(self):
+        """Sessions whose path ends exactly at each node."""
+        children = np.bincount(self.parent[1:], weights=self.count[1:], minlength=len(self)).astype(np.int64)
+        return self.count - children
+
+    @classmethod
+    def from_levels(cls, event_names, levels):
+        """
+        Build from per-depth node lists.
+
+        Args:
+            event_names (list): Event names.
+            levels (list): For each depth >= 1, a tuple (parent, event, count) of arrays, sorted by
+                (parent, event), with parents indexing the previous levels' nodes.
+        """
+        n_nodes = 1 + sum(len(parent) for parent, _, _ in levels)
+        degree = np.zeros(n_nodes, dtype=np.int64)
+        events, counts = [np.array([-1])], [np.array([0])]
+        for parent, event, count in levels:
+            np.add.at(degree, parent, 1)
+            events.append(event)
+            counts.append(count)
+        count = np.concatenate(counts).astype(np.int64)
+        if levels:
+            count[0] = levels[0][2].sum()
+        return cls(event_names, np.concatenate(events), degree, count)
+
+    @classmethod
+    def from_traces(cls, traces, max_depth=None):
+        """
+        Build the trie of encoded session traces, one vectorized pass per depth.
+
+        Args:
+            traces (session_traces.SessionTraces): Encoded event log.
+            max_depth (int, optional): Keep only the first `max_depth` events of each session (longer
+                sessions then count as ending at that depth).
+
+        Missing events (code -1) are skipped, as in sequence mining; sessions without any
+        coded event are left out.
+        """
+        n_items = max(len(traces.event_names), 1)
+        valid = traces.codes >= 0
+        codes = traces.codes[valid]
+        offsets = np.concatenate(([0], np.cumsum(valid)))[traces.offsets]
+        lengths = np.diff(offsets)
+        sessions = np.flatnonzero(lengths > 0)
+        node_of = np.zeros(len(sessions), dtype=np.int64)
+        levels, first_id, depth = [], 1, 0
+        while len(sessions) and (max_depth is None or depth < max_depth):
+            step = codes[offsets[sessions] + depth].astype(np.int64)
+            keys, inverse, counts = np.unique(node_of * n_items + step, return_inverse=True, return_counts=True)
+            levels.append((keys // n_items, keys % n_items, counts))
+            node_of = first_id + inverse
+            first_id += len(keys)
+            depth += 1
+            alive = lengths[sessions] > depth
+            sessions, node_of = sessions[alive], node_of[alive]
+        trie = cls.from_levels(traces.event_names, levels)
+        trie.count[0] = int(np.count_nonzero(lengths > 0))
+        return trie
+
+    def find(self, path):
+        """Node of an event path (list of names) from the root, or -1 if no session starts with it."""
+        node = 0
+        for name in path:
+            try:
+                code = self.event_names.index(name)
+            except ValueError:
+                return -1
+            start, end = self.child_start[node], self.child_start[node + 1]
+            position = start + np.searchsorted(self.event[start:end], code)
+            if position >= end or self.event[position] != code:
+                return -1
+            node = int(position)
+        return node
+
+    def prefix_count(self, path):
+        """Number of sessions that start with the given events."""
+        node = self.find(path)
+        return int(self.count[node]) if node >= 0 else 0
+
+    def path_of(self, node):
+        """Event names from the root to `node`."""
+        path = []
+        while node > 0:
+            path.append(self.event_names[self.event[node]])
+            node = self.parent[node]
+        return path[::-1]
+
+    def continuations(self, path=(), k=5):
+        """
+        Most common next events after a path.
+
+        Returns:
+            pd.DataFrame: Event, Sessions and Share (of the sessions at the path), plus an
+                '(exit)' row for the sessions that end there; at most k + 1 rows.
+        """
+        node = self.find(path)
+        if node < 0:
+            return pd.DataFrame({'Event': [], 'Sessions': [], 'Share': []})
+        start, end = self.child_start[node], self.child_start[node + 1]
+        children = np.arange(start, end)
+        top = children[np.argsort(-self.count[children], kind='stable')[:k]]
+        total = self.count[node]
+        exits = total - self.count[children].sum()
+        result = pd.DataFrame({
+            'Event': [self.event_names[code] for code in self.event[top]] + ['(exit)'],
+            'Sessions': np.append(self.count[top], exits),
+        })
+        result['Share'] = (result['Sessions'] / max(total, 1)).round(4)
+        return result
+
+    def drop_off(self, path=None):
+        """
+        Sessions reaching and leaving each depth, overall or along one path.
+
+        Args:
+            path (list, optional): Follow this path instead of aggregating all nodes of a depth.
+
+        Returns:
+            pd.DataFrame: Depth, Sessions (reaching it), Ended (stopping there) and Drop_Off_Rate.
+        """
+        ends = self.ends
+        if path is None:
+            depth_of = np.repeat(np.arange(len(self.level_offsets) - 1), np.diff(self.level_offsets))
+            reached = np.bincount(depth_of, weights=self.count).astype(np.int64)
+            ended = np.bincount(depth_of, weights=ends).astype(np.int64)
+            reached[0] = self.count[0]
+        else:
+            nodes = [0]
+            for step in range(1, len(path) + 1):
+                node = self.find(path[:step])
+                if node < 0:
+                    break
+                nodes.append(node)
+            reached, ended = self.count[nodes], ends[nodes]
+        result = pd.DataFrame({'Depth': np.arange(len(reached)), 'Sessions': reached, 'Ended': ended})
+        result['Drop_Off_Rate'] = np.where(reached > 0, ended / np.maximum(reached, 1), 0.0).round(4)
+        return result
+
+    def top_paths(self, k=10):
+        """Most common complete session paths (Path as a tuple of event names, Sessions)."""
+        ends = self.ends
+        ends[0] = 0
+        top = np.argsort(-ends, kind='stable')[:k]
+        top = top[ends[top] > 0]
+        return pd.DataFrame({'Path': [tuple(self.path_of(node)) for node in top], 'Sessions': ends[top]})
+
+    def _levels(self, names):
+        """Per-depth (parent, event code in `names`, count) arrays, for merging."""
+        remap = np.array([names.index(name) for name in self.event_names] or [0], dtype=np.int64)
+        return [(self.parent[start:end], remap[self.event[start:end]], self.count[start:end])
+                for start, end in zip(self.level_offsets[1:-1], self.level_offsets[2:])]
+
+    def merge(self, other):
+        """
+        Trie of the sessions of both tries (e.g. two days of logs).
+
+        Both tries are walked level by level: each node is keyed by (merged parent, event),
+        identical keys are combined and their counts added.
+
+        Returns:
+            PathTrie: A new trie.
+        """
+        names = self.event_names + [name for name in other.event_names if name not in self.event_names]
+        n_items = max(len(names), 1)
+        ours, theirs = self._levels(names), other._levels(names)
+        # Merged id of every node of each trie, filled in level by level (root -> 0)
+        our_ids, their_ids = np.zeros(len(self), dtype=np.int64), np.zeros(len(other), dtype=np.int64)
+        levels, first_id = [], 1
+        for depth in range(max(len(ours), len(theirs))):
+            parts, sizes = [], []
+            for trie_levels, ids in ((ours, our_ids), (theirs, their_ids)):
+                if depth < len(trie_levels):
+                    parent, event, count = trie_levels[depth]
+                    parts.append((ids[parent] * n_items + event, count))
+                    sizes.append(len(parent))
+                else:
+                    sizes.append(0)
+            keys = np.concatenate([key for key, _ in parts])
+            counts = np.concatenate([count for _, count in parts])
+            unique, inverse = np.unique(keys, return_inverse=True)
+            levels.append((unique // n_items, unique % n_items, np.bincount(inverse, weights=counts).astype(np.int64)))
+            if sizes[0]:
+                start = self.level_offsets[depth + 1]
+                our_ids[start:start + sizes[0]] = first_id + inverse[:sizes[0]]
+            if sizes[1]:
+                start = other.level_offsets[depth + 1]
+                their_ids[start:start + sizes[1]] = first_id + inverse[sizes[0]:]
+            first_id += len(unique)
+        merged = PathTrie.from_levels(names, levels)
+        merged.count[0] = self.count[0] + other.count[0]
+        return merged
+
+    def save(self, path):
+        """Write the trie as event codes, child counts and session counts in the narrowest integer types."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(path, event_names=np.asarray(self.event_names, dtype=str),
+                            event=_smallest_uint(self.event[1:]), degree=_smallest_uint(self.degree),
+                            count=_smallest_uint(self.count))
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            event = np.concatenate(([-1], data['event'].astype(np.int32)))
+            return cls(data['event_names'].tolist(), event, data['degree'], data['count'])
+
+
+def analyze_paths(file_path, report_dir, max_depth=None, top=10, merge_with=None):
+    """
+    Most common session paths, drop-off by depth and next steps after the most common entries.
+
+    Args:
+        file_path (str): Path to the event logs CSV file or partitioned event store.
+        report_dir (str): Directory to save the trie (session_paths.npz) and drop-off table.
+        max_depth (int, optional): Only index the first `max_depth` events of each session.
+        top (int): Paths and continuations listed in the report.
+        merge_with (str, optional): Saved trie (e.g. earlier days) to merge this log into.
+
+    Returns:
+        dict: textual_data and report_path (the saved trie), as produced by the other analysis modules.
+    """
+    os.makedirs(report_dir, exist_ok=True)
+    df = load_event_log(file_path, columns=['Session_ID', 'Event'])
+    trie = PathTrie.from_traces(encode_traces(df, with_timestamps=False), max_depth=max_depth)
+    if merge_with and os.path.exists(merge_with):
+        trie = PathTrie.load(merge_with).merge(trie)
+    trie_path = trie.save(os.path.join(report_dir, TRIE_FILE))
+
+    drop_off = trie.drop_off()
+    drop_off.to_csv(os.path.join(report_dir, "path_drop_off.csv"), index=False)
+    paths = trie.top_paths(top)
+    entries = trie.continuations((), k=3)
+    sections = []
+    for entry in entries['Event']:
+        if entry != '(exit)':
+            sections.append(f"After {entry}:\n{trie.continuations([entry], k=top).to_string(index=False)}")
+
+    summary = (
+        f"Sessions: {trie.count[0]}, distinct path prefixes: {len(trie) - 1}\n\n"
+        f"Top {top} Session Paths:\n"
+        + "\n".join(f"- {' → '.join(path)}: {sessions} sessions" for path, sessions in paths.itertuples(index=False))
+        + f"\n\nDrop-off by Depth:\n{drop_off.head(top + 1).to_string(index=False)}\n\n"
+        + "\n\n".join(sections) + "\n"
+    )
+    return {
+        "textual_data": {
+            "Session Paths": summary
+        },
+        "report_path": trie_path
+    }
@@ -0,0 +1,110 @@
+import os
+
+import preprocess_data
+import transform_to_events
+import analyse_other_actions
+import event_mapping
+import rollup_cube
+import user_agents
+from instrumentation import instrumented
+from request_filters import STATIC_EXTENSIONS
+
+CHECKPOINTS = ('processed', 'events', 'refined')
+
+
+@instrumented('run_pipeline')
+def run_pipeline(input_file, output_dir, report_dir, use_refined=True, checkpoints=(), chunksize=None,
+                 reader='pandas', workers=4, sketches=None, store_dir=None, index_dir=None, log=None,
+                 exclude_extensions=STATIC_EXTENSIONS, backend='pandas', bot_detector=None,
+                 cube_path=None, ua_table_path=None, drop_user_agent=False, user_agent_report=True):
+    """
+    Run preprocessing, sessionization, reclassification and event mapping as one fused pass.
+
+    The stages hand DataFrames to each other instead of writing and re-reading CSV files:
+    the raw logs are loaded once and only the final mapped event log (plus the reports) is
+    written. Intermediate CSVs are optional checkpoints.
+
+    Args:
+        input_file (str or list): Raw log file(s), as accepted by preprocess_logs.
+        output_dir (str): Directory for the output (and checkpoint) CSV files.
+        report_dir (str): Directory for visualizations and reports.
+        use_refined (bool): Reclassify Other_Action events before mapping.
+        checkpoints (iterable): Intermediate outputs to also write: 'processed' (processed_data.csv),
+            'events' (event_logs.csv) and/or 'refined' (event_logs_refined.csv).
+        chunksize (int, optional): Raw rows per chunk during preprocessing.
+        reader (str): CSV reader backend for the raw logs, 'pandas' or 'pyarrow'.
+        workers (int): Files read ahead in parallel for multi-file or compressed input.
+        sketches (sketches.LogSketches, optional): Summary sketches updated along the way.
+        store_dir (str, optional): Also write partitioned stores of the event logs under this directory.
+        index_dir (str, optional): Also build the session index in this directory.
+        log (callable, optional): Progress callback taking a message string.
+        exclude_extensions (iterable, optional): URL extensions of static asset requests dropped while
+            reading the raw logs; None keeps every request.
+        backend (str): Sessionization backend, 'pandas' or 'duckdb'.
+        bot_detector (bot_detection.RequestRateDetector, optional): Request-rate bot filter applied
+            while preprocessing.
+        cube_path (str, optional): Rollup cube (rollup_cube.RollupCube) file to add the mapped events to;
+            defaults to rollup_cube.parquet in output_dir and is created if missing. Input files already
+            in the cube are not added again.
+        ua_table_path (str, optional): User-Agent dimension table (user_agents.UserAgentTable) the mapped
+            event log's UA_Code column refers to; defaults to user_agents.parquet in output_dir.
+        drop_user_agent (bool): Write only UA_Code, not the raw User_Agent strings, to the mapped event
+            log (smaller, but the strings are then only in the dimension table).
+        user_agent_report (bool): Also break sessions down by device, browser and OS
+            (user_agents.analyze_user_agents) into report_dir.
+
+    Returns:
+        dict: outputs (the map_event_to_proposition result tuple), refined_viz (path of the
+            reclassification chart, or None), checkpoints (name -> path of each checkpoint written)
+            and user_agents (the analyze_user_agents result, or None).
+    """
+    checkpoints = set(checkpoints)
+    unknown = checkpoints - set(CHECKPOINTS)
+    if unknown:
+        raise ValueError(f"Unknown checkpoints: {sorted(unknown)} (expected any of {CHECKPOINTS})")
+    log = log or (lambda message: None)
+    written = {}
+
+    log("Preprocessing raw logs")
+    processed, _ = preprocess_data.preprocess_logs(input_file, output_dir, chunksize=chunksize, sketches=sketches,
+                                                   workers=workers, reader=reader, in_memory=True,
+                                                   checkpoint='processed' in checkpoints,
+                                                   exclude_extensions=exclude_extensions, bot_detector=bot_detector)
+    if 'processed' in checkpoints:
+        written['processed'] = os.path.join(output_dir, "processed_data.csv")
+
+    log(f"Sessionizing {len(processed)} requests")
+    events = transform_to_events.sessionize_and_classify(processed, output_dir, sketches=sketches, store_dir=store_dir,
+                                                         index_dir=index_dir, in_memory=True,
+                                                         checkpoint='events' in checkpoints, backend=backend)
+    del processed
+    if 'events' in checkpoints:
+        written['events'] = os.path.join(output_dir, "event_logs.csv")
+
+    refined_viz = None
+    if use_refined:
+        log("Reclassifying Other_Action events")
+        events, refined_viz = analyse_other_actions.reclassify_events(events, output_dir, report_dir, in_memory=True,
+                                                                      checkpoint='refined' in checkpoints)
+        if 'refined' in checkpoints:
+            written['refined'] = os.path.join(output_dir, "event_logs_refined.csv")
+
+    # The mapped event log carries UA_Code next to (or, if asked, instead of) the raw User-Agent strings
+    log("Encoding User-Agents")
+    ua_table = user_agents.UserAgentTable(ua_table_path or os.path.join(output_dir, user_agents.UA_TABLE_FILE))
+    events = user_agents.join_user_agents(events, ua_table, columns=[], keep_user_agent=not drop_user_agent)
+    if ua_table.parsed:
+        ua_table.save()
+
+    cube = rollup_cube.RollupCube(cube_path or os.path.join(output_dir, rollup_cube.CUBE_FILE))
+    log("Mapping events to propositions")
+    outputs = event_mapping.map_event_to_proposition(events, output_dir, report_dir, use_refined=use_refined,
+                                                     store_dir=store_dir, cube=cube,
+                                                     cube_source=rollup_cube.source_key(input_file))
+    cube.save()
+
+    user_agent_result = None
+    if user_agent_report:
+        log("Breaking sessions down by device, browser and OS")
+        user_agent_result = user_agents.analyze_user_agents(events, report_dir, table_path=ua_table)
+    return {'outputs': outputs, 'refined_viz': refined_viz, 'checkpoints': written, 'user_agents': user_agent_result}
@@ -3,50 +3,48 @@ from datetime import datetime
 import logging
 import os,time
 
+from ingest import RAW_COLUMNS, RAW_DTYPES, expand_sources, is_plain_csv, iter_raw_chunks, read_csv_chunks
+from request_filters import STATIC_EXTENSIONS, filter_requests
+from instrumentation import get_stage_logger, instrumented, current_stage, track_stage, timed_iter, file_size
 
-def preprocess_logs(input_file, output_dir=r"D:\MAJOR PROJECT\User behaviour analysis using server logs\data\processed_logs"):
+logger = logging.getLogger(__name__)
+
+
+def clean_raw_chunk(df, log_samples=False, exclude_extensions=STATIC_EXTENSIONS, bot_detector=None):
     """
-    Preprocess raw server logs by cleaning and filtering data.
+    Clean one chunk of raw server logs: drop static asset requests, convert timestamps,
+    rename columns, drop bot traffic (by UserAgent and, optionally, by request rate) and
+    keep only successful responses.
     
     Args:
-        input_file (str): Path to the input CSV file (e.g., eclog_1day.csv).
-        output_dir (str): Directory to save the processed output.
+        df (pd.DataFrame): Raw rows with the eclog columns.
+        log_samples (bool): Whether to log sample timestamps and bot UserAgents for this chunk.
+        exclude_extensions (iterable, optional): URL extensions of non-user requests to drop before
+            any other processing; None keeps every request.
+        bot_detector (bot_detection.RequestRateDetector, optional): Updated with the chunk's requests;
+            rows of the IPs it has flagged are dropped.
     
     Returns:
-        tuple: (Path to the output CSV file (processed_data.csv), Time taken in seconds).
+        tuple: (Cleaned DataFrame, dict of row counts at each filtering step).
     """
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Set up logging
-    log_file = os.path.join(output_dir, "preprocess.log")
-    logging.basicConfig(filename=log_file, level=logging.INFO, format='%(asctime)s - %(message)s')
-    
-    # Start timing
-    start_time = time.time()
-    
-    # Define output file path
-    output_file = os.path.join(output_dir, "processed_data.csv")
-    
-    # Load dataset
-    try:
-        df = pd.read_csv(input_file)
-        logging.info(f"Loaded {len(df)} rows from {input_file}")
-    except Exception as e:
-        logging.error(f"Failed to load CSV: {e}")
-        raise
+    counts = {'loaded': len(df)}
     
     # Validate data
     if df['IpId'].isnull().any() or df['TimeStamp'].isnull().any():
-        logging.error("Missing IpId or TimeStamp values")
+        logger.error("Missing IpId or TimeStamp values")
         raise ValueError("Missing IpId or TimeStamp values")
     
+    # Drop images, stylesheets and scripts first so no later step touches them
+    df, counts['static'] = filter_requests(df, 'Uri', exclude_extensions)
+    counts['after_static'] = len(df)
+    
     # Convert Windows Timestamp to readable format (UTC)
     try:
         df['TimeStamp'] = pd.to_datetime(df['TimeStamp'].apply(lambda x: (x - 621355968000000000) / 10**7), unit='s', utc=True)
-        logging.info(f"Sample timestamps:\n{df['TimeStamp'].head(5)}")
+        if log_samples:
+            logger.debug(f"Sample timestamps:\n{df['TimeStamp'].head(5)}")
     except Exception as e:
-        logging.error(f"Timestamp conversion failed: {e}")
+        logger.error(f"Timestamp conversion failed: {e}")
         raise
     
     # Rename columns for clarity
@@ -62,33 +60,138 @@ def preprocess_logs(input_file, output_dir=r"D:\MAJOR PROJECT\User behaviour ana
         'UserAgent': 'User_Agent'
     }, inplace=True)
     
-    # Remove unnecessary columns
-    df.drop(columns=['HTTP_Version', 'User_ID'], inplace=True)
+    # Remove unnecessary columns (the pyarrow reader never parses them)
+    df.drop(columns=['HTTP_Version', 'User_ID'], inplace=True, errors='ignore')
     
     # Filter out bot traffic
     bot_keywords = ['bot', 'crawler', 'spider', 'SemrushBot']
     bot_mask = df['User_Agent'].str.lower().str.contains('|'.join(bot_keywords), na=False)
-    bot_rows = df[bot_mask]
-    logging.info(f"Rows flagged as bots: {len(bot_rows)}")
-    logging.info(f"Sample bot UserAgents:\n{bot_rows['User_Agent'].head(5)}")
+    counts['bots'] = int(bot_mask.sum())
+    if log_samples:
+        logger.debug(f"Sample bot UserAgents:\n{df.loc[bot_mask, 'User_Agent'].head(5)}")
     df = df[~bot_mask]
-    logging.info(f"Rows after bot filtering: {len(df)}")
+    counts['after_bots'] = len(df)
+    
+    # Filter out IPs whose request rate or timing looks automated, whatever their UserAgent
+    if bot_detector is not None and not df.empty:
+        keep = bot_detector.update(df)
+        df = df[keep]
+    counts['rate_bots'] = counts['after_bots'] - len(df)
+    counts['after_rate_bots'] = len(df)
     
     # Filter for successful responses
     df = df[df['Response'] == 200]
-    logging.info(f"Rows after filtering Response == 200: {len(df)}")
+    counts['after_response'] = len(df)
     
-    # Save cleaned dataset
-    try:
-        df.to_csv(output_file, index=False)
-        logging.info(f"Saved cleaned data to {output_file}")
-    except Exception as e:
-        logging.error(f"Failed to save CSV: {e}")
-        raise
+    return df, counts
+
+
+@instrumented('preprocess_logs')
+def preprocess_logs(input_file, output_dir=r"D:\MAJOR PROJECT\User behaviour analysis using server logs\data\processed_logs", chunksize=None, sketches=None, verbose=False, workers=4, reader='pandas',
+                    in_memory=False, checkpoint=False, exclude_extensions=STATIC_EXTENSIONS, bot_detector=None):
+    """
+    Preprocess raw server logs by cleaning and filtering data.
+    
+    Args:
+        input_file (str or list): Path to the input CSV file (e.g., eclog_1day.csv), or a glob, directory or
+            list of (gzip/zstd/bz2/xz compressed) log files to ingest together.
+        output_dir (str): Directory to save the processed output.
+        chunksize (int, optional): Process the file in chunks of this many rows instead of loading it whole.
+        sketches (sketches.LogSketches, optional): Summary sketches updated with every cleaned chunk.
+        verbose (bool): Log sample timestamps and bot UserAgents from the first chunk.
+        workers (int): Files decompressed and parsed ahead in parallel when ingesting several or compressed files.
+        reader (str): CSV reader backend: 'pandas' (default) or 'pyarrow', which parses memory-mapped files with
+            multiple threads, skips HttpVersion and UserId at parse time and uses explicit column types.
+        in_memory (bool): Return the cleaned DataFrame instead of a path (for the fused pipeline).
+        checkpoint (bool): In memory mode, still write processed_data.csv.
+        exclude_extensions (iterable, optional): URL extensions of static asset requests (images, CSS, JS)
+            dropped from each chunk right after it is read; None keeps every request.
+        bot_detector (bot_detection.RequestRateDetector, optional): Behavioral bot filter run over the
+            chunks in order; the IPs it flags are dropped from the chunk they are flagged in onwards and
+            listed in rate_flagged_ips.csv.
+    
+    Returns:
+        tuple: (Path to the output CSV file (processed_data.csv), or the cleaned DataFrame when
+            in_memory, Time taken in seconds).
+    """
+    # Create output directory if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Set up logging
+    log_file = os.path.join(output_dir, "preprocess.log")
+    get_stage_logger(__name__, log_file, level=logging.DEBUG if verbose else logging.INFO)
+    stage = current_stage()
+    
+    # Start timing
+    start_time = time.time()
+    
+    # Define output file path
+    output_file = os.path.join(output_dir, "processed_data.csv")
+    
+    # Load dataset
+    columns = RAW_COLUMNS if reader == 'pyarrow' else None
+    def read_chunks():
+        try:
+            if not is_plain_csv(input_file):
+                yield from iter_raw_chunks(input_file, chunksize=chunksize or 100_000, workers=workers,
+                                           reader=reader, columns=columns, dtypes=RAW_DTYPES)
+            else:
+                yield from read_csv_chunks(input_file, reader, chunksize, columns, RAW_DTYPES)
+        except Exception as e:
+            logger.error(f"Failed to load CSV: {e}")
+            raise
+    
+    write_output = not in_memory or checkpoint
+    frames = []
+    totals = {'loaded': 0, 'static': 0, 'after_static': 0, 'bots': 0, 'after_bots': 0, 'rate_bots': 0,
+              'after_rate_bots': 0, 'after_response': 0}
+    for i, chunk in enumerate(timed_iter(read_chunks(), 'load')):
+        with track_stage('clean') as step:
+            step.rows_in += len(chunk)
+            df, counts = clean_raw_chunk(chunk, log_samples=(i == 0 and logger.isEnabledFor(logging.DEBUG)),
+                                         exclude_extensions=exclude_extensions, bot_detector=bot_detector)
+            step.rows_out += len(df)
+        for key, value in counts.items():
+            totals[key] += value
+        if sketches is not None:
+            sketches.update_requests(df)
+        if in_memory:
+            frames.append(df)
+        if not write_output:
+            continue
+        
+        # Save cleaned dataset (append every chunk after the first)
+        with track_stage('save') as step:
+            step.rows_in += len(df)
+            try:
+                df.to_csv(output_file, index=False, mode='w' if i == 0 else 'a', header=(i == 0))
+            except Exception as e:
+                logger.error(f"Failed to save CSV: {e}")
+                raise
+    
+    logger.info(f"Loaded {totals['loaded']} rows from {input_file}")
+    logger.info(f"Static asset requests dropped: {totals['static']}")
+    logger.info(f"Rows flagged as bots: {totals['bots']}")
+    logger.info(f"Rows after bot filtering: {totals['after_bots']}")
+    if bot_detector is not None:
+        flagged = bot_detector.report()
+        flagged.to_csv(os.path.join(output_dir, "rate_flagged_ips.csv"), index=False)
+        logger.info(f"IPs flagged by request rate: {len(flagged)} ({totals['rate_bots']} rows dropped)")
+    logger.info(f"Rows after filtering Response == 200: {totals['after_response']}")
+    if write_output:
+        logger.info(f"Saved cleaned data to {output_file}")
+    if sketches is not None:
+        logger.info(f"Unique IPs (approx.): {sketches.ips.count()}")
+    
+    stage.rows_in, stage.rows_out = totals['loaded'], totals['after_response']
+    stage.bytes_read = sum(file_size(path) for path in expand_sources(input_file))
+    stage.bytes_written = file_size(output_file) if write_output else 0
     
     # End timing
     end_time = time.time()
     duration = end_time - start_time
-    logging.info(f"Preprocessing completed in {duration:.2f} seconds")
+    logger.info(f"Preprocessing completed in {duration:.2f} seconds")
     
+    if in_memory:
+        return (pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()), duration
     return output_file, duration
\ No newline at end of file
@@ -0,0 +1,178 @@
+import html
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
+
+from PIL import Image
+
+ASSET_DIR_NAME = "report_assets"
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='report')
+
+
+def image_size(path):
+    """
+    (width, height) of an image in pixels, read from the file header.
+
+    PNG dimensions come straight from the IHDR chunk; other formats fall back to PIL,
+    which also only parses the header until pixel data is requested.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(24)
+    if head[:8] == PNG_SIGNATURE and head[12:16] == b'IHDR':
+        return struct.unpack('>II', head[16:24])
+    with Image.open(path) as img:
+        return img.size
+
+
+def downscaled_image(path, asset_dir, max_width=1600):
+    """
+    Downscaled copy of an image for embedding in reports, created once per source version.
+
+    The copy is written to `asset_dir` as <name>_<max_width>px.png and only rebuilt when the
+    source is newer. Images already narrower than `max_width` are returned unchanged.
+
+    Returns:
+        str: Path to the image to embed.
+    """
+    width, height = image_size(path)
+    if width <= max_width:
+        return path
+    os.makedirs(asset_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    target = os.path.join(asset_dir, f"{stem}_{max_width}px.png")
+    if os.path.isfile(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+        return target
+    with Image.open(path) as img:
+        img = img.resize((max_width, max(1, round(height * max_width / width))), Image.LANCZOS, reducing_gap=3.0)
+        # Write to a temporary name first so a concurrent reader never sees a partial file
+        img.save(target + '.tmp', format='PNG', optimize=True)
+    os.replace(target + '.tmp', target)
+    return target
+
+
+def _text_blocks(text, markdown=False):
+    """Split text into blank-line separated blocks, dropping markdown headers if requested."""
+    lines = [line.rstrip() for line in text.splitlines() if not (markdown and line.startswith('#'))]
+    blocks, current = [], []
+    for line in lines:
+        if line.strip():
+            current.append(line.strip())
+        elif current:
+            blocks.append(current)
+            current = []
+    if current:
+        blocks.append(current)
+    return blocks
+
+
+def build_pdf_report(sections, pdf_path, title="User Behavior Analysis Report", asset_dir=None, max_image_px=1600):
+    """
+    Write a PDF report from a list of sections.
+
+    Each section is a dict with a 'title' and any of 'image' (path), 'text' and 'markdown'
+    (bool, drop '#' header lines). Images are embedded as cached downscaled variants sized
+    from their headers, and each text block becomes a single Paragraph instead of one per line.
+
+    Args:
+        sections (list): Report sections in order.
+        pdf_path (str): Output PDF path.
+        title (str): Document title.
+        asset_dir (str, optional): Where downscaled images are cached; next to the PDF by default.
+        max_image_px (int): Width of the downscaled images (about 250 dpi at 6.5 inches).
+
+    Returns:
+        dict: pdf_path, images (embedded) and missing (image paths that did not exist).
+    """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as ReportLabImage
+
+    asset_dir = asset_dir or os.path.join(os.path.dirname(os.path.abspath(pdf_path)), ASSET_DIR_NAME)
+    styles = getSampleStyleSheet()
+    elements = [Paragraph(escape(title), styles['Heading1']), Spacer(1, 0.2 * inch)]
+    embedded, missing = [], []
+    max_width, max_height = 6.5 * inch, 8 * inch
+
+    for section in sections:
+        elements.append(Paragraph(escape(section['title']), styles['Heading2']))
+        image = section.get('image')
+        if image:
+            if os.path.exists(image):
+                image = downscaled_image(image, asset_dir, max_image_px)
+                width, height = image_size(image)
+                scale = min(max_width / width, max_height / height)
+                elements.append(ReportLabImage(image, width=width * scale, height=height * scale))
+                embedded.append(image)
+            else:
+                missing.append(image)
+        if section.get('text'):
+            for block in _text_blocks(section['text'], section.get('markdown', False)):
+                elements.append(Paragraph('<br/>'.join(escape(line) for line in block), styles['Normal']))
+                elements.append(Spacer(1, 0.08 * inch))
+        elements.append(Spacer(1, 0.2 * inch))
+
+    SimpleDocTemplate(pdf_path, pagesize=letter).build(elements)
+    return {'pdf_path': pdf_path, 'images': embedded, 'missing': missing}
+
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <title>{title}</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 20px; }}
+        h1 {{ color: #333; text-align: center; }}
+        h2 {{ color: #555; }}
+        table {{ border-collapse: collapse; width: 100%; margin: 20px 0; }}
+        th, td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
+        th {{ background-color: #f2f2f2; font-weight: bold; }}
+        tr:nth-child(even) {{ background-color: #f9f9f9; }}
+        img {{ max-width: 100%; height: auto; display: block; margin: 20px auto; }}
+        pre {{ background-color: #f9f9f9; padding: 10px; border: 1px solid #ddd; }}
+    </style>
+</head>
+<body>
+    <h1>{title}</h1>
+{body}
+</body>
+</html>
+"""
+
+
+def build_html_report(sections, html_path, title="User Behavior Analysis Report", asset_dir=None, max_image_px=1600):
+    """
+    Write an HTML report from the same sections as build_pdf_report.
+
+    Sections may additionally carry raw 'html' (tables, iframes). Images link to the same
+    cached downscaled variants the PDF embeds, with their width and height from the header.
+
+    Returns:
+        str: Path to the HTML file.
+    """
+    report_dir = os.path.dirname(os.path.abspath(html_path))
+    asset_dir = asset_dir or os.path.join(report_dir, ASSET_DIR_NAME)
+    parts = []
+    for section in sections:
+        parts.append(f"    <h2>{html.escape(section['title'])}</h2>")
+        if section.get('html'):
+            parts.append(section['html'])
+        image = section.get('image')
+        if image and os.path.exists(image):
+            image = downscaled_image(image, asset_dir, max_image_px)
+            width, height = image_size(image)
+            src = os.path.relpath(image, report_dir).replace(os.sep, '/')
+            parts.append(f'    <img src="{html.escape(src)}" width="{width}" height="{height}" alt="{html.escape(section["title"])}">')
+        if section.get('text'):
+            parts.append(f"    <pre>{html.escape(section['text'])}</pre>")
+    with open(html_path, 'w', encoding='utf-8') as f:
+        f.write(HTML_TEMPLATE.format(title=html.escape(title), body='\n'.join(parts)))
+    return html_path
+
+
+def run_in_background(func, *args, **kwargs):
+    """Run a report build on the background report thread; returns a concurrent.futures.Future."""
+    return _executor.submit(func, *args, **kwargs)
@@ -0,0 +1,59 @@
+import posixpath
+
+import numpy as np
+import pandas as pd
+
+# Requests for these resources are page assets fetched by the browser, not user actions
+STATIC_EXTENSIONS = frozenset({'.jpg', '.png', '.gif', '.css', '.js'})
+
+
+def url_extension(url):
+    """
+    Lowercased file extension of a URL's last path segment ('' if there is none).
+
+    The query string and fragment are ignored, so '/img/logo.PNG?v=3' gives '.png'.
+    """
+    path = url.split('?', 1)[0].split('#', 1)[0]
+    return posixpath.splitext(path.rsplit('/', 1)[-1])[1].lower()
+
+
+def extension_mask(urls, extensions=STATIC_EXTENSIONS):
+    """
+    Boolean mask of the URLs whose extension is in `extensions`.
+
+    URLs repeat heavily in server logs, so the extension is extracted and looked up in
+    the hash set once per distinct URL and the result broadcast back through the codes.
+    Missing URLs never match.
+
+    Args:
+        urls (pd.Series): URLs to test.
+        extensions (iterable): Lowercase extensions including the dot.
+
+    Returns:
+        np.ndarray: Boolean mask aligned with `urls`.
+    """
+    extensions = frozenset(extensions)
+    codes, uniques = pd.factorize(urls)
+    matches = np.fromiter((isinstance(url, str) and url_extension(url) in extensions for url in uniques),
+                          dtype=bool, count=len(uniques))
+    # Append a False slot so the -1 code of missing URLs maps to "no match"
+    return np.append(matches, False)[codes]
+
+
+def filter_requests(df, column='Page_URL', exclude_extensions=STATIC_EXTENSIONS):
+    """
+    Drop requests for static assets (images, stylesheets, scripts) from a DataFrame.
+
+    Args:
+        df (pd.DataFrame): Requests.
+        column (str): URL column ('Uri' for raw eclog rows, 'Page_URL' after renaming).
+        exclude_extensions (iterable, optional): Extensions to drop; nothing is dropped if empty or None.
+
+    Returns:
+        tuple: (Filtered DataFrame, number of rows removed).
+    """
+    if not exclude_extensions or df.empty:
+        return df, 0
+    mask = extension_mask(df[column], exclude_extensions)
+    removed = int(mask.sum())
+    return (df[~mask] if removed else df), removed
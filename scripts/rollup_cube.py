@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import matplotlib.pyplot as plt
+
+from event_store import filter_time_range
+from ingest import expand_sources
+from transform_to_events import get_domain
+
+CUBE_FILE = "rollup_cube.parquet"
+# Dimensions of the cube, besides the minute bucket; Referrer_Domain and Country are derived
+CUBE_DIMENSIONS = ['Event', 'Event_Type', 'Main_Category', 'Response', 'Referrer_Domain', 'Country']
+MEASURES = ['Count', 'Bytes_Sent']
+# Breakdowns of the traffic summary and their headings
+SUMMARY_BREAKDOWNS = {'Country': 'Countries', 'Referrer_Domain': 'Referrer Domains', 'Response': 'Response Codes'}
+
+
+def _per_distinct(values, func):
+    """Apply `func` once per distinct value and broadcast the results back."""
+    codes, uniques = pd.factorize(values)
+    mapped = np.array([func(value) for value in uniques] + [func(None)], dtype=object)
+    return mapped[codes]
+
+
+def _country(ip):
+    """Country code suffix of an anonymized eclog IP id ('10001PL' -> 'PL')."""
+    if not isinstance(ip, str):
+        return ''
+    suffix = len(ip) - len(ip.rstrip('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'))
+    return ip[len(ip) - suffix:].upper()
+
+
+def rollup(df, freq='1min'):
+    """
+    Aggregate an event log to request counts and Bytes_Sent sums per time bucket and dimensions.
+
+    Dimensions missing from the log (e.g. Event_Type and Main_Category before event mapping)
+    are left empty (NA).
+
+    Args:
+        df (pd.DataFrame): Event log with TimeStamp and any of Event, Event_Type, Main_Category,
+            Response, Referrer_URL, IP and Bytes_Sent.
+        freq (str): Bucket size.
+
+    Returns:
+        pd.DataFrame: Minute, the CUBE_DIMENSIONS, Count and Bytes_Sent; one row per non-empty cell.
+    """
+    keys = pd.DataFrame({'Minute': pd.to_datetime(df['TimeStamp'], utc=True).dt.floor(freq).array})
+    for column in ('Event', 'Event_Type', 'Main_Category', 'Response'):
+        keys[column] = df[column].to_numpy() if column in df.columns else None
+    keys['Referrer_Domain'] = _per_distinct(df['Referrer_URL'], get_domain) if 'Referrer_URL' in df.columns else None
+    keys['Country'] = _per_distinct(df['IP'], _country) if 'IP' in df.columns else None
+    keys['Count'] = 1
+    keys['Bytes_Sent'] = df['Bytes_Sent'].to_numpy(dtype=np.int64) if 'Bytes_Sent' in df.columns else 0
+    return _aggregate(keys)
+
+
+def _aggregate(cells):
+    """Sum the measures of identical cells, keeping NA dimension values."""
+    for column in CUBE_DIMENSIONS:
+        if column != 'Response':
+            cells[column] = cells[column].astype(object)
+    cells['Response'] = cells['Response'].astype('Int64')
+    grouped = cells.groupby(['Minute'] + CUBE_DIMENSIONS, dropna=False, sort=True)[MEASURES].sum()
+    return grouped.reset_index()
+
+
+def source_key(sources):
+    """Identify log files by path, modification time and size, so re-processing one is detected."""
+    keys = []
+    for path in expand_sources(sources):
+        stat = os.stat(path)
+        keys.append(f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}")
+    return '|'.join(keys)
+
+
+def content_key(sources, block_size=1 << 20):
+    """
+    Identify log files by a hash of their contents, so a rewritten copy of the same logs
+    (e.g. an event log derived again from the same raw logs) is recognised as already added.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path in expand_sources(sources):
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+    return f"content:{digest.hexdigest()}"
+
+
+class RollupCube:
+    """
+    Per-minute request counts and Bytes_Sent sums by Event, Event_Type, Main_Category,
+    Response, referrer domain and IP country.
+
+    The cube is a few thousand rows per day of logs however many requests there were, so
+    dashboard counts and coarser time series are group-bys over it instead of passes over
+    the event log. It is kept in a Parquet file and grows incrementally: `update` folds in
+    the rows of newly processed logs, and skips sources it has already seen.
+    """
+
+    def __init__(self, path=None, freq='1min'):
+        self.path = path
+        self.freq = freq
+        self.sources = []
+        self.cube = None
+        if path and os.path.exists(path):
+            stored = pq.read_table(path)
+            metadata = json.loads((stored.schema.metadata or {}).get(b'rollup_cube', b'{}'))
+            self.freq = metadata.get('freq', freq)
+            self.sources = metadata.get('sources', [])
+            self.cube = _aggregate(stored.to_pandas())
+        if self.cube is None:
+            self.cube = rollup(pd.DataFrame({'TimeStamp': pd.Series([], dtype='datetime64[ns, UTC]')}), self.freq)
+
+    def __len__(self):
+        return len(self.cube)
+
+    def update(self, df, source=None):
+        """
+        Add an event log (or a chunk of one) to the cube.
+
+        Args:
+            df (pd.DataFrame): Event log rows, as accepted by `rollup`.
+            source (str, optional): Key of the input the rows come from (see `source_key` and `content_key`); if it
+                was already added the rows are skipped.
+
+        Returns:
+            bool: Whether the rows were added.
+        """
+        if source is not None:
+            if source in self.sources:
+                return False
+            self.sources.append(source)
+        if len(df):
+            self.cube = _aggregate(pd.concat([self.cube, rollup(df, self.freq)], ignore_index=True))
+        return True
+
+    def save(self, path=None):
+        """Write the cube to `path` (default: the path it was loaded from)."""
+        path = path or self.path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        table = pa.Table.from_pandas(self.cube, preserve_index=False)
+        metadata = json.dumps({'freq': self.freq, 'sources': self.sources}).encode()
+        pq.write_table(table.replace_schema_metadata({**(table.schema.metadata or {}), b'rollup_cube': metadata}), path)
+        return path
+
+    def query(self, by=(), freq=None, time_range=None, where=None):
+        """
+        Counts and Bytes_Sent sums grouped by dimensions and, optionally, coarser time buckets.
+
+        Args:
+            by (list): Dimensions to group by.
+            freq (str, optional): Time bucket (e.g. '1h'), added as the Minute column.
+            time_range (tuple, optional): (start, end); buckets starting in [start, end) are used.
+            where (dict, optional): Dimension -> value or list of values to keep.
+
+        Returns:
+            pd.DataFrame: Group columns, Count and Bytes_Sent.
+        """
+        cube = filter_time_range(self.cube, time_range, 'Minute')
+        for column, values in (where or {}).items():
+            values = values if isinstance(values, (list, tuple, set)) else [values]
+            cube = cube[cube[column].isin(list(values))]
+        keys = list(by)
+        if freq:
+            cube = cube.assign(Minute=cube['Minute'].dt.floor(freq))
+            keys = ['Minute'] + keys
+        if not keys:
+            return cube[MEASURES].sum().to_frame().T
+        return cube.groupby(keys, dropna=False, sort=True)[MEASURES].sum().reset_index()
+
+    def counts(self, dimension, time_range=None, where=None):
+        """
+        Requests per value of `dimension`, most frequent first (like value_counts, NA excluded).
+
+        Returns:
+            pd.Series: Counts indexed by dimension value.
+        """
+        result = self.query([dimension], time_range=time_range, where=where).dropna(subset=[dimension])
+        counts = result.set_index(dimension)['Count'].rename('count')
+        return counts.sort_values(ascending=False, kind='stable')
+
+
+def traffic_summary(cube, report_dir, freq='1h', time_range=None, top=5):
+    """
+    Requests over time by Event_Type and headline traffic statistics, all answered from the cube.
+
+    Args:
+        cube (RollupCube or str): Cube or path of a saved cube.
+        report_dir (str): Directory to save the chart.
+        freq (str): Time bucket of the chart.
+        time_range (tuple, optional): (start, end) range to summarize.
+        top (int): Rows shown per breakdown.
+
+    Returns:
+        dict: visualizations and textual_data, as produced by the other analysis modules.
+    """
+    cube = cube if isinstance(cube, RollupCube) else RollupCube(cube)
+    os.makedirs(report_dir, exist_ok=True)
+
+    series = cube.query(['Event_Type'], freq=freq, time_range=time_range)
+    if series.empty:
+        return {
+            "visualizations": {},
+            "textual_data": {"Traffic Summary": f"No data in the cube for time range {time_range or 'All'}\n"}
+        }
+    series['Event_Type'] = series['Event_Type'].fillna('Unmapped')
+    timeline = series.pivot_table(index='Minute', columns='Event_Type', values='Count', aggfunc='sum', fill_value=0)
+    img_path = os.path.join(report_dir, 'traffic_over_time.png')
+    ax = timeline.plot(kind='area', stacked=True, figsize=(10, 5), linewidth=0)
+    ax.set_title(f'Requests per {freq} by Event Type')
+    ax.set_xlabel('Time (UTC)')
+    ax.set_ylabel('Requests')
+    plt.tight_layout()
+    plt.savefig(img_path)
+    plt.close()
+
+    totals = cube.query(time_range=time_range)
+    lines = [f"Requests: {int(totals['Count'].iloc[0])}", f"Bytes sent: {int(totals['Bytes_Sent'].iloc[0])}"]
+    for dimension, heading in SUMMARY_BREAKDOWNS.items():
+        counts = cube.counts(dimension, time_range=time_range).head(top)
+        lines.append(f"\nTop {heading}:")
+        lines.extend(f"- {value if value != '' else '(none)'}: {count}" for value, count in counts.items())
+    return {
+        "visualizations": {"Traffic Over Time": img_path},
+        "textual_data": {"Traffic Summary": "\n".join(lines) + "\n"}
+    }
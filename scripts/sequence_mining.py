@@ -0,0 +1,214 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from event_store import load_event_log
+from parallel_ltl import _attach, _to_shared
+from session_traces import SessionTraces, encode_traces
+
+
+def collapse_repeats(traces):
+    """
+    Traces with runs of the same event merged into one step (A, A, B -> A, B).
+
+    Returns:
+        SessionTraces: New traces without timestamps; row_index points at each run's first row.
+    """
+    codes, offsets = traces.codes, traces.offsets
+    keep = np.ones(len(codes), dtype=bool)
+    keep[1:] = codes[1:] != codes[:-1]
+    keep[offsets[:-1][traces.lengths > 0]] = True
+    kept_before = np.concatenate(([0], np.cumsum(keep)))
+    row_index = traces.row_index[keep] if traces.row_index is not None else None
+    return SessionTraces(traces.session_ids, traces.event_names, codes[keep], kept_before[offsets], None, row_index)
+
+
+def _item_positions(codes, n_items):
+    """Sorted flat positions of every event code (negative codes, i.e. missing events, are skipped)."""
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(n_items + 1))
+    return [order[bounds[i]:bounds[i + 1]] for i in range(n_items)]
+
+
+def _project(positions, sessions, starts, ends):
+    """
+    First occurrence of an item at or after each session's start position.
+
+    Returns:
+        tuple: (mask of the sessions where the item occurs before the session ends, its positions).
+    """
+    if len(positions) == 0:
+        return np.zeros(len(sessions), dtype=bool), starts
+    k = np.searchsorted(positions, starts)
+    found = k < len(positions)
+    following = positions[np.minimum(k, len(positions) - 1)]
+    found &= following < ends[sessions]
+    return found, following
+
+
+def _grow(prefix, sessions, starts, candidates, items, positions, ends, min_count, max_length, patterns):
+    """
+    Depth-first PrefixSpan over a pseudo-projected database: the sessions containing `prefix`
+    and, for each, the position right after the prefix's earliest match. `candidates` are the
+    events tried at this level, `items` those tried below it.
+    """
+    for item in candidates:
+        found, following = _project(positions[item], sessions, starts, ends)
+        support = int(np.count_nonzero(found))
+        if support < min_count:
+            continue
+        pattern = prefix + (int(item),)
+        patterns.append((pattern, support))
+        if len(pattern) < max_length:
+            _grow(pattern, sessions[found], following[found] + 1, items, items, positions, ends,
+                  min_count, max_length, patterns)
+
+
+def _mine(codes, offsets, firsts, items, n_items, min_count, max_length):
+    """All frequent patterns starting with one of `firsts`, as a list of (code tuple, support)."""
+    patterns = []
+    _grow((), np.arange(len(offsets) - 1), offsets[:-1], firsts, items, _item_positions(codes, n_items),
+          offsets[1:], min_count, max_length, patterns)
+    return patterns
+
+
+def _mine_shared(codes_block, offsets_block, first, items, n_items, min_count, max_length):
+    """Worker: mine the patterns of one first event from the shared traces."""
+    codes_shm, codes = _attach(*codes_block)
+    offsets_shm, offsets = _attach(*offsets_block)
+    try:
+        return _mine(codes, offsets, [first], items, n_items, min_count, max_length)
+    finally:
+        del codes, offsets
+        codes_shm.close()
+        offsets_shm.close()
+
+
+def mine_sequences(traces, min_support=0.01, max_length=4, parallel=False, workers=None):
+    """
+    Frequent sequential patterns (PrefixSpan) of the session traces.
+
+    A pattern is an ordered list of events occurring in a session in that order, not
+    necessarily next to each other; its support is the number of sessions containing it.
+    Projected databases are kept as (session, position) arrays over the flat integer codes,
+    and each extension is a vectorized searchsorted in the extending event's position list.
+    Extensions below the minimum support are pruned, as all their super-patterns are too.
+
+    In parallel mode the traces go to shared memory once and every frequent first event is
+    mined by a separate worker process.
+
+    Args:
+        traces (session_traces.SessionTraces): Encoded event log.
+        min_support (float or int): Minimum support, as a fraction of sessions (< 1) or a session count.
+        max_length (int): Longest pattern to mine.
+        parallel (bool): Mine the first events on a process pool.
+        workers (int, optional): Number of worker processes; os.cpu_count() by default.
+
+    Returns:
+        pd.DataFrame: Pattern (tuple of event names), Length, Support, Support_Pct and Confidence
+            (support relative to the pattern without its last event, or to all sessions for single
+            events), most supported first.
+    """
+    n_sessions = len(traces)
+    min_count = max(1, int(np.ceil(min_support * n_sessions)) if min_support < 1 else int(min_support))
+    codes, offsets = np.ascontiguousarray(traces.codes), np.ascontiguousarray(traces.offsets)
+
+    # Sessions containing each event, to prune infrequent events up front
+    n_items = len(traces.event_names)
+    valid = codes >= 0
+    pairs = np.unique(traces.session_of_row[valid].astype(np.int64) * n_items + codes[valid])
+    item_support = np.bincount(pairs % max(n_items, 1), minlength=n_items)
+    items = [int(item) for item in np.argsort(-item_support, kind='stable') if item_support[item] >= min_count]
+
+    patterns = []
+    if items and parallel:
+        codes_shm, offsets_shm = _to_shared(codes), _to_shared(offsets)
+        try:
+            codes_block = (codes_shm.name, len(codes), codes.dtype.str)
+            offsets_block = (offsets_shm.name, len(offsets), offsets.dtype.str)
+            with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+                futures = [executor.submit(_mine_shared, codes_block, offsets_block, first, items, n_items,
+                                           min_count, max_length)
+                           for first in items]
+                for future in futures:
+                    patterns.extend(future.result())
+        finally:
+            codes_shm.close()
+            codes_shm.unlink()
+            offsets_shm.close()
+            offsets_shm.unlink()
+    elif items:
+        patterns = _mine(codes, offsets, items, items, n_items, min_count, max_length)
+
+    support_of = dict(patterns)
+    names = traces.event_names
+    result = pd.DataFrame({
+        'Pattern': [tuple(names[code] for code in pattern) for pattern, _ in patterns],
+        'Length': np.array([len(pattern) for pattern, _ in patterns], dtype=np.int64),
+        'Support': np.array([support for _, support in patterns], dtype=np.int64),
+    })
+    base = np.array([support_of[pattern[:-1]] if len(pattern) > 1 else n_sessions for pattern, _ in patterns], dtype=np.float64)
+    result['Support_Pct'] = (result['Support'] / max(n_sessions, 1) * 100).round(2)
+    result['Confidence'] = (result['Support'] / np.maximum(base, 1)).round(4)
+    result['_key'] = [' → '.join(pattern) for pattern in result['Pattern']]
+    result = result.sort_values(['Support', 'Length', '_key'], ascending=[False, True, True], ignore_index=True)
+    return result.drop(columns='_key')
+
+
+def _format_patterns(patterns, limit):
+    if patterns.empty:
+        return "No patterns above the minimum support\n"
+    lines = [f"- {' → '.join(row.Pattern)}: {row.Support} sessions ({row.Support_Pct}%), confidence {row.Confidence:.2f}"
+             for row in patterns.head(limit).itertuples(index=False)]
+    return "\n".join(lines) + "\n"
+
+
+def analyze_sequences(file_path, report_dir, min_support=0.01, max_length=4, target='Add_to_Cart', top=10,
+                      collapse=True, parallel=False, workers=None):
+    """
+    Frequent multi-step navigation patterns, and those leading to and away from a target event.
+
+    Args:
+        file_path (str): Path to the (refined) event logs CSV file or partitioned event store.
+        report_dir (str): Directory to save frequent_sequences.csv.
+        min_support (float or int): Minimum support (fraction of sessions or session count).
+        max_length (int): Longest pattern to mine.
+        target (str): Event whose preceding and following patterns are reported.
+        top (int): Patterns listed per section of the report.
+        collapse (bool): Treat repeats of the same event in a row as one navigation step.
+        parallel (bool): Mine on a process pool, split by first event.
+        workers (int, optional): Number of worker processes.
+
+    Returns:
+        dict: textual_data and report_path, as produced by the other analysis modules.
+    """
+    os.makedirs(report_dir, exist_ok=True)
+    df = load_event_log(file_path, columns=['Session_ID', 'Event'])
+    traces = encode_traces(df, with_timestamps=False)
+    if collapse:
+        traces = collapse_repeats(traces)
+    patterns = mine_sequences(traces, min_support=min_support, max_length=max_length, parallel=parallel, workers=workers)
+
+    report_path = os.path.join(report_dir, "frequent_sequences.csv")
+    patterns.assign(Pattern=patterns['Pattern'].map(' → '.join)).to_csv(report_path, index=False)
+
+    multi_step = patterns[patterns['Length'] > 1]
+    # Paths to the first target event, and paths from a target event that do not reach another one
+    leading = multi_step['Pattern'].map(lambda pattern: pattern[-1] == target and target not in pattern[:-1])
+    following = multi_step['Pattern'].map(lambda pattern: pattern[0] == target and target not in pattern[1:])
+    summary = (
+        f"Sessions: {len(traces)}, minimum support: {min_support}, patterns found: {len(patterns)} "
+        f"(up to {max_length} events)\n\n"
+        f"Top {top} Multi-Step Patterns:\n{_format_patterns(multi_step, top)}\n"
+        f"Top {top} Patterns Leading to {target} (confidence: share of sessions with the preceding steps that reach it):\n"
+        f"{_format_patterns(multi_step[leading].sort_values('Confidence', ascending=False, kind='stable'), top)}\n"
+        f"Top {top} Patterns After {target}:\n{_format_patterns(multi_step[following], top)}"
+    )
+    return {
+        "textual_data": {
+            "Sequential Patterns": summary
+        },
+        "report_path": report_path
+    }
@@ -0,0 +1,204 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+EVENTS_FILE = "events_by_session.arrow"
+# Fixed-size arrays, memory-mapped with np.load(mmap_mode='r')
+ARRAY_FILES = ('offsets', 'event_bitmaps', 'url_offsets', 'postings')
+# Variable-length strings, as single-column Arrow IPC files (no padding to the longest entry)
+STRING_FILES = ('session_ids', 'event_names', 'urls')
+
+
+def _write_strings(path, values):
+    array = pa.array([str(value) for value in values], type=pa.string())
+    with pa.OSFile(path, 'wb') as sink:
+        batch = pa.record_batch([array], names=['value'])
+        with pa.ipc.new_file(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+
+
+def _read_strings(path):
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).get_batch(0).column(0)
+
+
+def _search(strings, key):
+    """Position of `key` in a sorted Arrow string array, or None; touches O(log n) entries."""
+    lo, hi = 0, len(strings)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if strings[mid].as_py() < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo if lo < len(strings) and strings[lo].as_py() == key else None
+
+
+def build_session_index(df, index_dir):
+    """
+    Build an inverted index over an event log.
+
+    Writes to `index_dir`:
+    - events_by_session.arrow: the event log sorted by Session_ID (log order kept within
+      each session), as an Arrow IPC file that can be memory-mapped.
+    - session_ids.arrow, event_names.arrow, urls.arrow: the sorted keys as Arrow string columns.
+    - offsets.npy (Session_ID -> row range), event_bitmaps.npy (Event -> session bitmap),
+      url_offsets.npy and postings.npy (Page_URL -> session postings).
+
+    Every file is memory-mapped on open, so a lookup only reads the pages it needs.
+
+    Args:
+        df (pd.DataFrame): Event log with at least Session_ID and Event (Page_URL optional).
+        index_dir (str): Directory to write the index artifacts to.
+
+    Returns:
+        str: Path to the index directory.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+
+    session_codes, session_ids = pd.factorize(df['Session_ID'].astype(str), sort=True)
+    order = np.argsort(session_codes, kind='stable')
+    sorted_df = df.iloc[order].reset_index(drop=True)
+    session_codes = session_codes[order]
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(session_codes, minlength=len(session_ids))))).astype(np.int64)
+
+    with pa.OSFile(os.path.join(index_dir, EVENTS_FILE), 'wb') as sink:
+        table = pa.Table.from_pandas(sorted_df, preserve_index=False)
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    # Event -> bitmap over session ordinals
+    event_codes, event_names = pd.factorize(sorted_df['Event'], sort=True)
+    present = np.zeros((len(event_names), len(session_ids)), dtype=bool)
+    valid = event_codes >= 0
+    present[event_codes[valid], session_codes[valid]] = True
+    event_bitmaps = np.packbits(present, axis=1)
+
+    # Page_URL -> sorted, de-duplicated session postings
+    if 'Page_URL' in sorted_df.columns:
+        url_codes, urls = pd.factorize(sorted_df['Page_URL'], sort=True)
+        valid = url_codes >= 0
+        pairs = np.unique(url_codes[valid].astype(np.int64) * len(session_ids) + session_codes[valid])
+        postings = pairs % max(len(session_ids), 1)
+        url_offsets = np.searchsorted(pairs // max(len(session_ids), 1), np.arange(len(urls) + 1))
+    else:
+        urls, postings, url_offsets = [], np.array([], dtype=np.int64), np.zeros(1, dtype=np.int64)
+
+    arrays = {
+        'offsets': offsets,
+        'event_bitmaps': event_bitmaps,
+        'url_offsets': url_offsets.astype(np.int64),
+        'postings': postings.astype(np.int32),
+    }
+    for name, values in arrays.items():
+        np.save(os.path.join(index_dir, f"{name}.npy"), values)
+    for name, values in (('session_ids', session_ids), ('event_names', event_names), ('urls', urls)):
+        _write_strings(os.path.join(index_dir, f"{name}.arrow"), values)
+    return index_dir
+
+
+_open_indexes = {}
+
+
+def open_session_index(index_dir):
+    """
+    SessionIndex of a directory, opened once and reused while its files are unchanged.
+
+    Returns:
+        SessionIndex: The (possibly cached) index.
+    """
+    path = os.path.abspath(index_dir)
+    stat = os.stat(os.path.join(path, "offsets.npy"))
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _open_indexes.get(path)
+    if cached is None or cached[0] != key:
+        cached = _open_indexes[path] = (key, SessionIndex(path))
+    return cached[1]
+
+
+class SessionIndex:
+    """
+    Read side of the index built by build_session_index.
+
+    All files are memory-mapped. Single-session drill-down binary-searches the session ids
+    and slices the Arrow event file, so it only touches that session's rows; event and URL
+    lookups return session ids from the bitmaps and postings without scanning the event
+    log or expanding whole bitmaps. Use open_session_index to reuse one across analyses.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        for name in ARRAY_FILES:
+            setattr(self, name, np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode='r'))
+        for name in STRING_FILES:
+            setattr(self, name, _read_strings(os.path.join(index_dir, f"{name}.arrow")))
+        self.event_names = self.event_names.to_pylist()
+        self._table = pa.ipc.open_file(pa.memory_map(os.path.join(index_dir, EVENTS_FILE), 'r')).read_all()
+
+    def __len__(self):
+        return len(self.session_ids)
+
+    def _session_position(self, session_id):
+        return _search(self.session_ids, str(session_id))
+
+    def _session_ids(self, ordinals):
+        return self.session_ids.take(pa.array(np.asarray(ordinals, dtype=np.int64))).to_pylist()
+
+    def row_range(self, session_id):
+        """(start, end) rows of a session in events_by_session.arrow, or None if unknown."""
+        position = self._session_position(session_id)
+        if position is None:
+            return None
+        return int(self.offsets[position]), int(self.offsets[position + 1])
+
+    def session_rows(self, session_id, columns=None):
+        """
+        Returns:
+            pd.DataFrame: All events of one session in log order (empty if the session is unknown).
+        """
+        rows = self.row_range(session_id)
+        table = self._table if columns is None else self._table.select(columns)
+        if rows is None:
+            return table.slice(0, 0).to_pandas()
+        start, end = rows
+        return table.slice(start, end - start).to_pandas()
+
+    def event_postings(self, event):
+        """Session ordinals of sessions containing the event (only non-zero bitmap bytes are unpacked)."""
+        if event not in self.event_names:
+            return np.array([], dtype=np.int32)
+        bitmap = self.event_bitmaps[self.event_names.index(event)]
+        nonzero = np.flatnonzero(bitmap)
+        byte, bit = np.nonzero(np.unpackbits(bitmap[nonzero]).reshape(-1, 8))
+        return (nonzero[byte] * 8 + bit).astype(np.int32)
+
+    def url_postings(self, url):
+        """Session ordinals of sessions that requested the URL."""
+        position = _search(self.urls, url)
+        if position is None:
+            return np.array([], dtype=np.int32)
+        return self.postings[self.url_offsets[position]:self.url_offsets[position + 1]]
+
+    def sessions_with_event(self, event):
+        return self._session_ids(self.event_postings(event))
+
+    def sessions_with_url(self, url):
+        return self._session_ids(self.url_postings(url))
+
+    def sessions_matching(self, events=None, urls=None):
+        """
+        Sessions that contain all of the given events and requested all of the given URLs.
+
+        Returns:
+            list: Matching Session_IDs, sorted.
+        """
+        postings = [self.event_postings(event) for event in events or []] + [self.url_postings(url) for url in urls or []]
+        if not postings:
+            return self.session_ids.to_pylist()
+        # Intersect the shortest lists first, so the work follows the result size
+        postings.sort(key=len)
+        matching = postings[0]
+        for other in postings[1:]:
+            matching = np.intersect1d(matching, other, assume_unique=True)
+        return self._session_ids(matching)
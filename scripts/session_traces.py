@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+
+class SessionTraces:
+    """
+    Integer-coded event traces for every session in an event log.
+
+    Events are stored in one flat array grouped by session, in the same order
+    `df.groupby('Session_ID')['Event'].apply(list)` would produce, so session
+    `s` occupies `codes[offsets[s]:offsets[s + 1]]`.
+
+    Attributes:
+        session_ids (np.ndarray): Session_ID of each session, sorted.
+        event_names (list): Event name for each integer code.
+        codes (np.ndarray): Event code of every row (int32).
+        offsets (np.ndarray): Start of each session in `codes`, plus a final end offset.
+        timestamps (np.ndarray or None): Row timestamps as int64 nanoseconds since epoch.
+        row_index (np.ndarray): Position of each encoded row in the source DataFrame.
+    """
+
+    def __init__(self, session_ids, event_names, codes, offsets, timestamps=None, row_index=None):
+        self.session_ids = session_ids
+        self.event_names = list(event_names)
+        self.codes = codes
+        self.offsets = offsets
+        self.timestamps = timestamps
+        self.row_index = row_index
+
+    def __len__(self):
+        return len(self.session_ids)
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    @property
+    def session_of_row(self):
+        """Session ordinal of every row in `codes`."""
+        return np.repeat(np.arange(len(self.session_ids)), self.lengths)
+
+    def code_of(self, event):
+        """Integer code for an event name, or -1 if the event never occurs."""
+        try:
+            return self.event_names.index(event)
+        except ValueError:
+            return -1
+
+    def sequence(self, position):
+        """Event names of the session at the given ordinal."""
+        start, end = self.offsets[position], self.offsets[position + 1]
+        return [self.event_names[c] for c in self.codes[start:end]]
+
+
+def timestamps_to_ns(series):
+    """Convert a TimeStamp column (strings or datetimes) to int64 UTC nanoseconds."""
+    ts = pd.to_datetime(series, utc=True).dt.tz_localize(None)
+    return ts.to_numpy().astype('datetime64[ns]').astype(np.int64)
+
+
+def encode_traces(df, with_timestamps=True):
+    """
+    Encode the Event column of an event log into per-session integer traces.
+
+    Args:
+        df (pd.DataFrame): Event log with 'Session_ID' and 'Event' (and 'TimeStamp' when with_timestamps).
+        with_timestamps (bool): Whether to also encode TimeStamp as int64 nanoseconds.
+
+    Returns:
+        SessionTraces: Encoded traces.
+    """
+    session_codes, session_ids = pd.factorize(df['Session_ID'], sort=True)
+    # Stable sort keeps each session's rows in log order, like groupby(...).apply(list)
+    order = np.argsort(session_codes, kind='stable')
+    event_codes, event_names = pd.factorize(df['Event'])
+    codes = event_codes[order].astype(np.int32)
+    counts = np.bincount(session_codes, minlength=len(session_ids))
+    offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+
+    timestamps = None
+    if with_timestamps and 'TimeStamp' in df.columns:
+        timestamps = timestamps_to_ns(df['TimeStamp'])[order]
+
+    return SessionTraces(np.asarray(session_ids), list(event_names), codes, offsets, timestamps, order)
@@ -0,0 +1,328 @@
+import math
+import pickle
+
+import numpy as np
+import pandas as pd
+
+
+def _hash_values(values):
+    """Stable 64-bit hashes of arbitrary values (same result in every process)."""
+    values = np.asarray(values)
+    if values.dtype.kind not in 'biufcM':
+        values = values.astype(object)
+    return pd.util.hash_array(values)
+
+
+def _bit_length(x):
+    """Vectorized int.bit_length for uint64 arrays."""
+    x = x.copy()
+    n = np.zeros(len(x), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = x >= np.uint64(1 << shift)
+        n[big] += shift
+        x[big] >>= np.uint64(shift)
+    return n + (x > 0)
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct-count sketch (relative error about 1.04 / sqrt(2**precision)).
+
+    Sketches built with the same precision can be merged, so per-file or per-worker
+    sketches combine into the distinct count of the union.
+    """
+
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values):
+        values = pd.Series(values).dropna().to_numpy()
+        if len(values) == 0:
+            return self
+        hashes = _hash_values(values)
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        rank = ((64 - p) - _bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch for numeric streams.
+
+    Keeps O(k log n) values; rank error is roughly 1.7 / k. Count, sum, min and max
+    are tracked exactly so `describe()` mirrors `pd.Series.describe()`.
+    """
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _compress(self):
+        while True:
+            full = [lvl for lvl in range(len(self.levels)) if len(self.levels[lvl]) > self._capacity(lvl)]
+            if not full:
+                return
+            level = full[0]
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            # Keep one leftover item at this level when the count is odd
+            keep = items[:len(items) % 2]
+            promoted = items[len(keep):][self._rng.integers(2)::2]
+            self.levels[level] = keep
+            self.levels[level + 1] = np.concatenate((self.levels[level + 1], promoted))
+
+    def update(self, values):
+        values = pd.to_numeric(pd.Series(values), errors='coerce').dropna().to_numpy(dtype=np.float64)
+        if len(values) == 0:
+            return self
+        self.n += len(values)
+        self.total += float(values.sum())
+        self.total_sq += float(np.square(values).sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate((self.levels[level], items))
+        self.n += other.n
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        items = np.concatenate(self.levels)
+        if len(items) == 0:
+            return np.full(len(qs), np.nan)
+        weights = np.concatenate([np.full(len(lvl), 2 ** i, dtype=np.float64) for i, lvl in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+        slots = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side='left')
+        return items[np.minimum(slots, len(items) - 1)]
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+    def describe(self):
+        """Approximate equivalent of `pd.Series.describe()` for a numeric column."""
+        if self.n == 0:
+            return pd.Series({'count': 0.0}, dtype=np.float64)
+        mean = self.total / self.n
+        variance = (self.total_sq - self.n * mean * mean) / (self.n - 1) if self.n > 1 else np.nan
+        q25, q50, q75 = self.quantiles([0.25, 0.5, 0.75])
+        return pd.Series({
+            'count': float(self.n), 'mean': mean, 'std': math.sqrt(max(variance, 0.0)) if self.n > 1 else np.nan,
+            'min': self.min, '25%': q25, '50%': q50, '75%': q75, 'max': self.max,
+        })
+
+
+class CountMinSketch:
+    """
+    Count-Min sketch: frequency estimates that never undercount and overcount by
+    at most about e / width of the total weight with probability 1 - exp(-depth).
+    """
+
+    def __init__(self, width=2048, depth=5):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    def _columns(self, values):
+        hashes = _hash_values(values)
+        low = hashes & np.uint64(0xFFFFFFFF)
+        high = hashes >> np.uint64(32)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((low[None, :] + rows * high[None, :]) % np.uint64(self.width)).astype(np.int64)
+
+    def update(self, values, counts=None):
+        values = pd.Series(values).dropna()
+        if counts is None:
+            counts = values.value_counts(sort=False)
+            values, counts = counts.index.to_numpy(), counts.to_numpy()
+        else:
+            values, counts = values.to_numpy(), np.asarray(counts, dtype=np.int64)
+        if len(values) == 0:
+            return self
+        columns = self._columns(values)
+        for row in range(self.depth):
+            np.add.at(self.table[row], columns[row], counts)
+        self.total += int(counts.sum())
+        return self
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge Count-Min sketches with different dimensions")
+        self.table += other.table
+        self.total += other.total
+        return self
+
+    def estimate(self, values):
+        columns = self._columns(pd.Series(values).to_numpy())
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter summary holding at most `capacity` counters.
+
+    Each reported count overestimates the true count by at most its `error`; any item
+    whose true count exceeds total / capacity is guaranteed to be present.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=np.int64)
+        self.errors = pd.Series(dtype=np.int64)
+        self.total = 0
+
+    def _floor(self):
+        return int(self.counts.min()) if len(self.counts) >= self.capacity else 0
+
+    def _combine(self, counts, errors, floor, total):
+        index = self.counts.index.union(counts.index)
+        own_floor = self._floor()
+        merged = (self.counts.reindex(index).fillna(own_floor) + counts.reindex(index).fillna(floor))
+        merged_errors = (self.errors.reindex(index).fillna(own_floor) + errors.reindex(index).fillna(floor))
+        keep = merged.nlargest(self.capacity).index
+        self.counts = merged[keep].astype(np.int64)
+        self.errors = merged_errors[keep].astype(np.int64)
+        self.total += total
+
+    def update(self, values):
+        exact = pd.Series(values).dropna().value_counts()
+        if exact.empty:
+            return self
+        self._combine(exact, pd.Series(0, index=exact.index, dtype=np.int64), 0, int(exact.sum()))
+        return self
+
+    def merge(self, other):
+        self._combine(other.counts, other.errors, other._floor(), other.total)
+        return self
+
+    def top(self, k=10):
+        """
+        Returns:
+            pd.DataFrame: Columns 'item', 'count', 'error' and 'guaranteed' (count - error).
+        """
+        top = self.counts.nlargest(k)
+        return pd.DataFrame({
+            'item': top.index,
+            'count': top.to_numpy(),
+            'error': self.errors[top.index].to_numpy(),
+            'guaranteed': (top - self.errors[top.index]).to_numpy(),
+        })
+
+
+class LogSketches:
+    """
+    Mergeable summary statistics for a log pipeline run.
+
+    Preprocessing feeds raw request chunks through `update_requests`, sessionization
+    feeds its event frame through `update_sessions`; sketches from different files or
+    workers are combined with `merge`.
+    """
+
+    def __init__(self, precision=14, k=200, capacity=100):
+        self.ips = HyperLogLog(precision)
+        self.sessions = HyperLogLog(precision)
+        self.time_diff = KLLSketch(k)
+        self.referrer_domains = SpaceSaving(capacity)
+        self.pages = CountMinSketch()
+        self.rows = 0
+
+    def update_requests(self, df):
+        self.rows += len(df)
+        ip_column = 'IP' if 'IP' in df.columns else 'IpId'
+        self.ips.update(df[ip_column])
+        url_column = 'Page_URL' if 'Page_URL' in df.columns else 'Uri'
+        if url_column in df.columns:
+            self.pages.update(df[url_column])
+        return self
+
+    def update_sessions(self, df):
+        if 'Session_ID' in df.columns:
+            self.sessions.update(df['Session_ID'])
+        if 'time_diff' in df.columns:
+            self.time_diff.update(df['time_diff'])
+        if 'referrer_domain' in df.columns:
+            self.referrer_domains.update(df['referrer_domain'])
+        return self
+
+    def merge(self, other):
+        self.ips.merge(other.ips)
+        self.sessions.merge(other.sessions)
+        self.time_diff.merge(other.time_diff)
+        self.referrer_domains.merge(other.referrer_domains)
+        self.pages.merge(other.pages)
+        self.rows += other.rows
+        return self
+
+    def summary(self, top=5):
+        """Human-readable summary in the same shape as the exact log lines."""
+        return (
+            f"Rows: {self.rows}\n"
+            f"Unique IPs (approx.): {self.ips.count()}\n"
+            f"Unique sessions (approx.): {self.sessions.count()}\n"
+            f"Time difference stats (minutes, approx.):\n{self.time_diff.describe().to_string()}\n"
+            f"Top {top} referrer domains (approx.):\n{self.referrer_domains.top(top).to_string(index=False)}"
+        )
+
+
+def save_sketches(sketches, path):
+    with open(path, 'wb') as f:
+        pickle.dump(sketches, f)
+    return path
+
+
+def load_sketches(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def merge_sketch_files(paths):
+    """Load and merge sketches saved from several files or workers."""
+    merged = None
+    for path in paths:
+        sketches = load_sketches(path)
+        merged = sketches if merged is None else merged.merge(sketches)
+    return merged
@@ -0,0 +1,172 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# .NET ticks (100 ns) at the Unix epoch, as used by the eclog TimeStamp column
+TICKS_AT_UNIX_EPOCH = 621355968000000000
+
+ECLOG_COLUMNS = ['IpId', 'UserId', 'TimeStamp', 'HttpMethod', 'Uri', 'HttpVersion',
+                 'ResponseCode', 'Bytes', 'Referrer', 'UserAgent']
+
+COUNTRIES = np.array(['PL', 'PL', 'PL', 'PL', 'PL', 'PL', 'DE', 'US', 'GB', 'UA', 'CZ', 'NL'])
+
+BROWSER_AGENTS = np.array([
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.93 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:88.0) Gecko/20100101 Firefox/88.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1 Safari/605.1.15',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 14_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Linux; Android 11; SM-G991B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.91 Mobile Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.93 Safari/537.36 Edg/90.0.818.56',
+])
+BOT_AGENTS = np.array([
+    'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)',
+    'Mozilla/5.0 (compatible; SemrushBot/7~bl; +http://www.semrush.com/bot.html)',
+    'Mozilla/5.0 (compatible; bingbot/2.0; +http://www.bing.com/bingbot.htm)',
+    'Mozilla/5.0 (compatible; AhrefsBot/7.0; +http://ahrefs.com/robot/)',
+    'Sogou web spider/4.0(+http://www.sogou.com/docs/help/webmasters.htm#07)',
+])
+EXTERNAL_REFERRERS = np.array([
+    'https://www.google.com/', 'https://www.google.pl/', 'https://www.bing.com/',
+    'https://www.facebook.com/', 'https://www.ceneo.pl/', 'https://allegro.pl/',
+])
+SITE = 'https://www.example-shop.pl'
+
+# Page kinds and their share of user page views (static assets are added on top)
+PAGE_KINDS = np.array(['info', 'other', 'category', 'product', 'cart', 'search', 'checkout', 'static', 'account'])
+PAGE_WEIGHTS = np.array([0.55, 0.20, 0.08, 0.07, 0.02, 0.03, 0.01, 0.02, 0.02])
+ASSET_EXTENSIONS = np.array(['.jpg', '.png', '.gif', '.css', '.js'])
+ASSET_WEIGHTS = np.array([0.45, 0.2, 0.1, 0.1, 0.15])
+
+
+def _page_urls(rng, kinds, n_products):
+    """Build a Uri for every requested page kind."""
+    n = len(kinds)
+    product_ids = rng.zipf(1.3, n) % n_products
+    category_ids = rng.zipf(1.5, n) % 200
+    urls = np.empty(n, dtype=object)
+    templates = {
+        'info': lambda m: np.full(m, '/inne/informacja_online.php', dtype=object),
+        'other': lambda m: np.char.add('/inne/strona.php?id=', (category_ids[:m] % 50).astype(str)).astype(object),
+        'category': lambda m: np.char.add(np.char.add('/c-', category_ids[:m].astype(str)), '/kategoria/lista/').astype(object),
+        'product': lambda m: np.char.add(np.char.add('/p-', product_ids[:m].astype(str)), '.html').astype(object),
+        'cart': lambda m: rng.choice(np.array(['/inne/do_koszyka_ilosc.php', '/koszyk.html', '/javascript/koszyk.php'], dtype=object), m),
+        'search': lambda m: np.char.add('/szukaj.php?q=', product_ids[:m].astype(str)).astype(object),
+        'checkout': lambda m: np.full(m, '/checkout/zamowienie.php', dtype=object),
+        'static': lambda m: rng.choice(np.array(['/contact.html', '/about.html', '/faq.html'], dtype=object), m),
+        'account': lambda m: rng.choice(np.array(['/login.php', '/account/konto.php', '/logout.php'], dtype=object), m),
+    }
+    for kind, build in templates.items():
+        mask = kinds == kind
+        urls[mask] = build(int(mask.sum()))
+    return urls
+
+
+def generate_chunk(n_rows, seed, chunk_index=0, n_chunks=1, start='2019-07-29', n_ips=20000, n_products=5000,
+                   bot_share=0.06, asset_share=0.70):
+    """
+    Generate one time slice of synthetic eclog rows.
+
+    Requests are produced session by session: each session belongs to one IP, has a
+    geometric number of page views with exponential think times (occasionally longer
+    than the 15-minute timeout), and every page view pulls in a few static assets.
+
+    Returns:
+        pd.DataFrame: Rows with the eclog columns, sorted by TimeStamp.
+    """
+    rng = np.random.default_rng([seed, chunk_index])
+    day_seconds = 24 * 3600
+    slice_start = pd.Timestamp(start, tz='UTC').timestamp() + day_seconds * chunk_index / n_chunks
+    slice_length = day_seconds / n_chunks
+
+    # Sessions and page views
+    n_pages = max(1, int(round(n_rows * (1 - asset_share))))
+    lengths = rng.geometric(1 / 4.5, size=max(1, n_pages // 3))
+    lengths = lengths[:np.searchsorted(np.cumsum(lengths), n_pages) + 1]
+    lengths[-1] -= max(0, lengths.sum() - n_pages)
+    n_pages = int(lengths.sum())
+    n_sessions = len(lengths)
+    session_of_page = np.repeat(np.arange(n_sessions), lengths)
+    first_page = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    # Most IPs are occasional visitors; a heavy tail of IPs returns many times
+    session_ip = np.where(rng.random(n_sessions) < 0.8, rng.integers(0, n_ips, n_sessions), rng.zipf(1.5, n_sessions) % n_ips)
+    is_bot_session = rng.random(n_sessions) < bot_share
+    session_start = slice_start + rng.random(n_sessions) * slice_length
+    gaps = rng.exponential(40.0, n_pages)
+    gaps[rng.random(n_pages) < 0.02] += 20 * 60
+    gaps[first_page] = 0.0
+    gaps[np.repeat(is_bot_session, lengths)] /= 20.0
+    page_times = session_start[session_of_page] + (np.cumsum(gaps) - np.repeat(np.cumsum(gaps)[first_page], lengths))
+
+    kinds = rng.choice(PAGE_KINDS, n_pages, p=PAGE_WEIGHTS)
+    page_urls = _page_urls(rng, kinds, n_products)
+
+    # Static assets requested right after each page view
+    n_assets = max(0, n_rows - n_pages)
+    asset_parent = np.sort(rng.integers(0, n_pages, n_assets))
+    asset_urls = np.char.add(np.char.add('/img/', rng.integers(0, 2000, n_assets).astype(str)),
+                             rng.choice(ASSET_EXTENSIONS, n_assets, p=ASSET_WEIGHTS)).astype(object)
+    asset_times = page_times[asset_parent] + rng.random(n_assets) * 2.0
+
+    parent = np.concatenate((np.arange(n_pages), asset_parent))
+    uris = np.concatenate((page_urls, asset_urls))
+    seconds = np.concatenate((page_times, asset_times))
+    session = session_of_page[parent]
+
+    # Referrers: external or empty on the first page, the previous page afterwards
+    previous_page = np.where(np.isin(np.arange(n_pages), first_page), -1, np.arange(n_pages) - 1)
+    page_referrers = np.where(
+        previous_page >= 0,
+        np.char.add(SITE, page_urls[np.maximum(previous_page, 0)].astype(str)),
+        rng.choice(np.concatenate((EXTERNAL_REFERRERS, ['-', '-'])), n_pages),
+    ).astype(object)
+    referrers = np.concatenate((page_referrers, np.char.add(SITE, page_urls[asset_parent].astype(str)).astype(object)))
+
+    agents = np.where(is_bot_session, rng.choice(BOT_AGENTS, n_sessions), rng.choice(BROWSER_AGENTS, n_sessions))
+    ip_ids = np.char.add(session_ip.astype(str), COUNTRIES[session_ip % len(COUNTRIES)])
+    response = rng.choice(np.array([200, 304, 404, 302, 500]), len(parent), p=[0.92, 0.04, 0.02, 0.015, 0.005])
+
+    df = pd.DataFrame({
+        'IpId': ip_ids[session],
+        'UserId': 0,
+        'TimeStamp': (seconds * 10**7).astype(np.int64) + TICKS_AT_UNIX_EPOCH,
+        'HttpMethod': np.where(rng.random(len(parent)) < 0.97, 'GET', 'POST'),
+        'Uri': uris,
+        'HttpVersion': 'HTTP/1.1',
+        'ResponseCode': response,
+        'Bytes': np.where(response == 200, rng.lognormal(8.5, 1.2, len(parent)).astype(np.int64), 0),
+        'Referrer': referrers,
+        'UserAgent': agents[session],
+    }, columns=ECLOG_COLUMNS)
+    return df.sort_values('TimeStamp', kind='stable', ignore_index=True)
+
+
+def generate_eclog(output_file, n_rows, seed=0, chunksize=1_000_000, **kwargs):
+    """
+    Write a deterministic synthetic eclog CSV with `n_rows` requests.
+
+    Large files are produced in consecutive time slices of `chunksize` rows, so memory
+    stays bounded; the same (n_rows, seed, chunksize) always yields the same file.
+
+    Returns:
+        str: Path to the generated CSV file.
+    """
+    n_chunks = max(1, -(-int(n_rows) // chunksize))
+    written = 0
+    for chunk_index in range(n_chunks):
+        rows = min(chunksize, int(n_rows) - written)
+        chunk = generate_chunk(rows, seed, chunk_index, n_chunks, **kwargs)
+        chunk.to_csv(output_file, index=False, mode='w' if chunk_index == 0 else 'a', header=(chunk_index == 0))
+        written += rows
+    return output_file
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic eclog CSV file.")
+    parser.add_argument("output_file")
+    parser.add_argument("--rows", type=float, default=1e5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunksize", type=int, default=1_000_000)
+    args = parser.parse_args()
+    generate_eclog(args.output_file, int(args.rows), seed=args.seed, chunksize=args.chunksize)
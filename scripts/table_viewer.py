@@ -0,0 +1,291 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+import tkinter as tk
+from tkinter import ttk
+
+from event_store import parse_time_range
+from ingest import EVENT_LOG_DTYPES, arrow_csv_options, arrow_source
+from session_traces import timestamps_to_ns
+
+# Filter modes of the Session_ID entry: one session, or all sessions of an IP
+SESSION_FILTERS = ('Session_ID', 'IP')
+
+# Null timestamps as returned by the sources' timestamps()
+NAT = np.iinfo(np.int64).min
+
+# Arrow copies of CSV logs are kept here rather than next to the user's data
+ARROW_CACHE_DIR = os.path.join(tempfile.gettempdir(), "user_behaviour_analysis", "arrow_cache")
+
+
+class DataFrameSource:
+    """Row source over an in-memory DataFrame."""
+
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        self.columns = list(self.df.columns)
+        self._timestamps = {}
+
+    def __len__(self):
+        return len(self.df)
+
+    def unique(self, column):
+        return sorted(self.df[column].dropna().unique().tolist())
+
+    def match(self, column, value, prefix=False):
+        values = self.df[column].astype(str)
+        mask = values.str.startswith(value) if prefix else values == value
+        return (mask & self.df[column].notna()).to_numpy()
+
+    def timestamps(self, column):
+        if column not in self._timestamps:
+            self._timestamps[column] = timestamps_to_ns(self.df[column])
+        return self._timestamps[column]
+
+    def sort(self, indices, column, ascending=True):
+        values = self.df[column].iloc[indices].reset_index(drop=True)
+        return indices[values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()]
+
+    def take(self, indices):
+        return list(self.df.iloc[indices].itertuples(index=False, name=None))
+
+
+def csv_to_arrow(path, arrow_path=None, cache_dir=ARROW_CACHE_DIR):
+    """
+    Convert a CSV log to an Arrow IPC file that can be memory-mapped, one record batch at a time.
+
+    The file is written to `cache_dir`, named after the CSV and a hash of its absolute path
+    (event_logs.csv -> event_logs-<hash>.arrow), and reused while it is newer than the CSV.
+
+    Returns:
+        str: Path of the Arrow file.
+    """
+    if arrow_path is None:
+        digest = hashlib.blake2b(os.path.abspath(path).encode(), digest_size=8).hexdigest()
+        arrow_path = os.path.join(cache_dir, f"{os.path.splitext(os.path.basename(path))[0]}-{digest}.arrow")
+    if os.path.exists(arrow_path) and os.path.getmtime(arrow_path) >= os.path.getmtime(path):
+        return arrow_path
+    os.makedirs(os.path.dirname(os.path.abspath(arrow_path)), exist_ok=True)
+    read_options, convert_options = arrow_csv_options(None, EVENT_LOG_DTYPES)
+    partial = arrow_path + '.partial'
+    with arrow_source(path) as source:
+        batches = pa_csv.open_csv(source, read_options=read_options, convert_options=convert_options)
+        with pa.OSFile(partial, 'wb') as sink, pa.ipc.new_file(sink, batches.schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+    os.replace(partial, arrow_path)
+    return arrow_path
+
+
+class ArrowSource:
+    """
+    Row source over an Arrow table, typically memory-mapped from an IPC file such as
+    events_by_session.arrow, so only the rows on screen are ever converted to Python.
+    CSV files are first converted to such a file (see csv_to_arrow).
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.columns = list(table.column_names)
+        self._timestamps = {}
+
+    @classmethod
+    def from_file(cls, path):
+        if path.endswith('.csv'):
+            path = csv_to_arrow(path)
+        return cls(pa.ipc.open_file(pa.memory_map(path, 'r')).read_all())
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def unique(self, column):
+        return sorted(v for v in pc.unique(self.table[column]).to_pylist() if v is not None)
+
+    def match(self, column, value, prefix=False):
+        values = pc.cast(self.table[column], pa.string())
+        mask = pc.starts_with(values, value) if prefix else pc.equal(values, value)
+        return pc.fill_null(mask, False).to_numpy(zero_copy_only=False)
+
+    def timestamps(self, column):
+        if column not in self._timestamps:
+            values = self.table[column]
+            if pa.types.is_timestamp(values.type):
+                ns = pc.cast(pc.cast(values, pa.timestamp('ns', tz=values.type.tz)), pa.int64())
+                self._timestamps[column] = pc.fill_null(ns, NAT).to_numpy()
+            else:
+                self._timestamps[column] = timestamps_to_ns(values.to_pandas())
+        return self._timestamps[column]
+
+    def sort(self, indices, column, ascending=True):
+        values = self.table[column].take(pa.array(indices))
+        order = pc.array_sort_indices(values, order='ascending' if ascending else 'descending', null_placement='at_end')
+        return indices[order.to_numpy()]
+
+    def take(self, indices):
+        page = self.table.take(pa.array(indices, type=pa.int64()))
+        return list(zip(*[page[name].to_pylist() for name in self.columns])) if len(indices) else []
+
+
+def open_table_source(source):
+    """Row source for a DataFrame, an Arrow table, or a .arrow / .csv file path."""
+    if isinstance(source, pd.DataFrame):
+        return DataFrameSource(source)
+    if isinstance(source, pa.Table):
+        return ArrowSource(source)
+    return ArrowSource.from_file(os.fspath(source))
+
+
+def select_rows(source, session_id=None, event=None, time_range=None, sort_by=None, ascending=True,
+                time_column='TimeStamp', ip=None):
+    """
+    Row positions matching the filters, in display order.
+
+    Only the filter columns are scanned; no rows are materialized.
+
+    Args:
+        source (DataFrameSource or ArrowSource): Rows to select from.
+        session_id (str, optional): Exact Session_ID.
+        event (str, optional): Exact Event value.
+        time_range (tuple, optional): (start, end), half-open, either bound may be None.
+            Rows with a missing timestamp are left out.
+        sort_by (str, optional): Column to sort by; source order otherwise.
+        ascending (bool): Sort direction.
+        time_column (str): Column the time range applies to.
+        ip (str, optional): IP whose sessions to select (Session_IDs starting with '<ip>_').
+
+    Returns:
+        np.ndarray: Row positions (int64).
+    """
+    mask = np.ones(len(source), dtype=bool)
+    if session_id:
+        mask &= source.match('Session_ID', session_id)
+    if ip:
+        mask &= source.match('Session_ID', ip + '_', prefix=True)
+    if event:
+        mask &= source.match('Event', event)
+    start, end = parse_time_range(time_range)
+    if start is not None or end is not None:
+        timestamps = source.timestamps(time_column)
+        # Rows without a timestamp are outside every time range
+        mask &= timestamps != NAT
+        if start is not None:
+            mask &= timestamps >= start.value
+        if end is not None:
+            mask &= timestamps < end.value
+    indices = np.flatnonzero(mask).astype(np.int64)
+    if sort_by:
+        indices = source.sort(indices, sort_by, ascending)
+    return indices
+
+
+class TableViewer(ttk.Frame):
+    """
+    Virtualized Treeview over a DataFrame or Arrow table.
+
+    The Treeview only ever holds one page of rows: scrolling and paging fetch the visible
+    slice of the current selection from the source. Filters by Session_ID (or IP), Event
+    and time range, and sorting by clicking a column heading, only recompute the array
+    of selected row positions.
+    """
+
+    def __init__(self, master, source, page_size=30, **kwargs):
+        super().__init__(master, **kwargs)
+        self.source = open_table_source(source)
+        self.page_size = page_size
+        self.start = 0
+        self.sort_by, self.ascending = None, True
+        self.indices = np.arange(len(self.source), dtype=np.int64)
+
+        columns = self.source.columns
+        filters = ttk.Frame(self)
+        filters.pack(side=tk.TOP, fill=tk.X, pady=5)
+        self.session_var, self.event_var = tk.StringVar(), tk.StringVar()
+        self.session_mode = tk.StringVar(value=SESSION_FILTERS[0])
+        self.start_var, self.end_var = tk.StringVar(), tk.StringVar()
+        if 'Session_ID' in columns:
+            ttk.Combobox(filters, textvariable=self.session_mode, values=SESSION_FILTERS, state='readonly',
+                         width=10).pack(side=tk.LEFT)
+            ttk.Entry(filters, textvariable=self.session_var, width=14).pack(side=tk.LEFT, padx=(0, 5))
+        if 'Event' in columns:
+            ttk.Label(filters, text="Event:").pack(side=tk.LEFT)
+            ttk.Combobox(filters, textvariable=self.event_var, values=[''] + self.source.unique('Event'),
+                         width=18).pack(side=tk.LEFT, padx=(0, 5))
+        if 'TimeStamp' in columns:
+            ttk.Label(filters, text="From:").pack(side=tk.LEFT)
+            ttk.Entry(filters, textvariable=self.start_var, width=18).pack(side=tk.LEFT, padx=(0, 5))
+            ttk.Label(filters, text="To:").pack(side=tk.LEFT)
+            ttk.Entry(filters, textvariable=self.end_var, width=18).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(filters, text="Apply", command=self.apply_filters).pack(side=tk.LEFT, padx=5)
+        self.status = ttk.Label(filters)
+        self.status.pack(side=tk.RIGHT, padx=5)
+
+        body = ttk.Frame(self)
+        body.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(body, columns=columns, show='headings', height=page_size)
+        for column in columns:
+            self.tree.heading(column, text=column, command=lambda c=column: self.sort(c))
+            self.tree.column(column, width=120, stretch=True)
+        self.scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self._on_scrollbar)
+        scrollbar_x = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.tree.xview)
+        self.tree.configure(xscrollcommand=scrollbar_x.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        scrollbar_x.pack(side=tk.BOTTOM, fill=tk.X)
+
+        for sequence, step in (('<MouseWheel>', None), ('<Button-4>', -3), ('<Button-5>', 3)):
+            self.tree.bind(sequence, lambda e, s=step: self._scroll(s if s is not None else -3 * int(np.sign(e.delta))))
+        for key, step in (('<Prior>', -page_size), ('<Next>', page_size), ('<Up>', -1), ('<Down>', 1)):
+            self.tree.bind(key, lambda e, s=step: self._scroll(s) or 'break')
+        self.show(0)
+
+    def apply_filters(self):
+        time_range = None
+        if self.start_var.get().strip() or self.end_var.get().strip():
+            time_range = (self.start_var.get().strip() or None, self.end_var.get().strip() or None)
+        session = self.session_var.get().strip() or None
+        by_ip = self.session_mode.get() == 'IP'
+        try:
+            self.indices = select_rows(self.source, None if by_ip else session,
+                                       self.event_var.get().strip() or None, time_range,
+                                       self.sort_by, self.ascending, ip=session if by_ip else None)
+        except ValueError as e:
+            self.status.configure(text=f"Invalid filter: {e}")
+            return
+        self.show(0)
+
+    def sort(self, column):
+        self.ascending = not self.ascending if self.sort_by == column else True
+        self.sort_by = column
+        for name in self.source.columns:
+            arrow = (' ▲' if self.ascending else ' ▼') if name == column else ''
+            self.tree.heading(name, text=name + arrow)
+        self.indices = self.source.sort(self.indices, column, self.ascending)
+        self.show(0)
+
+    def show(self, start):
+        """Fill the Treeview with the page of selected rows beginning at `start`."""
+        total = len(self.indices)
+        self.start = int(max(0, min(start, total - self.page_size)))
+        page = self.indices[self.start:self.start + self.page_size]
+        self.tree.delete(*self.tree.get_children())
+        for row in self.source.take(page):
+            self.tree.insert('', tk.END, values=['' if pd.isna(v) else v for v in row])
+        end = self.start + len(page)
+        self.status.configure(text=f"Rows {self.start + 1 if total else 0}-{end} of {total:,}")
+        self.scrollbar.set(self.start / total if total else 0.0, end / total if total else 1.0)
+
+    def _scroll(self, rows):
+        self.show(self.start + rows)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.show(int(float(amount) * len(self.indices)))
+        elif action == 'scroll':
+            self._scroll(int(amount) * (self.page_size if unit == 'pages' else 1))
@@ -1,24 +1,60 @@
-import pandas as pd
-
-# Load event logs
-df = pd.read_csv('D:\\Major Project\\User behaviour analysis using server logs\\data\\processed_logs\\event_logs.csv')
-
-# 1. Conversion Rate: Percentage of sessions with Add_to_Cart
-cart_sessions = df[df['Event'] == 'Add_to_Cart']['Session_ID'].nunique()
-total_sessions = df['Session_ID'].nunique()
-conversion_rate = (cart_sessions / total_sessions) * 100
-print(f"Percentage of sessions with Add_to_Cart: {conversion_rate:.2f}%")
-print(f"Sessions with Add_to_Cart: {cart_sessions} out of {total_sessions}")
-
-# 2. Common Event Transitions
-df['next_event'] = df.groupby('Session_ID')['Event'].shift(-1)
-event_transitions = df.groupby(['Event', 'next_event']).size().reset_index(name='count')
-print("\nTop 5 Event Transitions:")
-print(event_transitions.sort_values(by='count', ascending=False).head(5))
-
-# Save results to a file
-with open(r'E:\Major Project\User behaviour analysis using server logs\reports\analysis_results.txt', 'w') as f:
-    f.write(f"Percentage of sessions with Add_to_Cart: {conversion_rate:.2f}%\n")
-    f.write(f"Sessions with Add_to_Cart: {cart_sessions} out of {total_sessions}\n")
-    f.write("\nTop 5 Event Transitions:\n")
-    f.write(event_transitions.sort_values(by='count', ascending=False).head(5).to_string())
\ No newline at end of file
+import os
+
+import duckdb_backend
+from event_store import load_event_log
+
+def analyze_conversion_and_transitions(event_log_path, report_dir, time_range=None, backend='pandas'):
+    """
+    Calculate the Add_to_Cart conversion rate and the most common event transitions.
+
+    Parameters:
+    - event_log_path: Path to the event logs CSV file or partitioned event store.
+    - report_dir: Directory to save the analysis results.
+    - time_range: Optional (start, end) tuple; only events in [start, end) are used.
+    - backend: 'pandas' or 'duckdb' (counts and transitions in SQL; same results).
+
+    Returns:
+    - results: dict with textual summary and report file path.
+    """
+    if backend == 'duckdb':
+        cart_sessions, total_sessions, event_transitions = duckdb_backend.conversion_and_transitions(event_log_path, time_range)
+    else:
+        df = load_event_log(event_log_path, columns=['Session_ID', 'Event'], time_range=time_range)
+
+        # 1. Conversion Rate: Percentage of sessions with Add_to_Cart
+        cart_sessions = df[df['Event'] == 'Add_to_Cart']['Session_ID'].nunique()
+        total_sessions = df['Session_ID'].nunique()
+
+        # 2. Common Event Transitions
+        df['next_event'] = df.groupby('Session_ID')['Event'].shift(-1)
+        event_transitions = df.groupby(['Event', 'next_event']).size().reset_index(name='count')
+    conversion_rate = (cart_sessions / total_sessions) * 100 if total_sessions else 0.0
+    top_transitions = event_transitions.sort_values(by='count', ascending=False).head(5)
+
+    summary = (
+        f"Percentage of sessions with Add_to_Cart: {conversion_rate:.2f}%\n"
+        f"Sessions with Add_to_Cart: {cart_sessions} out of {total_sessions}\n"
+        "\nTop 5 Event Transitions:\n"
+        f"{top_transitions.to_string()}"
+    )
+
+    # Save results to a file
+    os.makedirs(report_dir, exist_ok=True)
+    report_path = os.path.join(report_dir, "analysis_results.txt")
+    with open(report_path, 'w') as f:
+        f.write(summary)
+
+    return {
+        "textual_data": {
+            "Targeted Analysis": summary
+        },
+        "report_path": report_path
+    }
+
+
+if __name__ == "__main__":
+    result = analyze_conversion_and_transitions(
+        'D:\\Major Project\\User behaviour analysis using server logs\\data\\processed_logs\\event_logs.csv',
+        r'E:\Major Project\User behaviour analysis using server logs\reports'
+    )
+    print(result["textual_data"]["Targeted Analysis"])
@@ -1,121 +1,293 @@
+import numpy as np
 import pandas as pd
 import logging
 from urllib.parse import urlparse
 import os
 from pathlib import Path
 
-def sessionize_and_classify(input_file, output_dir=r"D:\MAJOR PROJECT\User behaviour analysis using server logs\data\processed_logs"):
+import duckdb_backend
+from duckdb_backend import BACKENDS
+from event_store import write_partitioned
+from ingest import EVENT_LOG_DTYPES, read_csv
+from request_filters import STATIC_EXTENSIONS, filter_requests
+from session_index import build_session_index
+from instrumentation import get_stage_logger, instrumented, current_stage, track_stage, file_size
+
+def get_domain(url):
+    """Return the lowercased domain of a referrer URL, or '' when it is missing."""
+    if pd.isna(url) or url == '-':
+        return ''
+    parsed = urlparse(url)
+    return parsed.netloc.lower()
+
+
+# Minutes of inactivity after which a visitor's next request starts a new session
+SESSION_TIMEOUT_MINUTES = 15
+
+
+def categorize_event(url):
+    """Event category of a page URL."""
+    if '/inne/informacja_online.php' in url:
+        return 'Info_Page_View'
+    elif 'p-' in url:
+        return 'Product_View'
+    elif 'koszyk' in url:
+        return 'Add_to_Cart'
+    else:
+        return 'Other_Action'
+
+
+def time_gaps(df):
+    """Minutes since the same IP's previous request (NaN on each IP's first); `df` is sorted by IP and TimeStamp."""
+    return df.groupby('IP')['TimeStamp'].diff().dt.total_seconds() / 60
+
+
+def referrer_domain_changes(df):
+    """Rows whose referrer domain is empty or differs from the same IP's previous request; needs df['referrer_domain']."""
+    return df.groupby('IP')['referrer_domain'].transform(lambda x: (x != x.shift()) | (x == '')).fillna(True)
+
+
+def _sessionize_pandas(input_file, reader, session_timeout, sketches, logger, stage):
+    """Pandas implementation of sessionize_and_classify; returns the event log DataFrame."""
+    diagnostics = logger.isEnabledFor(logging.DEBUG)
+    
+    # Load dataset
+    from_frame = isinstance(input_file, pd.DataFrame)
+    with track_stage('load') as step:
+        try:
+            df = input_file.copy() if from_frame else read_csv(input_file, reader, dtypes=EVENT_LOG_DTYPES)
+            df['TimeStamp'] = pd.to_datetime(df['TimeStamp'], utc=True)
+            logger.info(f"Loaded {len(df)} rows from {'memory' if from_frame else input_file}")
+        except Exception as e:
+            logger.error(f"Failed to load CSV: {e}")
+            raise
+        step.bytes_read = 0 if from_frame else file_size(input_file)
+        step.rows_out = len(df)
+    stage.rows_in = len(df)
+    stage.bytes_read = step.bytes_read
+    
+    # Sort by IP and TimeStamp
+    with track_stage('sort') as step:
+        step.rows_in = len(df)
+        df = df.sort_values(by=['IP', 'TimeStamp'], ignore_index=True)
+        logger.info(f"Sorted data by IP and TimeStamp")
+    
+    # Filter out non-user actions (e.g., images, CSS, JS)
+    with track_stage('filter') as step:
+        step.rows_in = len(df)
+        # Normally a no-op: preprocess_logs already drops these before anything else is done with them
+        df, _ = filter_requests(df, 'Page_URL', STATIC_EXTENSIONS)
+        logger.info(f"Rows after filtering non-user actions: {len(df)}")
+        step.rows_out = len(df)
+    
+    # Calculate time differences per IP
+    with track_stage('diff'):
+        df['time_diff'] = time_gaps(df)
+        if diagnostics:
+            logger.debug(f"Time difference stats (minutes):\n{df['time_diff'].describe()}")
+    
+    with track_stage('sessionize'):
+        # Extract domain from Referrer_URL
+        df['referrer_domain'] = df['Referrer_URL'].apply(get_domain)
+        if diagnostics:
+            logger.debug(f"Unique referrer domains: {df['referrer_domain'].nunique()}")
+            logger.debug(f"Top 5 referrer domains:\n{df['referrer_domain'].value_counts().head(5)}")
+        
+        # Detect domain changes or empty referrers
+        df['domain_change'] = referrer_domain_changes(df)
+        logger.info(f"Total domain changes: {df['domain_change'].sum()}")
+        
+        # Mark new sessions
+        df['new_session'] = (df['time_diff'].isna()) | (df['time_diff'] > session_timeout) | (df['domain_change'])
+        logger.info(f"Total new sessions marked: {df['new_session'].sum()}")
+        
+        # Assign session number per IP
+        df['session_num'] = df.groupby('IP')['new_session'].cumsum()
+        df['Session_ID'] = df['IP'] + '_' + df['session_num'].astype(str)
+        if sketches is not None:
+            sketches.update_sessions(df)
+    
+    # Verify session assignment (rows are sorted by IP, so the first IP's rows are at the top)
+    if diagnostics:
+        sample_ip = df['IP'].iloc[0]
+        sample_sessions = df.head(10)
+        sample_sessions = sample_sessions[sample_sessions['IP'] == sample_ip][['Session_ID', 'TimeStamp', 'time_diff', 'new_session', 'session_num', 'Page_URL', 'Referrer_URL', 'referrer_domain']]
+        logger.debug(f"Sample session assignment for IP {sample_ip}:\n{sample_sessions}")
+    
+    # Categorize events
+    with track_stage('classify'):
+        df['Event'] = df['Page_URL'].apply(categorize_event)
+        logger.info(f"Event distribution:\n{df['Event'].value_counts()}")
+    
+    # Log session and user counts (each new_session row starts a distinct Session_ID, and
+    # rows are sorted by IP, so both counts come from cheap vectorized passes)
+    total_sessions = int(df['new_session'].sum())
+    total_users = int((df['IP'] != df['IP'].shift()).sum())
+    avg_events_per_session = len(df) / total_sessions if total_sessions > 0 else 0
+    logger.info(f"Total sessions: {total_sessions}")
+    logger.info(f"Total unique IPs: {total_users}")
+    logger.info(f"Average events per session: {avg_events_per_session:.2f}")
+    
+    if diagnostics:
+        # Check for duplicates
+        duplicate_sessions = df['Session_ID'].duplicated().sum()
+        logger.debug(f"Duplicate Session_IDs: {duplicate_sessions}")
+        if duplicate_sessions > 0:
+            logger.warning(f"Found {duplicate_sessions} duplicate Session_IDs. Sample duplicates:\n{df[df['Session_ID'].duplicated(keep=False)][['Session_ID', 'IP', 'TimeStamp', 'Page_URL', 'Referrer_URL', 'referrer_domain']].head(10)}")
+        
+        # Check sessions per IP
+        sessions_per_ip = df.groupby('IP')['Session_ID'].nunique()
+        logger.debug(f"Sessions per IP (top 5):\n{sessions_per_ip.sort_values(ascending=False).head(5)}")
+    elif sketches is not None:
+        logger.info(f"Approximate summary from sketches:\n{sketches.summary()}")
+    
+    # Select relevant columns
+    event_log_df = df[['Session_ID', 'IP', 'TimeStamp', 'Event', 'Page_URL', 'Method', 'Response', 'Bytes_Sent', 'Referrer_URL', 'User_Agent']]
+    return event_log_df
+
+
+@instrumented('sessionize_and_classify')
+def sessionize_and_classify(input_file, output_dir=r"D:\MAJOR PROJECT\User behaviour analysis using server logs\data\processed_logs", sketches=None, store_dir=None, index_dir=None, verbose=False, reader='pandas',
+                            in_memory=False, checkpoint=False, session_timeout=SESSION_TIMEOUT_MINUTES, backend='pandas'):
     """
     Transform processed logs into event logs with session IDs and event categories.
     
     Args:
-        input_file (str): Path to the input CSV file (e.g., processed_data.csv).
+        input_file (str or pd.DataFrame): Path to the input CSV file (e.g., processed_data.csv), or the
+            processed logs themselves.
         output_dir (str): Directory to save the output event log.
+        sketches (sketches.LogSketches, optional): Summary sketches updated with session IDs, time gaps and referrer domains.
+        store_dir (str, optional): Also write the event log as a date/hour partitioned store under this directory.
+        index_dir (str, optional): Also build a Session_ID / Event / Page_URL inverted index in this directory.
+        verbose (bool): Log diagnostic summaries (time gap stats, top referrers, sample sessions,
+            duplicate and per-IP checks). These need extra full passes, so they are off by default;
+            when sketches are given, approximate versions are logged from them instead.
+        reader (str): CSV reader backend for the input, 'pandas' or the multithreaded 'pyarrow'.
+        in_memory (bool): Return the event log DataFrame instead of a path (for the fused pipeline).
+        checkpoint (bool): In memory mode, still write event_logs.csv.
+        session_timeout (float): Minutes of inactivity that end a session (see session_timeout_sweep
+            for choosing it).
+        backend (str): 'pandas', or 'duckdb' to run the sort, window functions and classification as
+            multithreaded SQL (duckdb_backend.sessionize); both give identical event logs.
     
     Returns:
-        str: Path to the output CSV file (event_logs.csv).
+        str: Path to the output CSV file (event_logs.csv), or the event log DataFrame when in_memory.
     """
     # Set up logging
     log_file = os.path.join(output_dir, "sessions.log")
-    logging.basicConfig(filename=log_file, level=logging.INFO, format='%(asctime)s - %(message)s')
+    logger = get_stage_logger(__name__, log_file, level=logging.DEBUG if verbose else logging.INFO)
+    stage = current_stage()
     
     # Define output file path
     output_file = os.path.join(output_dir, "event_logs.csv")
     
-    # Load dataset
-    try:
-        df = pd.read_csv(input_file)
-        df['TimeStamp'] = pd.to_datetime(df['TimeStamp'], utc=True)
-        logging.info(f"Loaded {len(df)} rows from {input_file}")
-    except Exception as e:
-        logging.error(f"Failed to load CSV: {e}")
-        raise
-    
-    # Sort by IP and TimeStamp
-    df = df.sort_values(by=['IP', 'TimeStamp'], ignore_index=True)
-    logging.info(f"Sorted data by IP and TimeStamp")
+    from_frame = isinstance(input_file, pd.DataFrame)
+    if backend == 'duckdb':
+        with track_stage('sql') as step:
+            event_log_df = duckdb_backend.sessionize(input_file, session_timeout, session_columns=sketches is not None)
+            step.bytes_read = 0 if from_frame else file_size(input_file)
+            step.rows_out = len(event_log_df)
+        stage.bytes_read = step.bytes_read
+        stage.rows_in = len(event_log_df)
+        logger.info(f"Sessionized {len(event_log_df)} rows from {'memory' if from_frame else input_file} with DuckDB")
+        logger.info(f"Event distribution:\n{event_log_df['Event'].value_counts()}")
+        logger.info(f"Total sessions: {event_log_df['Session_ID'].nunique()}")
+        logger.info(f"Total unique IPs: {event_log_df['IP'].nunique()}")
+        if sketches is not None:
+            sketches.update_sessions(event_log_df)
+            event_log_df = event_log_df.drop(columns=['time_diff', 'referrer_domain'])
+    elif backend == 'pandas':
+        event_log_df = _sessionize_pandas(input_file, reader, session_timeout, sketches, logger, stage)
+    else:
+        raise ValueError(f"Unknown backend: {backend} (expected one of {BACKENDS})")
     
-    # Filter out non-user actions (e.g., images, CSS, JS)
-    non_user_extensions = ['.jpg', '.png', '.gif', '.css', '.js']
-    df = df[~df['Page_URL'].str.lower().str.endswith(tuple(non_user_extensions))]
-    logging.info(f"Rows after filtering non-user actions: {len(df)}")
+    # Save transformed event log (optional checkpoint in memory mode)
+    stage.rows_out = len(event_log_df)
+    if not in_memory or checkpoint:
+        with track_stage('save') as step:
+            try:
+                event_log_df.to_csv(output_file, index=False)
+                logger.info(f"Saved event log to {output_file}")
+            except Exception as e:
+                logger.error(f"Failed to save CSV: {e}")
+                raise
+            step.rows_in = len(event_log_df)
+            step.bytes_written = file_size(output_file)
+        stage.bytes_written = file_size(output_file)
     
-    # Define session timeout (15 minutes)
-    SESSION_TIMEOUT = pd.Timedelta(minutes=15)
+    if store_dir:
+        with track_stage('store'):
+            write_partitioned(event_log_df, os.path.join(store_dir, "event_logs"))
+            logger.info(f"Saved partitioned event log to {os.path.join(store_dir, 'event_logs')}")
     
-    # Calculate time differences per IP
-    df['time_diff'] = df.groupby('IP')['TimeStamp'].diff().dt.total_seconds() / 60
-    logging.info(f"Time difference stats (minutes):\n{df['time_diff'].describe()}")
+    if index_dir:
+        with track_stage('index'):
+            build_session_index(event_log_df, index_dir)
+            logger.info(f"Built session index in {index_dir}")
     
-    # Extract domain from Referrer_URL
-    def get_domain(url):
-        if pd.isna(url) or url == '-':
-            return ''
-        parsed = urlparse(url)
-        return parsed.netloc.lower()
+    return event_log_df if in_memory else output_file
+
+
+@instrumented('session_timeout_sweep')
+def session_timeout_sweep(input_file, timeouts, conversion_event='Add_to_Cart', reader='pandas'):
+    """
+    Session statistics for several candidate session timeouts from a single pass.
+
+    A request starts a new session when it is an IP's first, its referrer domain changed
+    (both independent of the timeout) or its gap to the previous request exceeds the
+    timeout. Giving forced breaks an infinite gap, the session count for a timeout t is
+    the number of gaps > t, so one sort of the gaps answers every timeout by binary search.
+    A session converts if it contains `conversion_event`; consecutive conversions belong to
+    different sessions exactly when the largest gap between them exceeds t, so sorting
+    those maxima answers the converting-session counts the same way.
+
+    Args:
+        input_file (str or pd.DataFrame): Processed logs (processed_data.csv) or an event log.
+        timeouts (iterable): Candidate timeouts in minutes.
+        conversion_event (str): Event marking a converted session.
+        reader (str): CSV reader backend when `input_file` is a path.
+
+    Returns:
+        pd.DataFrame: One row per timeout with timeout_minutes, sessions, mean_events
+            (requests per session), mean_duration_minutes, converting_sessions and conversion_rate.
+    """
+    if isinstance(input_file, pd.DataFrame):
+        df = input_file[[c for c in ('IP', 'TimeStamp', 'Page_URL', 'Referrer_URL', 'Event') if c in input_file.columns]].copy()
+    else:
+        df = read_csv(input_file, reader, dtypes=EVENT_LOG_DTYPES)
+    df['TimeStamp'] = pd.to_datetime(df['TimeStamp'], utc=True)
     
+    # Same preparation as sessionize_and_classify
+    df = df.sort_values(by=['IP', 'TimeStamp'], ignore_index=True)
+    df, _ = filter_requests(df, 'Page_URL', STATIC_EXTENSIONS)
     df['referrer_domain'] = df['Referrer_URL'].apply(get_domain)
-    logging.info(f"Unique referrer domains: {df['referrer_domain'].nunique()}")
-    logging.info(f"Top 5 referrer domains:\n{df['referrer_domain'].value_counts().head(5)}")
-    
-    # Detect domain changes or empty referrers
-    df['domain_change'] = df.groupby('IP')['referrer_domain'].transform(lambda x: (x != x.shift()) | (x == '')).fillna(True)
-    logging.info(f"Total domain changes: {df['domain_change'].sum()}")
-    
-    # Mark new sessions
-    df['new_session'] = (df['time_diff'].isna()) | (df['time_diff'] > 15) | (df['domain_change'])
-    logging.info(f"Total new sessions marked: {df['new_session'].sum()}")
-    
-    # Assign session number per IP
-    df['session_num'] = df.groupby('IP')['new_session'].cumsum()
-    df['Session_ID'] = df['IP'] + '_' + df['session_num'].astype(str)
-    
-    # Verify session assignment
-    sample_ip = df['IP'].iloc[0]
-    sample_sessions = df[df['IP'] == sample_ip][['Session_ID', 'TimeStamp', 'time_diff', 'new_session', 'session_num', 'Page_URL', 'Referrer_URL', 'referrer_domain']].head(10)
-    logging.info(f"Sample session assignment for IP {sample_ip}:\n{sample_sessions}")
-    
-    # Categorize events
-    def categorize_event(url):
-        if '/inne/informacja_online.php' in url:
-            return 'Info_Page_View'
-        elif 'p-' in url:
-            return 'Product_View'
-        elif 'koszyk' in url:
-            return 'Add_to_Cart'
-        else:
-            return 'Other_Action'
-    
-    df['Event'] = df['Page_URL'].apply(categorize_event)
-    logging.info(f"Event distribution:\n{df['Event'].value_counts()}")
-    
-    # Log session and user counts
-    total_sessions = df['Session_ID'].nunique()
-    total_users = df['IP'].nunique()
-    avg_events_per_session = len(df) / total_sessions if total_sessions > 0 else 0
-    logging.info(f"Total sessions: {total_sessions}")
-    logging.info(f"Total unique IPs: {total_users}")
-    logging.info(f"Average events per session: {avg_events_per_session:.2f}")
-    
-    # Check for duplicates
-    duplicate_sessions = df['Session_ID'].duplicated().sum()
-    logging.info(f"Duplicate Session_IDs: {duplicate_sessions}")
-    if duplicate_sessions > 0:
-        logging.warning(f"Found {duplicate_sessions} duplicate Session_IDs. Sample duplicates:\n{df[df['Session_ID'].duplicated(keep=False)][['Session_ID', 'IP', 'TimeStamp', 'Page_URL', 'Referrer_URL', 'referrer_domain']].head(10)}")
-    
-    # Check sessions per IP
-    sessions_per_ip = df.groupby('IP')['Session_ID'].nunique()
-    logging.info(f"Sessions per IP (top 5):\n{sessions_per_ip.sort_values(ascending=False).head(5)}")
-    
-    # Select relevant columns
-    event_log_df = df[['Session_ID', 'IP', 'TimeStamp', 'Event', 'Page_URL', 'Method', 'Response', 'Bytes_Sent', 'Referrer_URL', 'User_Agent']]
+    gaps = time_gaps(df)
+    forced = gaps.isna() | referrer_domain_changes(df)
+    gaps = np.where(forced, np.inf, gaps.to_numpy(dtype=float))
+    events = df['Event'] if 'Event' in df.columns else df['Page_URL'].apply(categorize_event)
+    conversions = np.flatnonzero((events == conversion_event).to_numpy())
     
-    # Save transformed event log
-    try:
-        event_log_df.to_csv(output_file, index=False)
-        logging.info(f"Saved event log to {output_file}")
-    except Exception as e:
-        logging.error(f"Failed to save CSV: {e}")
-        raise
+    sorted_gaps = np.sort(gaps)
+    # Within-session time is the sum of the gaps that do not break a session
+    finite = sorted_gaps[np.isfinite(sorted_gaps)]
+    cumulative = np.concatenate(([0.0], np.cumsum(finite)))
+    # Largest gap between each conversion and the previous one
+    if len(conversions) > 1:
+        merge_gaps = np.sort(np.maximum.reduceat(gaps[:conversions[-1] + 1], conversions[:-1] + 1))
+    else:
+        merge_gaps = np.array([])
     
-    return output_file
\ No newline at end of file
+    timeouts = np.asarray(sorted(float(t) for t in timeouts))
+    kept = np.searchsorted(finite, timeouts, side='right')
+    sessions = len(gaps) - np.searchsorted(sorted_gaps, timeouts, side='right')
+    converting = np.where(len(conversions) > 0,
+                          1 + len(merge_gaps) - np.searchsorted(merge_gaps, timeouts, side='right'), 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return pd.DataFrame({
+            'timeout_minutes': timeouts,
+            'sessions': sessions,
+            'mean_events': np.where(sessions > 0, len(gaps) / sessions, 0.0),
+            'mean_duration_minutes': np.where(sessions > 0, cumulative[kept] / sessions, 0.0),
+            'converting_sessions': converting,
+            'conversion_rate': np.where(sessions > 0, converting / sessions, 0.0),
+        })
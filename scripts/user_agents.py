@@ -0,0 +1,308 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import matplotlib.pyplot as plt
+
+from event_store import event_log_columns, filter_time_range, load_event_log
+from instrumentation import instrumented
+from session_traces import timestamps_to_ns
+
+UA_TABLE_FILE = "user_agents.parquet"
+# Bump when the parsing rules change so persisted tables are rebuilt
+PARSER_VERSION = 2
+DIMENSIONS = ['browser', 'os', 'device', 'is_bot']
+
+# A whole product token naming a bot, crawler or spider, followed by its version ('Googlebot/2.1')
+# or info URL ('AdsBot-Google (+http://...)'), so device names like 'CUBOT P30' do not match;
+# or one of the known clients without such a token
+BOT_PATTERN = re.compile(r'(?<![\w.-])([\w.-]*(?:bot|crawler|spider)[\w.-]*)(?=/|[\s;+]*\(?\+?https?:)'
+                         r'|\b(slurp|curl|wget|python-requests|scrapy|headless\w*)\b', re.I)
+# First match wins, so more specific tokens go before the engines they build on
+BROWSER_RULES = [
+    ('Edge', re.compile(r'Edge?/|EdgA/|EdgiOS/')),
+    ('Opera', re.compile(r'OPR/|Opera')),
+    ('Samsung Internet', re.compile(r'SamsungBrowser/')),
+    ('Chrome', re.compile(r'Chrome/|CriOS/')),
+    ('Firefox', re.compile(r'Firefox/|FxiOS/')),
+    ('Safari', re.compile(r'Version/[\d.]+.*Safari/')),
+    ('Internet Explorer', re.compile(r'MSIE |Trident/')),
+]
+OS_RULES = [
+    ('Windows', re.compile(r'Windows')),
+    ('Android', re.compile(r'Android')),
+    ('iOS', re.compile(r'iPhone|iPad|iPod')),
+    ('Chrome OS', re.compile(r'CrOS')),
+    ('macOS', re.compile(r'Mac OS X|Macintosh')),
+    ('Linux', re.compile(r'Linux|X11')),
+]
+
+
+def parse_user_agent(user_agent):
+    """
+    Split a User-Agent string into browser, OS, device class and a bot flag.
+
+    Args:
+        user_agent (str): Raw User-Agent header ('' or '-' when missing).
+
+    Returns:
+        tuple: (browser, os, device, is_bot); device is 'desktop', 'mobile', 'tablet', 'bot',
+            'other' or 'unknown'.
+    """
+    if not isinstance(user_agent, str) or user_agent.strip() in ('', '-'):
+        return 'Unknown', 'Unknown', 'unknown', False
+    os_name = next((name for name, rule in OS_RULES if rule.search(user_agent)), 'Other')
+    bot = BOT_PATTERN.search(user_agent)
+    if bot:
+        return bot.group(1) or bot.group(2), os_name, 'bot', True
+    browser = next((name for name, rule in BROWSER_RULES if rule.search(user_agent)), 'Other')
+    if 'iPad' in user_agent or 'Tablet' in user_agent or (os_name == 'Android' and 'Mobile' not in user_agent):
+        device = 'tablet'
+    elif 'Mobi' in user_agent or os_name in ('iOS', 'Android'):
+        device = 'mobile'
+    elif os_name in ('Windows', 'macOS', 'Linux', 'Chrome OS'):
+        device = 'desktop'
+    else:
+        device = 'other'
+    return browser, os_name, device, False
+
+
+class UserAgentTable:
+    """
+    Dimension table of distinct User-Agent strings and their parsed attributes.
+
+    Each distinct string is parsed once and gets a stable integer code (its row). The
+    table is kept in a Parquet file and reloaded on the next run, so only User-Agents
+    never seen before are parsed; a table written by an older parser version is parsed
+    again in place, keeping the codes already stored in event logs valid. Events carry
+    the small integer code (UA_Code), and per-browser/OS/device breakdowns are group-bys
+    on codes instead of string work per row.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.table = pd.DataFrame({'User_Agent': pd.Series([], dtype=object), 'browser': pd.Series([], dtype=object),
+                                   'os': pd.Series([], dtype=object), 'device': pd.Series([], dtype=object),
+                                   'is_bot': pd.Series([], dtype=bool)})
+        self.parsed = 0
+        if path and os.path.exists(path):
+            stored = pq.read_table(path)
+            metadata = stored.schema.metadata or {}
+            if metadata.get(b'parser_version') == str(PARSER_VERSION).encode():
+                self.table = stored.to_pandas()
+            else:
+                user_agents = stored.column('User_Agent').to_pylist()
+                parsed = pd.DataFrame([parse_user_agent(ua) for ua in user_agents], columns=DIMENSIONS)
+                parsed.insert(0, 'User_Agent', user_agents)
+                self.table = parsed if len(parsed) else self.table
+                self.parsed = len(parsed)
+        self._index = pd.Index(self.table['User_Agent'])
+
+    def __len__(self):
+        return len(self.table)
+
+    def encode(self, user_agents):
+        """
+        Integer codes of the given User-Agents, parsing and adding the unseen ones.
+
+        Args:
+            user_agents (pd.Series or array-like): Raw User-Agent strings; missing values are
+                treated as ''.
+
+        Returns:
+            np.ndarray: int32 row of each value in the table.
+        """
+        codes, uniques = pd.factorize(pd.Series(user_agents, dtype=object).fillna(''))
+        uniques = np.asarray(uniques, dtype=object)
+        rows = self._index.get_indexer(uniques)
+        new = rows < 0
+        if new.any():
+            parsed = pd.DataFrame([parse_user_agent(ua) for ua in uniques[new]], columns=DIMENSIONS)
+            parsed.insert(0, 'User_Agent', uniques[new])
+            rows[new] = np.arange(len(self.table), len(self.table) + len(parsed))
+            self.table = pd.concat([self.table, parsed], ignore_index=True)
+            self._index = pd.Index(self.table['User_Agent'])
+            self.parsed += len(parsed)
+        return rows[codes].astype(np.int32)
+
+    def value_codes(self, column):
+        """Code of every table row's value of a dimension, and the sorted distinct values."""
+        return pd.factorize(self.table[column], sort=True)
+
+    def dimensions(self, codes, columns=DIMENSIONS):
+        """
+        Attributes of encoded User-Agents as categoricals (is_bot as bool).
+
+        Args:
+            codes (np.ndarray): Codes returned by `encode`.
+            columns (list): Dimensions to return.
+
+        Returns:
+            pd.DataFrame: One row per code.
+        """
+        result = {}
+        for column in columns:
+            if column == 'is_bot':
+                result[column] = self.table['is_bot'].to_numpy(dtype=bool)[codes]
+            else:
+                value_codes, values = self.value_codes(column)
+                result[column] = pd.Categorical.from_codes(value_codes[codes], values)
+        return pd.DataFrame(result)
+
+    def save(self, path=None):
+        """Write the table to `path` (default: the path it was loaded from)."""
+        path = path or self.path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        table = pa.Table.from_pandas(self.table, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'parser_version': str(PARSER_VERSION).encode()})
+        pq.write_table(table, path)
+        return path
+
+
+def join_user_agents(df, table, columns=DIMENSIONS, keep_user_agent=True):
+    """
+    Add the UA_Code column and the parsed User-Agent dimensions to an event log.
+
+    Args:
+        df (pd.DataFrame): Event log with a User_Agent column.
+        table (UserAgentTable): Dimension table, extended with any new User-Agents.
+        columns (list): Dimensions to add.
+        keep_user_agent (bool): Keep the raw strings; otherwise UA_Code takes User_Agent's place.
+
+    Returns:
+        pd.DataFrame: Copy of `df` with UA_Code and the dimension columns.
+    """
+    codes = table.encode(df['User_Agent'])
+    position = df.columns.get_loc('User_Agent') + (1 if keep_user_agent else 0)
+    df = df.copy() if keep_user_agent else df.drop(columns='User_Agent')
+    df.insert(position, 'UA_Code', codes)
+    for column, values in table.dimensions(codes, columns).items():
+        df[column] = values.to_numpy() if column == 'is_bot' else values.array
+    return df
+
+
+def session_metrics_by(df, table, dimensions=('device',), conversion_event='Add_to_Cart'):
+    """
+    Session counts, depth, duration and conversion rate per User-Agent dimension.
+
+    A session is attributed to the User-Agent of its first event. The log's UA_Code column
+    is used when present, otherwise the User_Agent strings are encoded once; every dimension
+    is then a bincount over the small integer codes of its values.
+
+    Args:
+        df (pd.DataFrame): Event log with Session_ID, TimeStamp, Event and UA_Code or User_Agent.
+        table (UserAgentTable): Dimension table, extended with any new User-Agents.
+        dimensions (list): Any of 'device', 'browser', 'os' and 'is_bot'.
+        conversion_event (str): Event that marks a converting session.
+
+    Returns:
+        dict: Dimension -> DataFrame with one row per value: Sessions, Events, Events_Per_Session,
+            Avg_Duration_Minutes, Converting_Sessions and Conversion_Rate (%), most sessions first.
+    """
+    if 'UA_Code' in df.columns:
+        ua_codes = df['UA_Code'].to_numpy(dtype=np.int64)
+        if len(ua_codes) and (ua_codes.min() < 0 or ua_codes.max() >= len(table)):
+            raise ValueError(f"UA_Code values are missing from the User-Agent table {table.path}")
+    else:
+        ua_codes = table.encode(df['User_Agent'])
+    session_codes, session_ids = pd.factorize(df['Session_ID'])
+    valid = session_codes >= 0
+    session_codes, ua_codes = session_codes[valid], ua_codes[valid]
+    times = timestamps_to_ns(df['TimeStamp'])[valid]
+    events = df['Event'].to_numpy()[valid]
+    n_sessions = len(session_ids)
+
+    _, first_rows = np.unique(session_codes, return_index=True)
+    session_ua = ua_codes[first_rows]
+    start = np.full(n_sessions, np.iinfo(np.int64).max)
+    end = np.full(n_sessions, np.iinfo(np.int64).min)
+    np.minimum.at(start, session_codes, times)
+    np.maximum.at(end, session_codes, times)
+    depth = np.bincount(session_codes, minlength=n_sessions)
+    duration = (end - start) / 60e9
+    converted = np.bincount(session_codes, weights=events == conversion_event, minlength=n_sessions) > 0
+
+    breakdowns = {}
+    for dimension in dimensions:
+        value_codes, values = table.value_codes(dimension)
+        group = value_codes[session_ua]
+        sessions = np.bincount(group, minlength=len(values))
+        present = sessions > 0
+        summary = pd.DataFrame({
+            dimension: np.asarray(values)[present],
+            'Sessions': sessions[present],
+            'Events': np.bincount(group, weights=depth, minlength=len(values))[present].astype(np.int64),
+            'Avg_Duration_Minutes': np.bincount(group, weights=duration, minlength=len(values))[present],
+            'Converting_Sessions': np.bincount(group, weights=converted, minlength=len(values))[present].astype(np.int64),
+        })
+        summary.insert(3, 'Events_Per_Session', (summary['Events'] / summary['Sessions']).round(2))
+        summary['Avg_Duration_Minutes'] = (summary['Avg_Duration_Minutes'] / summary['Sessions']).round(2)
+        summary['Conversion_Rate'] = (summary['Converting_Sessions'] / summary['Sessions'] * 100).round(2)
+        breakdowns[dimension] = summary.sort_values(['Sessions', dimension], ascending=[False, True], ignore_index=True)
+    return breakdowns
+
+
+@instrumented('analyze_user_agents')
+def analyze_user_agents(file_path, report_dir, table_path=None, time_range=None):
+    """
+    Per-device, per-browser and per-OS session and conversion metrics.
+
+    Args:
+        file_path (str or pd.DataFrame): Path to the event logs CSV file or partitioned event
+            store, or the event log itself, with User_Agent or UA_Code.
+        report_dir (str): Directory to save the tables and chart.
+        table_path (str or UserAgentTable, optional): Persisted User-Agent table, or one already
+            opened; defaults to user_agents.parquet next to the event log (where run_pipeline
+            keeps it). New User-Agents are added to it.
+        time_range (tuple, optional): (start, end); only events in [start, end) are used.
+
+    Returns:
+        dict: visualizations and textual_data, as produced by the other analysis modules.
+    """
+    os.makedirs(report_dir, exist_ok=True)
+    from_frame = isinstance(file_path, pd.DataFrame)
+    if isinstance(table_path, UserAgentTable):
+        table = table_path
+    elif table_path or not from_frame:
+        table = UserAgentTable(table_path or os.path.join(os.path.dirname(os.path.abspath(file_path)), UA_TABLE_FILE))
+    else:
+        raise ValueError("table_path is required for an in-memory event log")
+    # Logs written by the pipeline carry UA_Code (and, unless dropped, the raw strings too)
+    columns = file_path.columns if from_frame else event_log_columns(file_path)
+    ua_column = 'UA_Code' if 'UA_Code' in columns else 'User_Agent'
+    columns = ['Session_ID', 'TimeStamp', 'Event', ua_column]
+    if from_frame:
+        df = filter_time_range(file_path, time_range)[columns]
+    else:
+        df = load_event_log(file_path, columns=columns, time_range=time_range)
+
+    breakdowns = session_metrics_by(df, table, ('device', 'browser', 'os'))
+    if table.parsed and table.path:
+        table.save()
+    for dimension, summary in breakdowns.items():
+        summary.to_csv(os.path.join(report_dir, f'sessions_by_{dimension}.csv'), index=False)
+
+    by_device = breakdowns['device']
+    plt.figure(figsize=(8, 5))
+    plt.bar(by_device['device'].astype(str), by_device['Conversion_Rate'], color='steelblue')
+    plt.title('Add_to_Cart Conversion Rate by Device')
+    plt.xlabel('Device')
+    plt.ylabel('Sessions with Add_to_Cart (%)')
+    plt.tight_layout()
+    img_path = os.path.join(report_dir, 'conversion_by_device.png')
+    plt.savefig(img_path)
+    plt.close()
+
+    report = (
+        f"Distinct User-Agents: {len(table)} ({table.parsed} newly parsed)\n\n"
+        + "\n\n".join(f"Sessions by {dimension}:\n{summary.to_string(index=False)}"
+                      for dimension, summary in breakdowns.items())
+        + "\n"
+    )
+    return {
+        "visualizations": {"Conversion by Device": img_path},
+        "textual_data": {"Device Breakdown": report}
+    }
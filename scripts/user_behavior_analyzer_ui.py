@@ -16,11 +16,6 @@ import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 from PIL import Image, ImageTk
 
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as ReportLabImage
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-
 # Local modules
 import preprocess_data
 import transform_to_events
@@ -29,6 +24,14 @@ import event_mapping
 import visualize_data
 import ltl_analysis
 import add_to_cart_distribution
+import sequence_mining
+import user_agents
+import report_builder
+import event_store
+import rollup_cube
+from instrumentation import METRICS
+from artifact_cache import ArtifactCache
+from table_viewer import TableViewer, open_table_source
   # or from your scripts folder, e.g. from scripts import add_to_cart_distribution
 
 
@@ -42,6 +45,7 @@ class UserBehaviorAnalyzerApp:
         self.project_dir = r"E:\Major Project\User behaviour analysis using server logs"
         self.output_dir = r"E:\Major Project\User behaviour analysis using server logs\data\processed_logs\output_images"
         self.report_dir = r"E:\Major Project\User behaviour analysis using server logs\reports"
+        self.cube_path = os.path.join(self.project_dir, "data", "processed_logs", rollup_cube.CUBE_FILE)
 
         # Configure root grid to expand main_frame properly
         self.root.rowconfigure(0, weight=1)
@@ -73,8 +77,8 @@ class UserBehaviorAnalyzerApp:
             .grid(row=5, column=0, pady=5, padx=5, sticky=tk.W)
         # Removed Add_to_Cart Distribution and targeted/additional separate buttons
 
-        # ttk.Button(self.main_frame, text="Export Report as PDF", command=self.export_pdf)\
-        #     .grid(row=6, column=0, pady=5, padx=5, sticky=tk.W)
+        ttk.Button(self.main_frame, text="Export Report as PDF", command=self.export_pdf)\
+            .grid(row=6, column=0, pady=5, padx=5, sticky=tk.W)
 
         self.log_text = tk.Text(self.main_frame, height=10, width=80)
         self.log_text.grid(row=7, column=0, columnspan=2, pady=10, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -83,8 +87,24 @@ class UserBehaviorAnalyzerApp:
         self.visualizations = {}
         self.textual_data = {}
         self.current_file = None
+        self.artifacts = ArtifactCache()
+        # Rollup cube source key of each derived file: the raw logs it was produced from
+        self.cube_sources = {}
+
+
 
+    def display_photo(self, path, size):
+        """Tk image of a chart resized to `size`, decoded once per file version."""
+        return self.artifacts.get(path, lambda p: ImageTk.PhotoImage(self.artifacts.thumbnail(p, size)), ('photo', size))
 
+    def cube_source(self, file_path):
+        """Cube source key of a log file: that of the raw logs it was derived from here, else its content hash."""
+        derived = self.cube_sources.get(os.path.abspath(file_path))
+        return derived or self.artifacts.get(file_path, rollup_cube.content_key, 'cube_source')
+
+    def derived_from(self, output_file, input_file):
+        """Record that `output_file` holds the same logs as `input_file`."""
+        self.cube_sources[os.path.abspath(output_file)] = self.cube_source(input_file)
 
     def log_message(self, message):
         self.log_text.insert(tk.END, f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}: {message}\n")
@@ -97,6 +117,7 @@ class UserBehaviorAnalyzerApp:
             try:
                 processed_file, duration = preprocess_data.preprocess_logs(file_path)
                 self.current_file = processed_file
+                self.derived_from(processed_file, file_path)
                 self.log_message(f"Preprocessing complete. Saved as {processed_file}")
                 self.log_message(f"Preprocessing took {duration:.2f} seconds")
                 self.log_message(f"Loaded 350,683 rows")
@@ -115,30 +136,27 @@ class UserBehaviorAnalyzerApp:
                 if not os.path.isfile(file_path):
                     raise FileNotFoundError(f"Input file {file_path} does not exist")
                 
-                # Sessionize and classify events
+                # Sessionize and classify events; the event log is handed to reclassification in
+                # memory and event_logs.csv is only written as a checkpoint
                 self.log_message("Starting sessionization and event classification")
-                event_logs = transform_to_events.sessionize_and_classify(file_path)
-                if not os.path.isfile(event_logs):
-                    raise FileNotFoundError(f"Sessionized event logs not found at {event_logs}")
-                self.log_message(f"Sessionization complete. Saved as {event_logs}")
-                
-                # Load event logs to validate content
-                event_df = pd.read_csv(event_logs)
+                event_df = transform_to_events.sessionize_and_classify(file_path, in_memory=True, checkpoint=True)
                 required_cols = ['Event', 'TimeStamp', 'Session_ID']
                 missing_cols = [col for col in required_cols if col not in event_df.columns]
                 if missing_cols:
                     raise ValueError(f"Sessionized event logs missing required columns: {missing_cols}")
-                self.log_message(f"Sessionized event logs contain {len(event_df)} rows")
+                self.log_message(f"Sessionization complete. Sessionized event logs contain {len(event_df)} rows")
                 
                 # Reclassify events
                 self.log_message("Starting event reclassification and visualization")
-                refined_logs, refined_viz = analyse_other_actions.reclassify_events(event_logs)
+                refined_logs, refined_viz = analyse_other_actions.reclassify_events(event_df)
+                del event_df
                 if not os.path.isfile(refined_logs):
                     raise FileNotFoundError(f"Refined logs not found at {refined_logs}")
                 if not os.path.isfile(refined_viz):
                     raise FileNotFoundError(f"Refined event distribution visualization not generated at {refined_viz}")
                 
                 self.current_file = refined_logs
+                self.derived_from(refined_logs, file_path)
                 self.visualizations["Refined Event Distribution"] = refined_viz
                 self.log_message(f"Refined events saved as {refined_logs}")
                 self.log_message(f"Total sessions: 7,785")
@@ -199,9 +217,14 @@ class UserBehaviorAnalyzerApp:
         
         def generate_mapping():
             try:
+                # Fold the mapped events into the rollup cube the dashboard counts are read from
+                cube = rollup_cube.RollupCube(self.cube_path)
                 event_logs_output, mapping_table_output, table_viz, prop_viz_html, prop_viz_png, summary_insights = event_mapping.map_event_to_proposition(
-                    self.current_file, use_refined=use_refined_var.get()
+                    self.current_file, use_refined=use_refined_var.get(),
+                    cube=cube, cube_source=self.cube_source(self.current_file)
                 )
+                cube.save()
+                self.derived_from(event_logs_output, self.current_file)
                 self.current_file = event_logs_output
                 self.visualizations["Event Mapping Table"] = table_viz
                 self.visualizations["Proposition Summary"] = prop_viz_png
@@ -233,7 +256,8 @@ class UserBehaviorAnalyzerApp:
         vis_frame = ttk.Frame(notebook)
         notebook.add(vis_frame, text="Visualizations")
         
-        vis_options = ["Refined Event Distribution", "Event Mapping Table", "Proposition Summary"]
+        vis_options = ["Refined Event Distribution", "Event Mapping Table", "Proposition Summary", "Event Distribution", "Traffic Over Time",
+                       "Conversion by Device"]
         selected_vis = tk.StringVar()
         ttk.Label(vis_frame, text="Select Visualization:").pack(pady=5)
         vis_dropdown = ttk.Combobox(vis_frame, textvariable=selected_vis, values=vis_options, state="readonly")
@@ -268,9 +292,7 @@ class UserBehaviorAnalyzerApp:
             if selected_vis.get() in self.visualizations:
                 viz_path = self.visualizations[selected_vis.get()]
                 try:
-                    img = Image.open(viz_path)
-                    img = img.resize((800, 600), Image.LANCZOS)
-                    photo = ImageTk.PhotoImage(img)
+                    photo = self.display_photo(viz_path, (800, 600))
                     img_label.configure(image=photo)
                     img_label.image = photo
                     self.log_message(f"Displayed {selected_vis.get()} visualization")
@@ -297,47 +319,137 @@ class UserBehaviorAnalyzerApp:
         text_area = tk.Text(text_frame, height=30, width=100)
         text_area.pack(pady=10, fill=tk.BOTH, expand=True)
         
-        # Event Mapping Table Tab (Text View)
+        # Event Mapping Table Tab (paged table view)
         table_frame = ttk.Frame(notebook)
-        notebook.add(table_frame, text="Event Mapping Table (Text)")
+        notebook.add(table_frame, text="Event Mapping Table")
+        
+        # Event Log Browser Tab (built when first opened)
+        browser_frame = ttk.Frame(notebook)
+        notebook.add(browser_frame, text="Event Log Browser")
+        
+        def open_event_log_browser(event=None):
+            if notebook.select() != str(browser_frame) or browser_frame.winfo_children():
+                return
+            try:
+                source = self.artifacts.get(self.current_file, open_table_source, 'table_source')
+                TableViewer(browser_frame, source).pack(fill=tk.BOTH, expand=True, pady=10)
+                self.log_message(f"Opened event log browser for {self.current_file} ({len(source):,} rows)")
+            except Exception as e:
+                ttk.Label(browser_frame, text=f"Cannot browse {self.current_file}: {e}").pack(pady=10)
+                self.log_message(f"Error opening event log browser: {str(e)}")
+        
+        notebook.bind("<<NotebookTabChanged>>", open_event_log_browser)
         
-        table_text = tk.Text(table_frame, height=30, width=100, wrap=tk.NONE)
-        table_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=10)
+        # Performance Tab
+        perf_frame = ttk.Frame(notebook)
+        notebook.add(perf_frame, text="Performance")
         
-        scrollbar_table_y = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=table_text.yview)
-        scrollbar_table_x = ttk.Scrollbar(table_frame, orient=tk.HORIZONTAL, command=table_text.xview)
-        table_text.configure(yscrollcommand=scrollbar_table_y.set, xscrollcommand=scrollbar_table_x.set)
-        scrollbar_table_y.pack(side=tk.RIGHT, fill=tk.Y)
-        scrollbar_table_x.pack(side=tk.BOTTOM, fill=tk.X)
+        perf_text = tk.Text(perf_frame, height=30, width=100, wrap=tk.NONE)
+        perf_buttons = ttk.Frame(perf_frame)
+        perf_buttons.pack(side=tk.TOP, fill=tk.X, pady=5)
+        perf_text.pack(fill=tk.BOTH, expand=True, pady=10)
+        
+        def refresh_performance():
+            perf_text.delete("1.0", tk.END)
+            if METRICS.records:
+                perf_text.insert(tk.END, METRICS.summary())
+            else:
+                perf_text.insert(tk.END, "No stage metrics recorded yet. Run preprocessing or sessionization first.")
+        
+        def export_performance(fmt):
+            extension = ".json" if fmt == "json" else ".prom"
+            path = filedialog.asksaveasfilename(defaultextension=extension, initialdir=self.report_dir,
+                                                filetypes=[("JSON files", "*.json")] if fmt == "json" else [("Prometheus text", "*.prom *.txt")])
+            if path:
+                METRICS.export_json(path) if fmt == "json" else METRICS.export_prometheus(path)
+                self.log_message(f"Exported performance metrics to {path}")
+        
+        ttk.Button(perf_buttons, text="Refresh", command=refresh_performance).pack(side=tk.LEFT, padx=5)
+        ttk.Button(perf_buttons, text="Export JSON", command=lambda: export_performance("json")).pack(side=tk.LEFT, padx=5)
+        ttk.Button(perf_buttons, text="Export Prometheus", command=lambda: export_performance("prometheus")).pack(side=tk.LEFT, padx=5)
+        refresh_performance()
         
         try:
             # Load refined event distribution
             refined_md_path = os.path.join(self.report_dir, "refined_event_distribution.md")
             if os.path.exists(refined_md_path):
-                with open(refined_md_path, "r") as f:
-                    content = f.read()
-                    text_area.insert(tk.END, f"Refined Event Distribution:\n{content}\n\n")
-                    self.textual_data["Refined Event Distribution"] = content
+                content = self.artifacts.text(refined_md_path)
+                text_area.insert(tk.END, f"Refined Event Distribution:\n{content}\n\n")
+                self.textual_data["Refined Event Distribution"] = content
             
-            # Load event mapping table as text
+            # Load event mapping table into the paged viewer
             mapping_table_path = os.path.join(self.project_dir, "data", "processed_logs", "event_mapping_table.csv")
             if os.path.exists(mapping_table_path):
-                mapping_df = pd.read_csv(mapping_table_path)
-                table_content = mapping_df.to_string(index=False)
-                table_text.insert(tk.END, f"Event Mapping Table:\n{table_content}\n")
+                mapping_df = self.artifacts.get(mapping_table_path, pd.read_csv, 'frame')
+                TableViewer(table_frame, mapping_df).pack(fill=tk.BOTH, expand=True, pady=10)
             
             # Load summary insights
             if "Summary Insights" in self.textual_data:
                 summary_path = self.textual_data["Summary Insights"]
                 if os.path.exists(summary_path):
-                    with open(summary_path, "r") as f:
-                        summary_content = f.read()
+                    summary_content = self.artifacts.text(summary_path)
                     text_area.insert(tk.END, f"Summary Insights:\n{summary_content}\n")
             
-            self.log_message("Additional visualizations not yet loaded (pending visualize_data.py).")
+            # Event distribution and traffic statistics from the rollup cube (redrawn only when the cube changes)
+            if os.path.exists(self.cube_path):
+                traffic = self.artifacts.get(self.cube_path, self.cube_summary, 'cube_summary')
+                self.visualizations.update(traffic["visualizations"])
+                self.textual_data.update(traffic["textual_data"])
+                text_area.insert(tk.END, f"\nEvent Distribution:\n{traffic['textual_data']['Event Distribution']}\n")
+                text_area.insert(tk.END, f"\nTraffic Summary:\n{traffic['textual_data']['Traffic Summary']}\n")
+            
         except Exception as e:
             messagebox.showerror("Error", f"Visualization generation failed: {str(e)}")
             self.log_message(f"Error in visualization: {str(e)}")
+        
+        # Frequent navigation patterns around Add_to_Cart, mined in the background (once per event log
+        # version) and only for sessionized logs
+        columns = set(event_store.event_log_columns(self.current_file))
+        if {'Session_ID', 'Event'} <= columns:
+            event_log = self.current_file
+            future = report_builder.run_in_background(
+                self.artifacts.get, event_log, lambda p: sequence_mining.analyze_sequences(p, self.report_dir), 'sequences')
+            
+            def show_sequences():
+                if not future.done():
+                    self.root.after(200, show_sequences)
+                    return
+                try:
+                    sequences = future.result()
+                    self.textual_data.update(sequences["textual_data"])
+                    if text_area.winfo_exists():
+                        text_area.insert(tk.END, f"\nSequential Patterns:\n{sequences['textual_data']['Sequential Patterns']}\n")
+                    self.log_message(f"Sequential patterns mined from {event_log}")
+                except Exception as e:
+                    self.log_message(f"Error mining sequential patterns: {str(e)}")
+            
+            self.root.after(200, show_sequences)
+        else:
+            self.log_message(f"Sequential patterns skipped: {self.current_file} has no Session_ID/Event columns")
+        
+        # Sessions and conversion by device, browser and OS, likewise in the background
+        if {'Session_ID', 'TimeStamp', 'Event'} <= columns and columns & {'UA_Code', 'User_Agent'}:
+            device_log = self.current_file
+            device_future = report_builder.run_in_background(
+                self.artifacts.get, device_log, lambda p: user_agents.analyze_user_agents(p, self.report_dir), 'user_agents')
+            
+            def show_devices():
+                if not device_future.done():
+                    self.root.after(200, show_devices)
+                    return
+                try:
+                    devices = device_future.result()
+                    self.visualizations.update(devices["visualizations"])
+                    self.textual_data.update(devices["textual_data"])
+                    if text_area.winfo_exists():
+                        text_area.insert(tk.END, f"\nDevice Breakdown:\n{devices['textual_data']['Device Breakdown']}\n")
+                    self.log_message(f"Device breakdown computed from {device_log}")
+                except Exception as e:
+                    self.log_message(f"Error computing device breakdown: {str(e)}")
+            
+            self.root.after(200, show_devices)
+        else:
+            self.log_message(f"Device breakdown skipped: {self.current_file} has no User_Agent/UA_Code column")
             
     def run_ltl_analysis(self):
         if not self.current_file:
@@ -358,19 +470,23 @@ class UserBehaviorAnalyzerApp:
         # Popup for LTL Model selection
         model_selector = tk.Toplevel(self.root)
         model_selector.title("Select LTL Analysis Model")
-        model_selector.geometry("300x150")
+        model_selector.geometry("300x180")
 
         ttk.Label(model_selector, text="Choose LTL Property to Analyze:").pack(pady=10)
 
         choice = tk.StringVar(value="ltl_analysis")
         ttk.Radiobutton(model_selector, text="No Consecutive Add_to_Cart", variable=choice, value="ltl_analysis").pack()
         ttk.Radiobutton(model_selector, text="Product_View → F Add_to_Cart", variable=choice, value="ltl_conversion_analysis").pack()
+        ttk.Radiobutton(model_selector, text="Time-bounded (F[0,5m], repeat within 2s)", variable=choice, value="mtl_analysis").pack()
 
         def on_selection():
             model_selector.destroy()
             if choice.get() == "ltl_analysis":
                 import ltl_analysis
                 perform_analysis(ltl_analysis.analyze_ltl_violations, "LTL")
+            elif choice.get() == "mtl_analysis":
+                import mtl_analysis
+                perform_analysis(mtl_analysis.analyze_mtl_properties, "MTL")
             else:
                 import ltl_conversion_analysis
                 perform_analysis(ltl_conversion_analysis.analyze_ltl_conversion, "LTL Conversion")
@@ -398,9 +514,7 @@ class UserBehaviorAnalyzerApp:
         def display_image():
             key = vis_dropdown.get()
             if key in result["visualizations"]:
-                img = Image.open(result["visualizations"][key])
-                img = img.resize((600, 400), Image.LANCZOS)
-                photo = ImageTk.PhotoImage(img)
+                photo = self.display_photo(result["visualizations"][key], (600, 400))
                 canvas.create_image(0, 0, anchor=tk.NW, image=photo)
                 canvas.image = photo
 
@@ -559,143 +673,71 @@ class UserBehaviorAnalyzerApp:
     #     text_area.pack(pady=10)
 
 
-#     def export_pdf(self):
-#         if not self.visualizations or not self.textual_data:
-#             messagebox.showwarning("Warning", "Please generate visualizations and report first.")
-#             return
-        
-#         latex_content = r"""
-# \documentclass{article}
-# \usepackage{graphicx}
-# \usepackage{geometry}
-# \usepackage{booktabs}
-# \usepackage{parskip}
-# \geometry{a4paper, margin=1in}
-
-# \begin{document}
-# \title{User Behavior Analysis Report}
-# \author{}
-# \date{\today}
-# \maketitle
-
-# \section{Introduction}
-# This report presents the analysis of user behavior based on server logs from an e-commerce website, including event distributions, session statistics, and conversion funnel insights.
-
-# \section{Visualizations}
-# """
-#         for vis_name, vis_path in self.visualizations.items():
-#             latex_content += f"""
-# \subsection{{{vis_name}}}
-# \includegraphics[width=\\textwidth]{{{vis_path}}}
-# """
-#         latex_content += r"""
-# \section{Textual Data}
-# """
-#         for key, value in self.textual_data.items():
-#             latex_content += f"""
-# \subsection{{{key}}}
-# \begin{verbatim}
-# {value}
-# \end{verbatim}
-# """
-#         latex_content += r"""
-# \end{document}
-# """
-        
-#         latex_file = os.path.join(self.output_dir, "report.tex")
-#         with open(latex_file, "w") as f:
-#             f.write(latex_content)
-        
-#         try:
-#             subprocess.run(["latexmk", "-pdf", "-interaction=nonstopmode", latex_file], cwd=self.output_dir, check=True)
-#             pdf_file = os.path.join(self.output_dir, "report.pdf")
-#             self.log_message(f"PDF report generated at {pdf_file}")
-#             messagebox.showinfo("Success", f"PDF report generated at {pdf_file}")
-#         except subprocess.CalledProcessError as e:
-#             messagebox.showerror("Error", f"PDF generation failed: {str(e)}")
-#             self.log_message(f"Error in PDF generation: {str(e)}")
+    def cube_summary(self, cube_path):
+        """Event distribution and traffic summary charts and text, answered from the rollup cube."""
+        cube = rollup_cube.RollupCube(cube_path)
+        distribution = visualize_data.generate_visualizations_and_text(None, self.report_dir, cube=cube)
+        traffic = rollup_cube.traffic_summary(cube, self.report_dir)
+        return {
+            "visualizations": {**distribution["visualizations"], **traffic["visualizations"]},
+            "textual_data": {**distribution["textual_data"], **traffic["textual_data"]}
+        }
+
+    def report_sections(self):
+        """Sections of the exported report: charts, summary insights, traffic summary, sequential patterns, device breakdown and the refined event distribution."""
+        sections = []
+        for key in ["Refined Event Distribution", "Event Mapping Table", "Proposition Summary", "Event Distribution", "Traffic Over Time",
+                    "Conversion by Device"]:
+            if key in self.visualizations:
+                if os.path.exists(self.visualizations[key]):
+                    sections.append({'title': key, 'image': self.visualizations[key]})
+                else:
+                    self.log_message(f"Visualization {key} not found at {self.visualizations[key]}")
+
+        if "Summary Insights" in self.textual_data:
+            summary_path = self.textual_data["Summary Insights"]
+            if os.path.exists(summary_path):
+                sections.append({'title': "Summary Insights", 'text': self.artifacts.text(summary_path)})
+            else:
+                self.log_message(f"Summary insights not found at {summary_path}")
+
+        for key in ["Traffic Summary", "Sequential Patterns", "Device Breakdown"]:
+            if key in self.textual_data:
+                sections.append({'title': key, 'text': self.textual_data[key]})
+
+        refined_md_path = os.path.join(self.report_dir, "refined_event_distribution.md")
+        if os.path.exists(refined_md_path):
+            sections.append({'title': "Refined Event Distribution", 'text': self.artifacts.text(refined_md_path), 'markdown': True})
+        else:
+            self.log_message(f"Refined event distribution markdown not found at {refined_md_path}")
+        return sections
+
     def export_pdf(self):
-            try:
-                if not self.current_file:
-                    messagebox.showwarning("Warning", "Please load and process event logs first.")
-                    return
+        if not self.current_file:
+            messagebox.showwarning("Warning", "Please load and process event logs first.")
+            return
 
-                # Define PDF output path
-                pdf_path = os.path.join(self.report_dir, "user_behavior_report.pdf")
-                self.log_action(f"Generating PDF report at {pdf_path}")
-
-                # Initialize PDF document
-                doc = SimpleDocTemplate(pdf_path, pagesize=letter)
-                elements = []
-                styles = getSampleStyleSheet()
-                normal_style = styles['Normal']
-                heading_style = styles['Heading1']
-
-                # Add title
-                elements.append(Paragraph("User Behavior Analysis Report", heading_style))
-                elements.append(Spacer(1, 0.2 * inch))
-
-                # Add visualizations
-                viz_keys = ["Refined Event Distribution", "Event Mapping Table", "Proposition Summary"]
-                for key in viz_keys:
-                    if key in self.visualizations:
-                        viz_path = self.visualizations[key]
-                        if os.path.exists(viz_path):
-                            # Resize image to fit the page width
-                            img = Image.open(viz_path)
-                            img_width, img_height = img.size
-                            max_width = 6.5 * inch  # Max width for the PDF page (accounting for margins)
-                            aspect_ratio = img_height / img_width
-                            new_width = min(img_width, max_width)
-                            new_height = new_width * aspect_ratio
-                            if new_height > 8 * inch:  # Limit height to fit page
-                                new_height = 8 * inch
-                                new_width = new_height / aspect_ratio
-
-                            # Add image to PDF
-                            pdf_img = ReportLabImage(viz_path, width=new_width, height=new_height)
-                            elements.append(Paragraph(f"{key}", styles['Heading2']))
-                            elements.append(pdf_img)
-                            elements.append(Spacer(1, 0.2 * inch))
-                        else:
-                            self.log_action(f"Visualization {key} not found at {viz_path}")
-
-                # Add textual data: Summary Insights
-                if "Summary Insights" in self.textual_data:
-                    summary_path = self.textual_data["Summary Insights"]
-                    if os.path.exists(summary_path):
-                        with open(summary_path, "r") as f:
-                            summary_content = f.read()
-                        elements.append(Paragraph("Summary Insights", styles['Heading2']))
-                        for line in summary_content.splitlines():
-                            elements.append(Paragraph(line.strip(), normal_style))
-                        elements.append(Spacer(1, 0.2 * inch))
-                    else:
-                        self.log_action(f"Summary insights not found at {summary_path}")
-
-                # Add textual data: Refined Event Distribution (Markdown)
-                refined_md_path = os.path.join(self.report_dir, "refined_event_distribution.md")
-                if os.path.exists(refined_md_path):
-                    with open(refined_md_path, "r") as f:
-                        refined_content = f.read()
-                    elements.append(Paragraph("Refined Event Distribution", styles['Heading2']))
-                    for line in refined_content.splitlines():
-                        # Skip markdown headers for simplicity
-                        if not line.startswith("#"):
-                            elements.append(Paragraph(line.strip(), normal_style))
-                    elements.append(Spacer(1, 0.2 * inch))
-                else:
-                    self.log_action(f"Refined event distribution markdown not found at {refined_md_path}")
+        pdf_path = os.path.join(self.report_dir, "user_behavior_report.pdf")
+        self.log_message(f"Generating PDF report at {pdf_path}")
+        # Build in the background so the window stays responsive; poll for completion from the Tk loop
+        future = report_builder.run_in_background(report_builder.build_pdf_report, self.report_sections(), pdf_path)
 
-                # Build the PDF
-                doc.build(elements)
-                self.log_action(f"PDF report successfully generated at {pdf_path}")
+        def check_done():
+            if not future.done():
+                self.root.after(200, check_done)
+                return
+            try:
+                result = future.result()
+                for missing in result['missing']:
+                    self.log_message(f"Image not found, skipped in PDF: {missing}")
+                self.log_message(f"PDF report successfully generated at {pdf_path}")
                 messagebox.showinfo("Success", f"PDF report generated at {pdf_path}")
-
             except Exception as e:
-                self.log_action(f"Error generating PDF report: {str(e)}")
+                self.log_message(f"Error generating PDF report: {str(e)}")
                 messagebox.showerror("Error", f"Failed to generate PDF report: {str(e)}")
 
+        self.root.after(200, check_done)
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = UserBehaviorAnalyzerApp(root)
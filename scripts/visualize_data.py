@@ -2,8 +2,17 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import os
 
-def generate_visualizations_and_text(input_file, report_dir):
-    df = pd.read_csv(input_file)
+def generate_visualizations_and_text(input_file, report_dir, cube=None, time_range=None):
+    """
+    Event distribution chart and percentages.
+
+    Args:
+        input_file (str): Path to the event logs CSV file (unused when `cube` is given).
+        report_dir (str): Directory to save the chart.
+        cube (rollup_cube.RollupCube, optional): Answer from the pre-aggregated cube instead of
+            reading the event log.
+        time_range (tuple, optional): (start, end) minute range of the cube to use.
+    """
     output = {
         "visualizations": {},
         "textual_data": {}
@@ -13,7 +22,13 @@ def generate_visualizations_and_text(input_file, report_dir):
     os.makedirs(report_dir, exist_ok=True)
 
     # 1. Event distribution plot
-    event_counts = df['Event'].value_counts()
+    if cube is not None:
+        event_counts = cube.counts('Event', time_range=time_range)
+        total_events = int(event_counts.sum())
+    else:
+        df = pd.read_csv(input_file)
+        event_counts = df['Event'].value_counts()
+        total_events = len(df)
     plot_path = os.path.join(report_dir, 'event_distribution.png')
 
     plt.figure(figsize=(8, 6))
@@ -27,7 +42,6 @@ def generate_visualizations_and_text(input_file, report_dir):
     plt.close()
 
     # 2. Textual stats
-    total_events = len(df)
     event_percentages = (event_counts / total_events * 100).round(2)
     markdown_text = "### Event Distribution (in %)\n"
     for event, pct in event_percentages.items():
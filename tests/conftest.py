@@ -0,0 +1,37 @@
+import os
+import sys
+
+# The analysis modules import each other as top-level modules from scripts/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def processed_logs(tmp_path):
+    """Small processed_data.csv with repeat visitors, timestamp ties, static assets and referrer changes."""
+    rng = np.random.default_rng(0)
+    rows = 2000
+    start = pd.Timestamp('2024-01-01 00:00:00.123456789', tz='UTC')
+    # Gaps between requests (of any visitor) from none (ties) to a minute, so a visitor's gaps span
+    # the session timeouts; never whole seconds, as preprocessing writes nanosecond timestamps
+    seconds = rng.choice([0, 1, 2, 5, 10, 30, 60], size=rows)
+    offsets = np.cumsum(seconds * 10**9 + np.where(seconds > 0, rng.integers(1, 10**9 - 1, size=rows) // 2, 0))
+    df = pd.DataFrame({
+        'IP': rng.choice([f"{n}PL" for n in range(40)], size=rows),
+        'TimeStamp': (start + pd.to_timedelta(rng.permutation(offsets.astype('int64')), unit='ns')).astype(str),
+        'Method': 'GET',
+        'Page_URL': rng.choice(['/p-1', '/p-2', '/koszyk', '/inne/informacja_online.php', '/index.php',
+                                '/img/logo.png', '/style.css?v=2'], size=rows),
+        'Response': 200,
+        'Bytes_Sent': rng.integers(100, 10_000, size=rows),
+        # Mostly one referrer domain per visitor, with occasional changes and empty referrers
+        'Referrer_URL': np.where(rng.random(rows) < 0.85, 'https://shop.example/p-1',
+                                 rng.choice(['-', 'https://www.google.com/', 'http://bing.com/x'], size=rows)),
+        'User_Agent': rng.choice(['Mozilla/5.0 (Windows NT 10.0)', 'Mozilla/5.0 (iPhone)'], size=rows),
+    })
+    path = tmp_path / "processed_data.csv"
+    df.to_csv(path, index=False)
+    return str(path)
@@ -0,0 +1,31 @@
+import functools
+
+import numpy as np
+
+from benchmark_pipeline import measure
+
+
+def _allocate(megabytes):
+    # Touch every page so the memory is resident
+    return int(np.ones(megabytes * 2**20, dtype=np.uint8).sum() // 2**20)
+
+
+def _fail():
+    raise ValueError("bad input")
+
+
+def test_peak_rss_is_measured_per_stage_in_its_own_process():
+    large = measure(functools.partial(_allocate, 300))
+    # Neither the earlier large stage nor the memory held by this process counts towards a stage's peak
+    held = np.ones(300 * 2**20, dtype=np.uint8)
+    small = measure(functools.partial(_allocate, 1))
+    assert large['output'] == 300 and large['error'] is None and held.all()
+    assert large['peak_mb'] - small['peak_mb'] > 250
+    assert large['seconds'] > 0 and large['cpu_seconds'] > 0
+
+
+def test_errors_are_reported_not_raised():
+    for track_memory in (True, False):
+        result = measure(_fail, track_memory)
+        assert result['error'] == "ValueError: bad input" and result['output'] is None
+    assert measure(functools.partial(_allocate, 1), track_memory=False)['peak_mb'] is None
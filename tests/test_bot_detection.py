@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bot_detection import RequestRateDetector, window_counts
+from preprocess_data import preprocess_logs
+
+START = pd.Timestamp('2024-01-01', tz='UTC')
+
+
+def test_window_counts_match_brute_force():
+    rng = np.random.default_rng(0)
+    codes = rng.integers(0, 5, size=400)
+    # Whole seconds, so many timestamps tie
+    times = rng.integers(0, 300, size=400) * 10**9
+    order = np.lexsort((times, codes))
+    codes, times = codes[order], times[order]
+    window = 30 * 10**9
+    expected = [sum(1 for j in range(i + 1) if codes[j] == codes[i] and times[j] > times[i] - window)
+                for i in range(len(codes))]
+    assert window_counts(codes, times, window).tolist() == expected
+    assert window_counts(codes[:0], times[:0], window).tolist() == []
+
+
+def _requests(seed=0):
+    """Human IPs with irregular gaps of minutes, plus a fast crawler, a burst and a clockwork poller."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for n in range(30):
+        gaps = rng.exponential(120, size=60) + 5
+        frames.append(pd.DataFrame({'IP': f"human{n}", 'offset': np.cumsum(gaps)}))
+    frames.append(pd.DataFrame({'IP': 'crawler', 'offset': np.cumsum(rng.uniform(1.0, 1.8, size=300))}))
+    frames.append(pd.DataFrame({'IP': 'burst', 'offset': 3000 + np.cumsum(rng.uniform(0.1, 0.5, size=100))}))
+    frames.append(pd.DataFrame({'IP': 'poller', 'offset': 60.0 * np.arange(1, 80)}))
+    df = pd.concat(frames).sort_values('offset', kind='stable', ignore_index=True)
+    df['TimeStamp'] = START + pd.to_timedelta(df.pop('offset'), unit='s')
+    return df
+
+
+EXPECTED_FLAGS = {'crawler': 'fast', 'burst': 'rate', 'poller': 'regular'}
+
+
+def _chunks(df, n_chunks):
+    bounds = np.linspace(0, len(df), n_chunks + 1).astype(int)
+    return [df.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+@pytest.mark.parametrize('n_chunks', [1, 3, 17])
+def test_flags_do_not_depend_on_chunking(n_chunks):
+    df = _requests()
+    detector = RequestRateDetector(window=10, max_requests=15, min_requests=50, idle_timeout=None)
+    kept = np.concatenate([detector.update(chunk) for chunk in _chunks(df, n_chunks)])
+    assert detector.flagged == EXPECTED_FLAGS
+    # Every human request is passed on
+    assert kept[df['IP'].str.startswith('human').to_numpy()].all()
+
+
+@pytest.mark.parametrize('n_chunks', [3, 17])
+def test_statistics_do_not_depend_on_chunking(n_chunks):
+    df = _requests()
+
+    def statistics(chunks):
+        # Thresholds that never trip, so every request of every IP is counted
+        detector = RequestRateDetector(window=10, max_requests=10**9, min_requests=10**9, max_gap_cv=None, idle_timeout=None)
+        for chunk in chunks:
+            detector.update(chunk)
+        state = pd.DataFrame(detector._state, index=detector._ips).sort_index()
+        return state
+
+    pd.testing.assert_frame_equal(statistics([df]), statistics(_chunks(df, n_chunks)))
+
+
+def test_idle_ips_are_evicted():
+    detector = RequestRateDetector(window=10, idle_timeout=60, max_gap_cv=None)
+    for minute in range(200):
+        # Ten new IPs every minute, each with a couple of requests
+        chunk = pd.DataFrame({'IP': [f"{minute}-{n}" for n in range(10)] * 2,
+                              'TimeStamp': START + pd.to_timedelta(minute * 60 + np.repeat([0, 5], 10), unit='s')})
+        assert detector.update(chunk).all()
+        assert len(detector._ips) <= 30
+        assert len(detector._recent_times) <= 20
+    assert detector.flagged == {}
+
+
+def test_out_of_order_chunks_do_not_look_fast():
+    offsets = np.cumsum(np.full(50, 30.0))
+    # Two files a day apart, the later one read first
+    days = [pd.DataFrame({'IP': 'human', 'TimeStamp': START + pd.Timedelta(days=day) + pd.to_timedelta(offsets, unit='s')})
+            for day in (0, 1)]
+    detector = RequestRateDetector(min_requests=50, max_gap_cv=None, idle_timeout=None)
+    detector.update(days[1])
+    detector.update(days[0])
+    assert detector.flagged == {}
+    assert detector._state['gap_sum'].min() >= 0
+
+
+def _raw_log(path, df):
+    ticks = (df['TimeStamp'] - pd.Timestamp('1970-01-01', tz='UTC')) // pd.Timedelta(microseconds=1) * 10 + 621355968000000000
+    pd.DataFrame({
+        'UserId': 0, 'IpId': df['IP'], 'TimeStamp': ticks, 'HttpMethod': 'GET', 'Uri': '/p-1', 'HttpVersion': 'HTTP/1.1',
+        'ResponseCode': 200, 'Bytes': 100, 'Referrer': '-', 'UserAgent': 'Mozilla/5.0 (Windows NT 10.0)',
+    }).to_csv(path, index=False)
+
+
+@pytest.mark.parametrize('chunksize', [None, 500])
+def test_preprocessing_drops_and_reports_flagged_ips(tmp_path, chunksize):
+    df = _requests()
+    raw = tmp_path / "eclog.csv"
+    _raw_log(raw, df)
+    detector = RequestRateDetector(window=10, max_requests=15, min_requests=50, idle_timeout=None)
+    output_file, _ = preprocess_logs(str(raw), str(tmp_path), chunksize=chunksize, workers=1, bot_detector=detector)
+
+    processed = pd.read_csv(output_file)
+    humans = processed['IP'].str.startswith('human')
+    assert (processed.loc[humans, 'IP'].value_counts() == 60).all() and processed.loc[humans, 'IP'].nunique() == 30
+    # Requests before the chunk an IP was flagged in have already been passed on
+    passed_on = processed.loc[~humans, 'IP'].value_counts()
+    if chunksize is None:
+        assert passed_on.empty
+    assert (passed_on < df['IP'].value_counts()[passed_on.index]).all()
+    flagged = pd.read_csv(tmp_path / "rate_flagged_ips.csv")
+    assert dict(zip(flagged['IP'], flagged['reason'])) == EXPECTED_FLAGS
+    assert flagged.columns.tolist() == ['IP', 'reason', 'requests', 'peak_requests_per_window', 'mean_gap_seconds', 'gap_cv']
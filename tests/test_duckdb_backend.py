@@ -0,0 +1,47 @@
+import os
+
+import pandas as pd
+import pytest
+
+import add_to_cart_distribution
+import additional_metrics
+import targeted_analysis
+from transform_to_events import sessionize_and_classify
+
+pytest.importorskip('duckdb')
+
+TIME_RANGES = [None, ('2024-01-01 06:00', '2024-01-02 00:00')]
+
+
+def _event_logs(processed_logs, tmp_path):
+    paths = {}
+    for backend in ('pandas', 'duckdb'):
+        output_dir = tmp_path / backend
+        os.makedirs(output_dir)
+        paths[backend] = sessionize_and_classify(processed_logs, str(output_dir), backend=backend)
+    return paths
+
+
+def test_sessionize_backends_write_identical_event_logs(processed_logs, tmp_path):
+    paths = _event_logs(processed_logs, tmp_path)
+    with open(paths['pandas'], 'rb') as pandas_log, open(paths['duckdb'], 'rb') as duckdb_log:
+        assert pandas_log.read() == duckdb_log.read()
+
+
+def test_sessionize_backends_agree_in_memory(processed_logs, tmp_path):
+    frames = {backend: sessionize_and_classify(pd.read_csv(processed_logs), str(tmp_path), in_memory=True, backend=backend)
+              for backend in ('pandas', 'duckdb')}
+    pd.testing.assert_frame_equal(frames['pandas'].reset_index(drop=True), frames['duckdb'], check_dtype=False)
+
+
+@pytest.mark.parametrize('time_range', TIME_RANGES)
+@pytest.mark.parametrize('analysis', [
+    additional_metrics.analyze_session_durations,
+    targeted_analysis.analyze_conversion_and_transitions,
+    add_to_cart_distribution.analyze_add_to_cart_distribution,
+])
+def test_sql_aggregations_match_pandas(processed_logs, tmp_path, analysis, time_range):
+    event_log = sessionize_and_classify(processed_logs, str(tmp_path))
+    reports = {backend: analysis(event_log, str(tmp_path / f"reports_{backend}"), time_range=time_range, backend=backend)
+               for backend in ('pandas', 'duckdb')}
+    assert reports['pandas']['textual_data'] == reports['duckdb']['textual_data']
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+import event_mapping
+from event_mapping import group_modes
+
+
+def _expected_modes(group_ids, values, n_groups):
+    modes = pd.Series(values).groupby(group_ids).agg(lambda x: x.mode()[0] if not x.mode().empty else "N/A")
+    return [modes.get(group, "N/A") for group in range(n_groups)]
+
+
+def test_group_modes_match_series_mode():
+    rng = np.random.default_rng(0)
+    rows = 500
+    group_ids = rng.integers(-1, 20, size=rows)
+    values = pd.Series(rng.choice(['a', 'b', 'c', 'd', None], size=rows), dtype=object)
+    # Group 20 has only missing values, group 21 has no rows at all
+    group_ids[:5] = 20
+    values[:5] = None
+    assert group_modes(group_ids, values, 22).tolist() == _expected_modes(group_ids, values, 22)
+
+
+def test_group_modes_break_ties_on_the_smallest_value():
+    assert group_modes(np.array([0, 0, 1, 1]), pd.Series(['b', 'a', 'c', 'c']), 2).tolist() == ['a', 'c']
+
+
+def test_group_modes_without_any_value():
+    assert group_modes(np.array([0, 1, 1]), pd.Series([np.nan] * 3), 2).tolist() == ["N/A", "N/A"]
+    assert group_modes(np.array([], dtype=np.int64), pd.Series([], dtype=object), 0).tolist() == []
+
+
+def test_mapping_an_event_log_without_page_urls(tmp_path):
+    event_log = tmp_path / "event_logs.csv"
+    pd.DataFrame({
+        'Session_ID': ['1.1.1.1_1', '1.1.1.1_1'],
+        'IP': ['1.1.1.1'] * 2,
+        'TimeStamp': ['2024-01-01 10:00:00+00:00', '2024-01-01 10:00:30+00:00'],
+        'Event': ['Product_View', 'Add_to_Cart'],
+    }).to_csv(event_log, index=False)
+    mapping_table = event_mapping.map_event_to_proposition(str(event_log), str(tmp_path / "out"), str(tmp_path / "reports"))[1]
+    assert set(pd.read_csv(mapping_table, keep_default_na=False)['Simplified_Page_URL']) == {"N/A"}
@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+from event_store import load_event_log, read_partitioned, select_partitions, write_partitioned
+
+TIMES = ['2024-01-01 09:59:59.999999+00:00', '2024-01-01 10:00:00.000000+00:00', '2024-01-01 10:30:00.000000+00:00',
+         '2024-01-01 10:59:59.999999+00:00', '2024-01-01 11:00:00.000000+00:00', '2024-01-02 00:15:00.000000+00:00']
+
+
+def _event_log():
+    return pd.DataFrame({
+        'Session_ID': ['a_1', 'a_1', 'b_1', 'b_1', 'c_1', 'c_1'],
+        'IP': ['a', 'a', 'b', 'b', 'c', 'c'],
+        'TimeStamp': TIMES,
+        'Event': ['Product_View', 'Add_to_Cart', 'Info_Page_View', 'Product_View', 'Add_to_Cart', 'Checkout_View'],
+        'Page_URL': ['/p-1', '/koszyk', '/inne', '/p-2', '/koszyk', '/zamowienie'],
+    })
+
+
+@pytest.fixture
+def sources(tmp_path):
+    csv_path = tmp_path / "event_logs.csv"
+    _event_log().to_csv(csv_path, index=False)
+    return str(csv_path), write_partitioned(_event_log(), str(tmp_path / "store"))
+
+
+def _hours(entries):
+    return [entry['path'].rsplit('/', 1)[0] for entry in entries]
+
+
+def test_partitions_are_pruned_at_half_open_edges(sources):
+    _, store = sources
+    # Ends exactly where the 11:00 partition starts, so that partition is skipped
+    assert _hours(select_partitions(store, ('2024-01-01 10:00', '2024-01-01 11:00'))) == ['date=2024-01-01/hour=10']
+    # Starts just after the last row of 09:00, so that partition is skipped too
+    assert _hours(select_partitions(store, ('2024-01-01 10:00', None))) == [
+        'date=2024-01-01/hour=10', 'date=2024-01-01/hour=11', 'date=2024-01-02/hour=00']
+    assert _hours(select_partitions(store, (None, '2024-01-01 10:00:00.000001'))) == [
+        'date=2024-01-01/hour=09', 'date=2024-01-01/hour=10']
+    assert select_partitions(store, ('2024-01-03', None)) == []
+
+
+def test_rows_at_range_edges(sources):
+    _, store = sources
+    df = read_partitioned(store, ('2024-01-01 10:00', '2024-01-01 11:00'))
+    # Start is inclusive, end is exclusive
+    assert df['TimeStamp'].tolist() == [pd.Timestamp(t) for t in TIMES[1:4]]
+    assert read_partitioned(store, ('2024-01-01 10:00', '2024-01-01 10:00')).empty
+
+
+def test_event_pushdown_skips_partitions(sources):
+    _, store = sources
+    assert _hours(select_partitions(store, events=['Checkout_View'])) == ['date=2024-01-02/hour=00']
+    df = read_partitioned(store, columns=['Session_ID'], events=['Add_to_Cart'])
+    assert df.columns.tolist() == ['Session_ID'] and df['Session_ID'].tolist() == ['a_1', 'c_1']
+
+
+@pytest.mark.parametrize('query', [
+    {},
+    {'time_range': ('2024-01-01 10:00', '2024-01-01 11:00')},
+    {'time_range': (None, '2024-01-01 11:00'), 'columns': ['Session_ID', 'Event']},
+    {'time_range': ('2024-01-01 10:30', None), 'events': ['Add_to_Cart', 'Product_View']},
+    {'columns': ['IP', 'TimeStamp'], 'events': ['Add_to_Cart']},
+])
+def test_csv_and_store_return_the_same_rows(sources, query):
+    csv_path, store = sources
+    from_csv, from_store = load_event_log(csv_path, **query), load_event_log(store, **query)
+    if 'TimeStamp' in from_csv.columns:
+        from_csv['TimeStamp'] = pd.to_datetime(from_csv['TimeStamp'], utc=True)
+    assert from_csv.columns.tolist() == from_store.columns.tolist()
+    pd.testing.assert_frame_equal(from_csv, from_store, check_dtype=False)
@@ -0,0 +1,84 @@
+import pandas as pd
+import pytest
+
+from funnel_analysis import analyze_funnel, funnel_breakdown, match_funnel, resolve_steps, session_dimensions, summarize_funnel
+from session_traces import encode_traces
+
+
+def _traces(events, times):
+    return encode_traces(pd.DataFrame({
+        'Session_ID': ['s1'] * len(events),
+        'Event': events,
+        'TimeStamp': pd.to_datetime(times),
+    }))
+
+
+@pytest.mark.parametrize('window', [{'step_window': '5min'}, {'conversion_window': '5min'}])
+def test_windowed_funnel_uses_a_later_start_event(window):
+    # The first A is too old for B, the second one is not
+    traces = _traces(['A', 'A', 'B'], ['2024-01-01 00:00', '2024-01-01 01:00', '2024-01-01 01:01'])
+    assert match_funnel(traces, ['A', 'B'], **window).tolist() == [[True, True]]
+
+
+def test_windowed_funnel_rejects_steps_outside_the_window():
+    traces = _traces(['A', 'B', 'C'], ['2024-01-01 00:00', '2024-01-01 00:04', '2024-01-01 00:08'])
+    assert match_funnel(traces, ['A', 'B', 'C'], step_window='5min').tolist() == [[True, True, True]]
+    assert match_funnel(traces, ['A', 'B', 'C'], conversion_window='5min').tolist() == [[True, True, False]]
+
+
+def _sessions(sequences, start='2024-01-01 10:00'):
+    rows = [(session, event, pd.Timestamp(start) + pd.Timedelta(minutes=i))
+            for session, events in sequences.items() for i, event in enumerate(events)]
+    return pd.DataFrame(rows, columns=['Session_ID', 'Event', 'TimeStamp'])
+
+
+def test_unwindowed_funnel_matches_greedily_in_order():
+    traces = encode_traces(_sessions({
+        's1': ['A', 'B', 'C'],
+        's2': ['B', 'A', 'C', 'B'],      # B before A does not count, the later one does
+        's3': ['C', 'B', 'C'],           # never reaches step 1
+        's4': ['A', 'C', 'B'],           # C before B: stops at step 2
+        's5': ['A', 'A', 'B', 'B'],
+    }))
+    assert match_funnel(traces, ['A', 'B', 'C']).tolist() == [
+        [True, True, True], [True, True, False], [False, False, False], [True, True, False], [True, True, False]]
+    # A repeated step needs a second, later occurrence
+    assert match_funnel(traces, ['A', 'A', 'B']).tolist() == [
+        [True, False, False], [True, False, False], [False, False, False], [True, False, False], [True, True, True]]
+    # Alternatives and events missing from the log
+    assert match_funnel(traces, [('B', 'C'), 'Z']).tolist() == [[True, False]] * 5
+
+
+def test_breakdowns_by_entry_referrer_and_hour():
+    df = _sessions({'s1': ['A', 'B'], 's2': ['A'], 's3': ['B', 'A', 'B']})
+    df['TimeStamp'] = df['TimeStamp'] + pd.to_timedelta(df['Session_ID'].map({'s1': 0, 's2': 0, 's3': 5}), unit='h')
+    df['Referrer_URL'] = df['Session_ID'].map({'s1': 'https://www.google.com/x', 's2': 'https://www.google.com/', 's3': '-'})
+    traces = encode_traces(df)
+    reached = match_funnel(traces, ['A', 'B'])
+    dims = session_dimensions(df, traces)
+    assert dims['hour'].tolist() == [10, 10, 15]
+
+    by_domain = funnel_breakdown(reached, ['A', 'B'], dims['referrer_domain'].to_numpy(), 'referrer_domain')
+    google = by_domain[by_domain['referrer_domain'] == dims['referrer_domain'].iloc[0]]
+    assert dims['referrer_domain'].iloc[0] == dims['referrer_domain'].iloc[1]
+    assert google['Sessions'].tolist() == [2, 1] and google['Conversion_From_Start'].tolist() == [100.0, 50.0]
+    by_hour = funnel_breakdown(reached, ['A', 'B'], dims['hour'].to_numpy(), 'hour')
+    assert by_hour[['hour', 'Step', 'Sessions']].values.tolist() == [[10, 1, 2], [10, 2, 1], [15, 1, 1], [15, 2, 1]]
+
+    summary = summarize_funnel(reached, ['A', 'B'])
+    assert summary['Sessions'].tolist() == [3, 2] and summary['Drop_Off'].tolist() == [0, 1]
+
+
+def test_default_funnel_leaves_out_steps_missing_from_the_log(tmp_path, caplog):
+    # An unrefined event log has no Category_View or Checkout_View
+    events = ['Info_Page_View', 'Product_View', 'Add_to_Cart']
+    assert resolve_steps(None, events) == (['Info_Page_View', 'Product_View', 'Add_to_Cart'],
+                                           ['Category_View', 'Checkout_View'])
+    assert resolve_steps(['Product_View', ('Checkout_View', 'Add_to_Cart'), 'Checkout_View'], events)[1] == ['Checkout_View']
+    assert 'Checkout_View' in caplog.text
+
+    path = tmp_path / "event_logs.csv"
+    _sessions({'s1': events, 's2': ['Product_View']}).to_csv(path, index=False)
+    report = analyze_funnel(str(path), str(tmp_path / "reports"))['textual_data']['Funnel Analysis']
+    assert report.startswith("Funnel: Info_Page_View → Product_View → Add_to_Cart\n")
+    assert "Steps not in the event log: ['Category_View', 'Checkout_View']" in report
@@ -0,0 +1,33 @@
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from ingest import expand_sources, read_csv, read_csv_chunks
+from preprocess_data import preprocess_logs
+
+
+@pytest.mark.parametrize('reader', ['pandas', 'pyarrow'])
+def test_zstd_logs_are_read_without_the_zstandard_package(tmp_path, reader):
+    df = pd.DataFrame({'IP': ['1.1.1.1', '2.2.2.2', '3.3.3.3'], 'Bytes': [1, 2, 3]})
+    path = tmp_path / "logs.csv.zst"
+    with pa.output_stream(str(path), compression='zstd') as out:
+        out.write(df.to_csv(index=False).encode())
+
+    assert read_csv(str(path), reader=reader)['Bytes'].tolist() == [1, 2, 3]
+    chunks = list(read_csv_chunks(str(path), reader=reader, chunksize=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert pd.concat(chunks)['IP'].tolist() == df['IP'].tolist()
+
+
+
+@pytest.mark.parametrize('pattern', ['*.csv.gz', '.'])
+def test_sources_matching_no_log_files_raise(tmp_path, pattern):
+    (tmp_path / "notes.txt").write_text("not a log")
+    with pytest.raises(FileNotFoundError):
+        expand_sources(str(tmp_path / pattern))
+
+
+def test_preprocessing_an_empty_glob_writes_nothing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        preprocess_logs(str(tmp_path / "*.csv.gz"), str(tmp_path))
+    assert not (tmp_path / "processed_data.csv").exists()
@@ -0,0 +1,105 @@
+import json
+import logging
+import re
+import time
+
+import pytest
+
+from instrumentation import METRICS, MetricsRegistry, get_stage_logger, instrumented, timed_iter
+
+
+def test_stage_logger_writes_only_to_the_latest_log_file(tmp_path):
+    first, second = tmp_path / "first.log", tmp_path / "second.log"
+    get_stage_logger('test_stage', str(first)).info("run 1")
+    logger = get_stage_logger('test_stage', str(second))
+    logger.info("run 2")
+
+    assert "run 2" not in first.read_text()
+    assert "run 2" in second.read_text()
+    assert [h.baseFilename for h in logger.handlers if isinstance(h, logging.FileHandler)] == [str(second)]
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+
+
+@pytest.fixture
+def metrics():
+    METRICS.reset()
+    yield METRICS
+    METRICS.reset()
+
+
+def test_track_nests_and_accumulates():
+    registry = MetricsRegistry()
+    with registry.track('stage') as stage:
+        stage.rows_in = 10
+        for _ in range(3):
+            with registry.track('chunk') as chunk:
+                chunk.rows_out += 4
+                time.sleep(0.001)
+    assert list(registry.records) == ['stage', 'stage.chunk']
+    chunk = registry.records['stage.chunk']
+    assert chunk.calls == 3 and chunk.rows_out == 12
+    assert registry.records['stage'].wall_seconds >= chunk.wall_seconds >= 0.003
+
+    # Running a top-level stage again replaces its previous records
+    with registry.track('stage'):
+        pass
+    assert list(registry.records) == ['stage'] and registry.records['stage'].calls == 1
+    registry.reset()
+    assert registry.records == {}
+
+
+def test_instrumented_records_calls_and_keeps_errors(metrics):
+    @instrumented('decorated')
+    def stage(n):
+        """Docstring."""
+        if n < 0:
+            raise ValueError(n)
+        return n * 2
+
+    assert stage(2) == 4 and stage.__name__ == 'stage' and stage.__doc__ == "Docstring."
+    with pytest.raises(ValueError):
+        stage(-1)
+    # A failed call is still timed
+    assert metrics.records['decorated'].calls == 1
+
+
+def test_timed_iter_counts_items_and_rows(metrics):
+    chunks = [[1, 2, 3], [4, 5], [6]]
+    with metrics.track('read'):
+        assert list(timed_iter(chunks, 'chunk')) == chunks
+        assert list(timed_iter(iter([]), 'empty')) == []
+    assert metrics.records['read.chunk'].calls == 3
+    assert metrics.records['read.chunk'].rows_out == 6
+    assert metrics.records['read.empty'].calls == 0
+
+
+def test_prometheus_output_is_one_sample_per_line():
+    registry = MetricsRegistry()
+    with registry.track('load') as stage:
+        stage.rows_out = 5
+        with registry.track('say "hi"\\now\n'):
+            pass
+    lines = registry.to_prometheus(prefix='test').splitlines()
+    samples = [line for line in lines if not line.startswith('#')]
+    assert all(re.fullmatch(r'test_\w+\{stage="(?:[^"\\\n]|\\["\\n])*"\} \S+', line) for line in samples)
+    assert 'test_rows_out{stage="load"} 5' in samples
+    assert 'test_calls_total{stage="load.say \\"hi\\"\\\\now\\n"} 1' in samples
+    assert '# TYPE test_calls_total counter' in lines and '# TYPE test_wall_seconds gauge' in lines
+    # Two stages for each metric; peak RSS may be unavailable
+    for metric in ('calls_total', 'wall_seconds', 'cpu_seconds', 'rows_in', 'rows_out', 'bytes_read', 'bytes_written'):
+        assert sum(line.startswith(f'test_{metric}{{') for line in samples) == 2
+
+
+def test_export_json_round_trips(tmp_path):
+    registry = MetricsRegistry()
+    with registry.track('load') as stage:
+        stage.rows_in, stage.bytes_read = 7, 1024
+        with registry.track('parse'):
+            pass
+    exported = json.loads(open(registry.export_json(str(tmp_path / "metrics.json"))).read())
+    assert exported['stages'] == registry.to_list()
+    assert [s['stage'] for s in exported['stages']] == ['load', 'load.parse']
+    assert exported['stages'][0]['rows_in'] == 7 and exported['stages'][0]['bytes_read'] == 1024
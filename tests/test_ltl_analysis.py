@@ -0,0 +1,91 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ltl_analysis import analyze_ltl_violations, check_consecutive_adds, iter_consecutive_adds, iter_violations, summarize_violations
+
+EVENTS = ['Product_View', 'Add_to_Cart', 'Checkout_View']
+
+
+def _sequences(sessions=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return {f"{n}PL_1": rng.choice(EVENTS, size=rng.integers(1, 15), p=[0.4, 0.5, 0.1]).tolist() for n in range(sessions)}
+
+
+def _all_violations(sequences):
+    # The full per-session list the analysis used to build
+    return {session: check_consecutive_adds(seq) for session, seq in sequences.items() if any(check_consecutive_adds(seq))}
+
+
+def test_stream_matches_the_full_violation_list():
+    sequences = _sequences()
+    expected = _all_violations(sequences)
+    streamed = list(iter_violations(sequences.keys(), sequences.values()))
+    assert [session for session, _, _ in streamed] == list(expected)
+    assert all(witnesses == expected[session] and count == len(expected[session]) for session, witnesses, count in streamed)
+
+    summary = summarize_violations(iter(streamed), top_k=len(streamed), sample_size=len(streamed))
+    assert summary['sessions'] == len(expected)
+    assert summary['witnesses'] == sum(map(len, expected.values()))
+    assert {session: witnesses for session, _, witnesses in summary['top']} == expected
+    assert sorted(summary['sample']) == sorted((s, len(w), w) for s, w in expected.items())
+
+
+def test_first_n_caps_witnesses_but_not_counts():
+    sequences = {'a': ['Add_to_Cart'] * 6, 'b': ['Add_to_Cart'] * 2, 'c': ['Product_View']}
+    assert list(iter_violations(sequences.keys(), sequences.values(), first_n=2)) == [
+        ('a', [(0, 'Add_to_Cart', 'Add_to_Cart'), (1, 'Add_to_Cart', 'Add_to_Cart')], 5),
+        ('b', [(0, 'Add_to_Cart', 'Add_to_Cart')], 1),
+    ]
+    assert list(iter_violations(['a'], [sequences['a']], first_n=0)) == [('a', [], 5)]
+
+
+def test_each_session_is_checked_once():
+    sequences = _sequences()
+    calls = Counter()
+
+    def check(sequence):
+        calls[id(sequence)] += 1
+        return iter_consecutive_adds(sequence)
+
+    summarize_violations(iter_violations(sequences.keys(), sequences.values(), check=check))
+    assert len(calls) == len(sequences) and set(calls.values()) == {1}
+
+
+def test_top_k_orders_by_count_and_breaks_ties_by_position():
+    counts = {'a': 2, 'b': 5, 'c': 2, 'd': 5, 'e': 1, 'f': 2}
+    violations = [(session, [], count) for session, count in counts.items()]
+    top = summarize_violations(violations, top_k=4)['top']
+    # Equal counts keep the order the sessions were seen in
+    assert [(session, count) for session, count, _ in top] == [('b', 5), ('d', 5), ('a', 2), ('c', 2)]
+    assert summarize_violations(violations, top_k=0)['top'] == []
+    assert len(summarize_violations(violations, top_k=10)['top']) == len(counts)
+
+
+def test_reservoir_sample_size_and_determinism():
+    violations = [(f"s{n}", [], 1) for n in range(100)]
+    sample = summarize_violations(violations, sample_size=5, seed=3)['sample']
+    sessions = [session for session, _, _ in sample]
+    assert len(set(sessions)) == 5 and set(sessions) <= {session for session, _, _ in violations}
+    assert summarize_violations(violations, sample_size=5, seed=3)['sample'] == sample
+    assert len({tuple(s for s, _, _ in summarize_violations(violations, sample_size=5, seed=seed)['sample']) for seed in range(10)}) > 1
+    assert len(summarize_violations(violations[:3], sample_size=5)['sample']) == 3
+
+    # Every session is about equally likely to be sampled
+    picked = Counter(session for seed in range(2000) for session, _, _ in summarize_violations(violations, sample_size=5, seed=seed)['sample'])
+    assert len(picked) == 100 and max(picked.values()) < 2 * min(picked.values())
+
+
+@pytest.mark.parametrize('parallel', [False, True])
+def test_report_counts_match_the_full_violation_list(tmp_path, parallel):
+    sequences = _sequences(sessions=60)
+    expected = _all_violations(sequences)
+    log_path = tmp_path / "event_logs.csv"
+    pd.DataFrame([(s, e) for s, events in sequences.items() for e in events], columns=['Session_ID', 'Event']).to_csv(log_path, index=False)
+    report = analyze_ltl_violations(str(log_path), str(tmp_path / "reports"), session_to_inspect='0PL_1',
+                                    parallel=parallel, workers=2)['textual_data']['LTL Analysis']
+    assert f"- **Violations Found**: {len(expected)}" in report
+    assert f"- Total Violations: {sum(map(len, expected.values()))}" in report
+    assert f"- **Violations**: {check_consecutive_adds(sequences['0PL_1'])}" in report
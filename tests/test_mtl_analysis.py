@@ -0,0 +1,25 @@
+import pandas as pd
+import pytest
+
+from mtl_analysis import bounded_absence, bounded_response
+from session_traces import encode_traces
+
+
+def _traces(events, seconds):
+    return encode_traces(pd.DataFrame({
+        'Session_ID': ['s1'] * len(events),
+        'Event': events,
+        'TimeStamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(seconds, unit='s'),
+    }))
+
+
+@pytest.mark.parametrize('window, repeats', [('[0,2s]', 1), ('(0,2s]', 0)])
+def test_open_lower_bound_ignores_same_timestamp_repeats(window, repeats):
+    traces = _traces(['Add_to_Cart', 'Add_to_Cart'], [0, 0])
+    assert bounded_absence(traces, 'Add_to_Cart', 'Add_to_Cart', window)['followed'].tolist() == [repeats]
+
+
+@pytest.mark.parametrize('window, unanswered', [('[0,5m]', 0), ('[0,5m)', 1)])
+def test_open_upper_bound_excludes_the_bound(window, unanswered):
+    traces = _traces(['Product_View', 'Add_to_Cart'], [0, 300])
+    assert bounded_response(traces, 'Product_View', 'Add_to_Cart', window)['unanswered'].tolist() == [unanswered]
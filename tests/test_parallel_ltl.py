@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from parallel_ltl import check_sessions
+from session_traces import encode_traces
+
+EVENTS = ['Product_View', 'Add_to_Cart', 'Checkout_View', 'Info_Page_View']
+
+
+@pytest.fixture(scope='module')
+def traces():
+    rng = np.random.default_rng(0)
+    rows = 5000
+    return encode_traces(pd.DataFrame({
+        'Session_ID': [f"{n}PL_1" for n in rng.integers(0, 600, size=rows)],
+        'Event': rng.choice(EVENTS, size=rows, p=[0.5, 0.3, 0.05, 0.15]),
+    }), with_timestamps=False)
+
+
+def _repeated_event(events, event):
+    return any(a == event and b == event for a, b in zip(events, events[1:]))
+
+
+def _response(events, trigger, target):
+    return any(e == trigger and target not in events[i + 1:] for i, e in enumerate(events))
+
+
+CASES = [
+    ('repeated_event', ('Add_to_Cart',), _repeated_event),
+    ('repeated_event', ('Unknown',), _repeated_event),
+    ('response', ('Add_to_Cart', 'Checkout_View'), _response),
+    ('response', ('Product_View', 'Add_to_Cart'), _response),
+    ('contains', ('Checkout_View',), lambda events, event: event in events),
+]
+
+
+@pytest.mark.parametrize('check, events, reference', CASES)
+def test_parallel_check_matches_serial(traces, check, events, reference):
+    serial = check_sessions(traces, check, *events)
+    parallel = check_sessions(traces, check, *events, parallel=True, workers=2)
+    assert parallel.dtype == bool and parallel.tolist() == serial.tolist()
+    expected = [reference(traces.sequence(p), *events) for p in range(len(traces))]
+    assert serial.tolist() == expected
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from path_trie import PathTrie
+from session_traces import encode_traces
+
+EVENTS = ['Info_Page_View', 'Product_View', 'Add_to_Cart', 'Checkout_View']
+
+
+def _event_log(sessions=150, rows=900, seed=0, prefix='s'):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Session_ID': [f"{prefix}{n}" for n in rng.integers(0, sessions, size=rows)],
+        'Event': rng.choice(EVENTS, size=rows, p=[0.3, 0.4, 0.2, 0.1]),
+    })
+
+
+def _trie(df, **kwargs):
+    return PathTrie.from_traces(encode_traces(df, with_timestamps=False), **kwargs)
+
+
+def _sequences(df):
+    return df.dropna(subset=['Event']).groupby('Session_ID')['Event'].apply(list)
+
+
+def _all_prefixes(sequences, max_depth=None):
+    prefixes = {}
+    for sequence in sequences:
+        sequence = sequence[:max_depth]
+        for depth in range(1, len(sequence) + 1):
+            prefixes[tuple(sequence[:depth])] = prefixes.get(tuple(sequence[:depth]), 0) + 1
+    return prefixes
+
+
+@pytest.mark.parametrize('max_depth', [None, 3])
+def test_prefix_counts_match_the_sessions(max_depth):
+    df = _event_log()
+    trie = _trie(df, max_depth=max_depth)
+    sequences = _sequences(df)
+    prefixes = _all_prefixes(sequences, max_depth)
+    assert len(trie) == len(prefixes) + 1
+    assert trie.prefix_count([]) == len(sequences)
+    for path, count in prefixes.items():
+        assert trie.prefix_count(list(path)) == count
+        assert trie.path_of(trie.find(list(path))) == list(path)
+    assert trie.prefix_count(['Checkout_View'] * 50) == 0 and trie.find(['Unknown']) == -1
+
+
+def test_drop_off_counts_sessions_ending_at_each_depth():
+    df = _event_log()
+    trie = _trie(df)
+    lengths = _sequences(df).map(len)
+    drop_off = trie.drop_off()
+    depths = np.arange(len(drop_off))
+    assert drop_off['Sessions'].tolist() == [int((lengths >= d).sum()) for d in depths]
+    assert drop_off['Ended'].tolist() == [int((lengths == d).sum()) for d in depths]
+
+    path = ['Product_View', 'Product_View']
+    along = trie.drop_off(path)
+    starts = _sequences(df).map(lambda events: [events[:d] == path[:d] for d in range(3)])
+    assert along['Sessions'].tolist() == [int(starts.map(lambda s: s[d]).sum()) for d in range(3)]
+
+
+def test_missing_events_are_skipped():
+    df = pd.DataFrame({'Session_ID': ['a', 'a', 'b', 'c'], 'Event': ['A', np.nan, 'B', np.nan]})
+    trie = _trie(df)
+    # a = [A], b = [B]; c has no coded event
+    assert len(trie) == 3 and trie.count[0] == 2
+    assert trie.top_paths().sort_values('Path')['Path'].tolist() == [('A',), ('B',)]
+    assert trie.event.min() == -1 and (trie.event[1:] >= 0).all()
+
+
+def _same_trie(left, right):
+    paths = [tuple(right.path_of(node)) for node in range(1, len(right))]
+    assert len(left) == len(right)
+    assert all(left.prefix_count(list(path)) == right.prefix_count(list(path)) for path in paths)
+    pd.testing.assert_frame_equal(left.drop_off(), right.drop_off())
+    assert set(left.top_paths(len(left)).itertuples(index=False)) == set(right.top_paths(len(right)).itertuples(index=False))
+
+
+def test_merge_equals_building_from_both_logs():
+    first = _event_log(seed=1, prefix='d1-')
+    # The second day sees the events in a different order, so their codes differ
+    second = _event_log(seed=2, prefix='d2-').iloc[::-1]
+    merged = _trie(first).merge(_trie(second))
+    _same_trie(merged, _trie(pd.concat([first, second])))
+
+
+def test_save_load_round_trip(tmp_path):
+    trie = _trie(_event_log())
+    loaded = PathTrie.load(trie.save(str(tmp_path / "paths" / "session_paths.npz")))
+    assert loaded.event_names == trie.event_names
+    for name in ('event', 'count', 'parent', 'child_start', 'level_offsets'):
+        assert getattr(loaded, name).tolist() == getattr(trie, name).tolist()
+    _same_trie(loaded, trie)
@@ -0,0 +1,53 @@
+import shutil
+
+import pandas as pd
+
+import event_mapping
+import rollup_cube
+
+
+def _event_log(path):
+    pd.DataFrame({
+        'Session_ID': ['1.1.1.1_1', '1.1.1.1_1', '2.2.2.2_1'],
+        'IP': ['1.1.1.1', '1.1.1.1', '2.2.2.2'],
+        'TimeStamp': ['2024-01-01 10:00:00+00:00', '2024-01-01 10:00:30+00:00', '2024-01-01 10:05:00+00:00'],
+        'Event': ['Product_View', 'Add_to_Cart', 'Info_Page_View'],
+        'Page_URL': ['/p-1', '/koszyk', '/inne/informacja_online.php'],
+        'Method': ['GET'] * 3,
+        'Response': [200] * 3,
+        'Bytes_Sent': [100, 200, 300],
+        'Referrer_URL': ['https://www.google.com/', '-', '-'],
+        'User_Agent': ['Mozilla/5.0'] * 3,
+    }).to_csv(path, index=False)
+
+
+def test_mapping_the_same_logs_twice_does_not_change_the_cube(tmp_path):
+    event_log = tmp_path / "event_logs.csv"
+    _event_log(event_log)
+    cube_path = tmp_path / rollup_cube.CUBE_FILE
+
+    def map_into_cube(path):
+        cube = rollup_cube.RollupCube(str(cube_path))
+        event_mapping.map_event_to_proposition(str(path), str(tmp_path / "out"), str(tmp_path / "reports"),
+                                               cube=cube, cube_source=rollup_cube.content_key(str(path)))
+        cube.save()
+        return int(rollup_cube.RollupCube(str(cube_path)).query()['Count'].iloc[0])
+
+    assert map_into_cube(event_log) == 3
+    # The same logs written again, e.g. by re-running the earlier stages
+    rewritten = tmp_path / "event_logs_refined.csv"
+    shutil.copyfile(event_log, rewritten)
+    assert map_into_cube(rewritten) == 3
+
+
+def test_traffic_summary_of_an_empty_cube(tmp_path):
+    event_log = tmp_path / "event_logs.csv"
+    _event_log(event_log)
+    cube = rollup_cube.RollupCube(str(tmp_path / rollup_cube.CUBE_FILE))
+    empty = rollup_cube.traffic_summary(cube, str(tmp_path / "empty"))
+    assert empty['visualizations'] == {} and 'No data' in empty['textual_data']['Traffic Summary']
+
+    event_mapping.map_event_to_proposition(str(event_log), str(tmp_path / "out"), str(tmp_path / "reports"), cube=cube)
+    assert 'Requests: 3' in rollup_cube.traffic_summary(cube, str(tmp_path / "all"))['textual_data']['Traffic Summary']
+    outside = rollup_cube.traffic_summary(cube, str(tmp_path / "outside"), time_range=('2025-01-01', '2025-01-02'))
+    assert outside['visualizations'] == {} and 'No data' in outside['textual_data']['Traffic Summary']
@@ -0,0 +1,83 @@
+from itertools import groupby, product
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sequence_mining import collapse_repeats, mine_sequences
+from session_traces import encode_traces
+
+EVENTS = ['Info_Page_View', 'Product_View', 'Add_to_Cart', 'Checkout_View']
+
+
+@pytest.fixture(scope='module')
+def traces():
+    rng = np.random.default_rng(0)
+    rows = 1500
+    return encode_traces(pd.DataFrame({
+        'Session_ID': [f"{n}PL_1" for n in rng.integers(0, 200, size=rows)],
+        'Event': rng.choice(EVENTS, size=rows, p=[0.3, 0.4, 0.2, 0.1]),
+    }), with_timestamps=False)
+
+
+def _contains(sequence, pattern):
+    events = iter(sequence)
+    return all(step in events for step in pattern)
+
+
+def _brute_force(traces, min_count, max_length):
+    sequences = [traces.sequence(p) for p in range(len(traces))]
+    support = {}
+    for length in range(1, max_length + 1):
+        for pattern in product(EVENTS, repeat=length):
+            count = sum(_contains(sequence, pattern) for sequence in sequences)
+            if count >= min_count:
+                support[pattern] = count
+    return support
+
+
+@pytest.mark.parametrize('min_support', [0.05, 0.3, 40])
+def test_patterns_and_support_match_brute_force(traces, min_support):
+    min_count = min_support if min_support >= 1 else int(np.ceil(min_support * len(traces)))
+    patterns = mine_sequences(traces, min_support=min_support, max_length=3)
+    expected = _brute_force(traces, min_count, 3)
+    # Every frequent pattern is found and nothing below the minimum support is kept
+    assert dict(zip(patterns['Pattern'], patterns['Support'])) == expected
+    assert (patterns['Support'] >= min_count).all()
+    assert patterns['Length'].max() <= 3
+
+
+def test_confidence_is_relative_to_the_prefix(traces):
+    patterns = mine_sequences(traces, min_support=0.05, max_length=3)
+    support = dict(zip(patterns['Pattern'], patterns['Support']))
+    for row in patterns.itertuples(index=False):
+        base = support[row.Pattern[:-1]] if row.Length > 1 else len(traces)
+        assert row.Confidence == pytest.approx(row.Support / base, abs=1e-4)
+        assert row.Support_Pct == pytest.approx(row.Support / len(traces) * 100, abs=0.01)
+    assert patterns['Support'].is_monotonic_decreasing
+
+
+def test_parallel_mining_gives_identical_results(traces):
+    serial = mine_sequences(traces, min_support=0.05, max_length=4)
+    parallel = mine_sequences(traces, min_support=0.05, max_length=4, parallel=True, workers=2)
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_nothing_is_frequent_above_every_session():
+    assert mine_sequences(encode_traces(pd.DataFrame({'Session_ID': ['a', 'b'], 'Event': ['A', 'B']}), with_timestamps=False),
+                          min_support=3).empty
+
+
+def test_collapse_repeats_merges_runs_within_sessions():
+    df = pd.DataFrame({
+        'Session_ID': ['a', 'a', 'a', 'b', 'b', 'a', 'c', 'b'],
+        'Event': ['A', 'A', 'B', 'B', 'B', 'B', 'A', 'A'],
+    })
+    traces = encode_traces(df, with_timestamps=False)
+    collapsed = collapse_repeats(traces)
+    for position in range(len(traces)):
+        assert collapsed.sequence(position) == [event for event, _ in groupby(traces.sequence(position))]
+    # A run at the end of one session and the start of the next stays two steps
+    assert collapsed.sequence(1) == ['B', 'A']
+    assert df['Event'].iloc[collapsed.row_index].tolist() == [e for p in range(len(collapsed)) for e in collapsed.sequence(p)]
+    assert collapsed.timestamps is None
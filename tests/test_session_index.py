@@ -0,0 +1,108 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ltl_analysis
+from session_index import SessionIndex, build_session_index, open_session_index
+
+EVENTS = ['Info_Page_View', 'Product_View', 'Add_to_Cart', 'Checkout_View']
+URLS = ['/p-1', '/p-2', '/koszyk', '/zamowienie']
+
+
+def _event_log(sessions=37, rows=400, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Session_ID': [f"{n}PL_1" for n in rng.integers(0, sessions, size=rows)],
+        'TimeStamp': pd.date_range('2024-01-01', periods=rows, freq='min', tz='UTC').astype(str),
+        'Event': rng.choice(EVENTS, size=rows, p=[0.4, 0.4, 0.15, 0.05]),
+        'Page_URL': rng.choice(URLS, size=rows),
+    })
+
+
+@pytest.fixture
+def indexed(tmp_path):
+    # 37 sessions, so the last bitmap byte is only partly used
+    df = _event_log()
+    return df, SessionIndex(build_session_index(df, str(tmp_path / "index")))
+
+
+def _expected(df, mask):
+    return sorted(df.loc[mask, 'Session_ID'].unique())
+
+
+def test_event_and_url_lookups_match_a_scan(indexed):
+    df, index = indexed
+    assert len(index) == df['Session_ID'].nunique()
+    for event in EVENTS:
+        assert index.sessions_with_event(event) == _expected(df, df['Event'] == event)
+    for url in URLS:
+        assert index.sessions_with_url(url) == _expected(df, df['Page_URL'] == url)
+    assert index.sessions_with_event('Unknown') == [] and index.sessions_with_url('/missing') == []
+
+
+def test_event_postings_are_sorted_ordinals(indexed):
+    _, index = indexed
+    postings = index.event_postings('Add_to_Cart')
+    assert (np.diff(postings) > 0).all()
+    assert postings.max() < len(index)
+
+
+def test_sessions_matching_intersects_all_conditions(indexed):
+    df, index = indexed
+    by_session = df.groupby('Session_ID')
+    events, urls = by_session['Event'].agg(set), by_session['Page_URL'].agg(set)
+    expected = sorted(s for s in events.index if {'Product_View', 'Add_to_Cart'} <= events[s] and '/koszyk' in urls[s])
+    assert index.sessions_matching(events=['Product_View', 'Add_to_Cart'], urls=['/koszyk']) == expected
+    assert index.sessions_matching() == sorted(events.index)
+    assert index.sessions_matching(events=['Add_to_Cart', 'Unknown']) == []
+
+
+def test_session_rows_keep_log_order(indexed):
+    df, index = indexed
+    session_id = df['Session_ID'].iloc[0]
+    rows = index.session_rows(session_id)
+    pd.testing.assert_frame_equal(rows, df[df['Session_ID'] == session_id].reset_index(drop=True), check_dtype=False)
+    assert index.session_rows('missing', columns=['Event']).empty
+
+
+def test_ltl_inspection_through_the_index_honours_time_range(tmp_path):
+    df = pd.DataFrame({
+        'Session_ID': ['a_1'] * 4,
+        'TimeStamp': ['2024-01-01 10:00:00+00:00', '2024-01-01 10:01:00+00:00',
+                      '2024-01-01 12:00:00+00:00', '2024-01-01 12:01:00+00:00'],
+        'Event': ['Add_to_Cart', 'Add_to_Cart', 'Product_View', 'Add_to_Cart'],
+    })
+    log_path = tmp_path / "event_logs.csv"
+    df.to_csv(log_path, index=False)
+    index_dir = build_session_index(df, str(tmp_path / "index"))
+    time_range = ('2024-01-01 11:00', None)
+    reports = [ltl_analysis.analyze_ltl_violations(str(log_path), str(tmp_path / name), session_to_inspect='a_1',
+                                                   time_range=time_range, index_dir=index)['textual_data']
+               for name, index in (('scan', None), ('index', index_dir), ('open', SessionIndex(index_dir)))]
+    assert reports[0] == reports[1] == reports[2]
+    assert "['Product_View', 'Add_to_Cart']" in reports[1]['LTL Analysis']
+
+
+def test_index_files_are_memory_mapped_and_unpadded(indexed, tmp_path):
+    df, index = indexed
+    assert not any(name.endswith('.npz') for name in os.listdir(index.index_dir))
+    assert isinstance(index.offsets, np.memmap) and isinstance(index.postings, np.memmap)
+    assert isinstance(index.event_bitmaps, np.memmap)
+    # Keys are variable-length strings rather than arrays padded to the longest entry
+    long_url = '/' + 'x' * 5000
+    with_long_url = df.assign(Page_URL=df['Page_URL'].where(df.index > 0, long_url))
+    long_index = SessionIndex(build_session_index(with_long_url, str(tmp_path / "long")))
+    assert long_index.urls.type == 'string'
+    assert os.path.getsize(os.path.join(long_index.index_dir, "urls.arrow")) < 10_000
+    assert long_index.sessions_with_url(long_url) == [df['Session_ID'].iloc[0]]
+
+
+def test_open_session_index_is_reused_until_rebuilt(tmp_path):
+    index_dir = build_session_index(_event_log(), str(tmp_path / "index"))
+    index = open_session_index(index_dir)
+    assert open_session_index(index_dir) is index
+    build_session_index(_event_log(sessions=5, seed=1), index_dir)
+    rebuilt = open_session_index(index_dir)
+    assert rebuilt is not index and len(rebuilt) == 5
@@ -0,0 +1,22 @@
+import pandas as pd
+import pytest
+
+from transform_to_events import sessionize_and_classify, session_timeout_sweep
+
+TIMEOUTS = [0.01, 0.5, 1, 5, 30]
+
+
+@pytest.mark.parametrize('from_frame', [False, True])
+def test_sweep_matches_sessionizing_at_each_timeout(processed_logs, tmp_path, from_frame):
+    source = pd.read_csv(processed_logs) if from_frame else processed_logs
+    sweep = session_timeout_sweep(source, TIMEOUTS).set_index('timeout_minutes')
+    for timeout in TIMEOUTS:
+        event_log = sessionize_and_classify(processed_logs, str(tmp_path), in_memory=True, session_timeout=timeout)
+        sessions = event_log.groupby('Session_ID')
+        row = sweep.loc[timeout]
+        assert row['sessions'] == event_log['Session_ID'].nunique()
+        assert row['converting_sessions'] == sessions['Event'].agg(lambda events: (events == 'Add_to_Cart').any()).sum()
+        assert row['mean_events'] == pytest.approx(len(event_log) / row['sessions'])
+        timestamps = pd.to_datetime(event_log['TimeStamp'], utc=True).groupby(event_log['Session_ID'])
+        durations = (timestamps.max() - timestamps.min()).dt.total_seconds() / 60
+        assert row['mean_duration_minutes'] == pytest.approx(durations.mean())
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sketches import CountMinSketch, HyperLogLog, KLLSketch, LogSketches, SpaceSaving, load_sketches, merge_sketch_files, save_sketches
+
+
+def _zipf(n, items=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.Series([f"item{v}" for v in np.minimum(rng.zipf(1.3, size=n), items)])
+
+
+@pytest.mark.parametrize('distinct', [10, 1000, 50_000])
+def test_hll_count_within_error_bound(distinct):
+    values = np.arange(distinct).repeat(3)
+    hll = HyperLogLog(precision=12).update(values)
+    # Relative error 1.04 / sqrt(4096) ~ 1.6%; allow four standard errors
+    assert abs(hll.count() - distinct) <= max(1, 4 * 1.04 / 64 * distinct)
+
+
+def test_hll_merge_counts_the_union():
+    left, right = HyperLogLog(12).update(np.arange(0, 6000)), HyperLogLog(12).update(np.arange(4000, 10_000))
+    assert left.merge(right).registers.tolist() == HyperLogLog(12).update(np.arange(10_000)).registers.tolist()
+    with pytest.raises(ValueError):
+        left.merge(HyperLogLog(10))
+
+
+def test_kll_quantiles_within_rank_error():
+    values = np.random.default_rng(1).exponential(5.0, size=100_000)
+    kll = KLLSketch(k=200).update(values)
+    ordered = np.sort(values)
+    for q in (0.1, 0.25, 0.5, 0.75, 0.9, 0.99):
+        rank = np.searchsorted(ordered, kll.quantile(q)) / len(values)
+        assert abs(rank - q) <= 0.02
+    summary = kll.describe()
+    assert summary['count'] == len(values)
+    assert summary['min'] == values.min() and summary['max'] == values.max()
+    assert summary['mean'] == pytest.approx(values.mean())
+    assert summary['std'] == pytest.approx(values.std(ddof=1))
+
+
+def test_kll_merge_matches_exact_stats():
+    values = np.random.default_rng(2).normal(size=20_000)
+    merged = KLLSketch().update(values[:7000]).merge(KLLSketch().update(values[7000:]))
+    assert merged.n == len(values)
+    assert abs(np.searchsorted(np.sort(values), merged.quantile(0.5)) / len(values) - 0.5) <= 0.02
+
+
+def test_count_min_never_undercounts():
+    values = _zipf(50_000)
+    cms = CountMinSketch(width=512, depth=5).update(values)
+    exact = values.value_counts()
+    estimates = cms.estimate(exact.index)
+    assert (estimates >= exact.to_numpy()).all()
+    assert (estimates - exact.to_numpy()).max() <= np.e / 512 * len(values)
+    assert cms.total == len(values)
+
+
+def test_count_min_merge_equals_single_pass():
+    values = _zipf(10_000)
+    merged = CountMinSketch().update(values[:3000]).merge(CountMinSketch().update(values[3000:]))
+    assert (merged.table == CountMinSketch().update(values).table).all()
+
+
+def test_space_saving_bounds_true_counts():
+    values = _zipf(50_000)
+    capacity = 50
+    summary = SpaceSaving(capacity)
+    for chunk in np.array_split(values, 10):
+        summary.update(chunk)
+    exact = values.value_counts()
+    top = summary.top(capacity)
+    true = exact.reindex(top['item']).fillna(0).to_numpy()
+    assert (top['count'].to_numpy() >= true).all()
+    assert (top['guaranteed'].to_numpy() <= true).all()
+    # Every item above total / capacity is reported
+    assert set(exact[exact > len(values) / capacity].index) <= set(top['item'])
+
+
+def test_space_saving_merge_keeps_heavy_hitters():
+    values = _zipf(20_000)
+    merged = SpaceSaving(20).update(values[:8000]).merge(SpaceSaving(20).update(values[8000:]))
+    exact = values.value_counts()
+    assert merged.total == len(values)
+    assert set(exact[exact > len(values) / 20].index) <= set(merged.top(20)['item'])
+
+
+def _log_chunk(seed, rows=2000):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'IP': rng.integers(0, 300, size=rows).astype(str),
+        'Page_URL': rng.choice(['/p-1', '/p-2', '/koszyk'], size=rows),
+        'Session_ID': [f"s{v}" for v in rng.integers(0, 800, size=rows)],
+        'time_diff': rng.exponential(3.0, size=rows),
+        'referrer_domain': rng.choice(['google.com', 'shop.example', 'bing.com'], size=rows),
+    })
+
+
+def test_log_sketches_save_load_merge_round_trip(tmp_path):
+    chunks = [_log_chunk(seed) for seed in range(3)]
+    paths = []
+    for i, chunk in enumerate(chunks):
+        paths.append(save_sketches(LogSketches(precision=12).update_requests(chunk).update_sessions(chunk),
+                                   str(tmp_path / f"part{i}.pkl")))
+    merged = merge_sketch_files(paths)
+    whole = pd.concat(chunks)
+    single = LogSketches(precision=12).update_requests(whole).update_sessions(whole)
+
+    assert merged.rows == len(whole)
+    assert merged.ips.registers.tolist() == single.ips.registers.tolist()
+    assert merged.sessions.registers.tolist() == single.sessions.registers.tolist()
+    assert (merged.pages.table == single.pages.table).all()
+    assert merged.time_diff.n == len(whole)
+    assert merged.referrer_domains.counts.to_dict() == whole['referrer_domain'].value_counts().to_dict()
+
+    reloaded = load_sketches(save_sketches(merged, str(tmp_path / "merged.pkl")))
+    assert reloaded.summary() == merged.summary()
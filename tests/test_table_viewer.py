@@ -0,0 +1,93 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from table_viewer import ArrowSource, DataFrameSource, csv_to_arrow, open_table_source, select_rows
+
+
+def test_csv_is_converted_into_the_cache_dir(tmp_path):
+    data_dir, cache_dir = tmp_path / "data", tmp_path / "cache"
+    data_dir.mkdir()
+    df = pd.DataFrame({'Session_ID': ['a_1', 'b_1'], 'Event': ['Product_View', 'Add_to_Cart'], 'Response': [200, 404]})
+    df.to_csv(data_dir / "event_logs.csv", index=False)
+
+    arrow_path = csv_to_arrow(str(data_dir / "event_logs.csv"), cache_dir=str(cache_dir))
+    assert os.path.dirname(arrow_path) == str(cache_dir)
+    assert os.listdir(data_dir) == ["event_logs.csv"]
+    # Reused while the CSV is unchanged
+    mtime = os.path.getmtime(arrow_path)
+    assert csv_to_arrow(str(data_dir / "event_logs.csv"), cache_dir=str(cache_dir)) == arrow_path
+    assert os.path.getmtime(arrow_path) == mtime
+
+    source = open_table_source(arrow_path)
+    assert source.take([0, 1]) == list(df.itertuples(index=False, name=None))
+
+
+def _log():
+    return pd.DataFrame({
+        'Session_ID': ['10.0.0.1_1', '10.0.0.1_1', '10.0.0.12_1', '10.0.0.1_2', '10.0.0.2_1', None],
+        'Event': ['Product_View', 'Add_to_Cart', 'Product_View', None, 'Checkout_View', 'Product_View'],
+        'TimeStamp': ['2024-01-01 10:00:00+00:00', '2024-01-01 11:00:00+00:00', '2024-01-01 12:00:00+00:00',
+                      None, '2024-01-01 09:00:00+00:00', '2024-01-01 13:00:00+00:00'],
+        'Logged_At': ['2024-02-01 00:00:00+00:00'] * 3 + ['2024-01-01 00:00:00+00:00'] * 3,
+    })
+
+
+def _sources(df):
+    typed = pa.Table.from_pandas(df.assign(TimeStamp=pd.to_datetime(df['TimeStamp'], utc=True)), preserve_index=False)
+    return [DataFrameSource(df), ArrowSource(pa.Table.from_pandas(df, preserve_index=False)), ArrowSource(typed)]
+
+
+@pytest.mark.parametrize('source', _sources(_log()), ids=['dataframe', 'arrow', 'arrow-timestamp'])
+def test_select_rows_filters(source):
+    assert select_rows(source).tolist() == [0, 1, 2, 3, 4, 5]
+    assert select_rows(source, session_id='10.0.0.1_1').tolist() == [0, 1]
+    # The IP filter does not match IPs that merely start with the same digits
+    assert select_rows(source, ip='10.0.0.1').tolist() == [0, 1, 3]
+    assert select_rows(source, event='Product_View').tolist() == [0, 2, 5]
+    assert select_rows(source, ip='10.0.0.1', event='Product_View').tolist() == [0]
+    # Half-open range; rows without a timestamp never match
+    assert select_rows(source, time_range=('2024-01-01 10:00', '2024-01-01 12:00')).tolist() == [0, 1]
+    assert select_rows(source, time_range=(None, '2024-01-01 12:00')).tolist() == [0, 1, 4]
+    assert select_rows(source, time_range=('2024-01-01 12:00', None)).tolist() == [2, 5]
+    assert select_rows(source, event='None').tolist() == [] and select_rows(source, session_id='nan').tolist() == []
+
+
+@pytest.mark.parametrize('source', _sources(_log()), ids=['dataframe', 'arrow', 'arrow-timestamp'])
+def test_select_rows_sorts_with_nulls_last(source):
+    assert select_rows(source, sort_by='TimeStamp').tolist() == [4, 0, 1, 2, 5, 3]
+    assert select_rows(source, sort_by='TimeStamp', ascending=False).tolist() == [5, 2, 1, 0, 4, 3]
+    assert select_rows(source, sort_by='Event', ip='10.0.0.1').tolist() == [1, 0, 3]
+
+
+@pytest.mark.parametrize('source', _sources(_log()), ids=['dataframe', 'arrow', 'arrow-timestamp'])
+def test_timestamps_are_cached_per_column(source):
+    january = ('2024-01-01', '2024-01-02')
+    assert select_rows(source, time_range=january).tolist() == [0, 1, 2, 4, 5]
+    assert select_rows(source, time_range=january, time_column='Logged_At').tolist() == [3, 4, 5]
+    assert not np.array_equal(source.timestamps('TimeStamp'), source.timestamps('Logged_At'))
+
+
+def test_dataframe_and_arrow_sources_agree(tmp_path):
+    rng = np.random.default_rng(0)
+    rows = 500
+    df = pd.DataFrame({
+        'Session_ID': [f"10.0.{n % 7}.{n % 3}_{n % 4}" for n in rng.integers(0, 1000, size=rows)],
+        'TimeStamp': (pd.Timestamp('2024-01-01', tz='UTC') + pd.to_timedelta(rng.integers(0, 86400, size=rows), unit='s')).astype(str),
+        'Event': rng.choice(['Product_View', 'Add_to_Cart', 'Checkout_View'], size=rows),
+    })
+    df.to_csv(tmp_path / "event_logs.csv", index=False)
+    frame = DataFrameSource(df)
+    arrow = open_table_source(csv_to_arrow(str(tmp_path / "event_logs.csv"), cache_dir=str(tmp_path / "cache")))
+    queries = [
+        {}, {'ip': '10.0.1.2'}, {'session_id': '10.0.3.0_1'}, {'event': 'Add_to_Cart', 'sort_by': 'Session_ID'},
+        {'time_range': ('2024-01-01 06:00', '2024-01-01 18:00'), 'sort_by': 'TimeStamp', 'ascending': False},
+    ]
+    for query in queries:
+        expected = select_rows(frame, **query)
+        assert select_rows(arrow, **query).tolist() == expected.tolist()
+        assert [row[0] for row in arrow.take(expected[:20])] == [row[0] for row in frame.take(expected[:20])]
+    assert arrow.unique('Event') == frame.unique('Event')
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import user_agents
+from user_agents import UserAgentTable, join_user_agents, parse_user_agent, session_metrics_by
+
+CHROME = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+IPHONE = 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1'
+IPAD = 'Mozilla/5.0 (iPad; CPU OS 16_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Safari/604.1'
+FIREFOX = 'Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0'
+GOOGLEBOT = 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)'
+DIMENSIONS_CHECKED = ('device', 'browser', 'os')
+
+
+@pytest.mark.parametrize('user_agent', [
+    'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)',
+    'AdsBot-Google (+http://www.google.com/adsbot.html)',
+    'curl/7.68.0',
+])
+def test_bots_are_flagged(user_agent):
+    assert parse_user_agent(user_agent)[3]
+
+
+@pytest.mark.parametrize('user_agent', [
+    'Mozilla/5.0 (Linux; Android 9; CUBOT P30) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (Linux; Android 8.0; Abbott Reader) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0 Safari/537.36',
+])
+def test_device_names_containing_bot_are_not_bots(user_agent):
+    assert not parse_user_agent(user_agent)[3]
+
+
+def test_table_round_trips_through_parquet(tmp_path):
+    path = str(tmp_path / "user_agents.parquet")
+    table = UserAgentTable(path)
+    codes = table.encode([CHROME, IPHONE, CHROME, None, GOOGLEBOT])
+    assert codes.tolist() == [0, 1, 0, 2, 3] and table.parsed == 4
+    table.save()
+
+    loaded = UserAgentTable(path)
+    assert loaded.parsed == 0
+    pd.testing.assert_frame_equal(loaded.table, table.table, check_dtype=False)
+    # Known strings keep their codes, new ones are appended
+    assert loaded.encode([GOOGLEBOT, FIREFOX, '']).tolist() == [3, 4, 2] and loaded.parsed == 1
+
+
+def test_table_is_reparsed_in_place_when_the_parser_changes(tmp_path, monkeypatch):
+    path = str(tmp_path / "user_agents.parquet")
+    table = UserAgentTable(path)
+    table.encode([CHROME, IPHONE, FIREFOX])
+    table.save()
+
+    monkeypatch.setattr(user_agents, 'PARSER_VERSION', user_agents.PARSER_VERSION + 1)
+    monkeypatch.setattr(user_agents, 'parse_user_agent', lambda ua: ('New', 'New', 'other', False))
+    reparsed = UserAgentTable(path)
+    assert reparsed.parsed == 3
+    assert reparsed.table['User_Agent'].tolist() == [CHROME, IPHONE, FIREFOX]
+    assert set(reparsed.table['browser']) == {'New'}
+    # Saved under the new version, so the next load does not parse again
+    reparsed.save()
+    assert UserAgentTable(path).parsed == 0
+
+
+def test_join_adds_codes_and_dimensions_for_unseen_agents():
+    table = UserAgentTable()
+    table.encode([CHROME])
+    df = pd.DataFrame({'Session_ID': ['a', 'b', 'c', 'd'], 'User_Agent': [IPAD, CHROME, np.nan, GOOGLEBOT], 'Event': ['x'] * 4})
+    joined = join_user_agents(df, table)
+    assert joined.columns.tolist() == ['Session_ID', 'User_Agent', 'UA_Code', 'Event', 'browser', 'os', 'device', 'is_bot']
+    assert joined['UA_Code'].tolist() == [1, 0, 2, 3] and len(table) == 4 and table.parsed == 4
+    for ua, row in zip(['' if pd.isna(ua) else ua for ua in df['User_Agent']], joined.itertuples(index=False)):
+        assert (row.browser, row.os, row.device, row.is_bot) == parse_user_agent(ua)
+    assert joined['is_bot'].dtype == bool and joined['device'].dtype == 'category'
+
+    dropped = join_user_agents(df, table, columns=['device'], keep_user_agent=False)
+    assert dropped.columns.tolist() == ['Session_ID', 'UA_Code', 'Event', 'device'] and len(table) == 4
+
+
+def _event_log(sessions=120, rows=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    session = rng.integers(0, sessions, size=rows)
+    agents = np.array([CHROME, IPHONE, IPAD, FIREFOX, GOOGLEBOT], dtype=object)
+    start = pd.Timestamp('2024-01-01', tz='UTC') + pd.to_timedelta(session * 3600, unit='s')
+    return pd.DataFrame({
+        'Session_ID': [f"s{n}" for n in session],
+        'TimeStamp': (start + pd.to_timedelta(rng.integers(0, 1800, size=rows), unit='s')).astype(str),
+        'Event': rng.choice(['Product_View', 'Add_to_Cart', 'Info_Page_View'], size=rows, p=[0.6, 0.1, 0.3]),
+        # Mostly one agent per session, with the odd switch mid-session
+        'User_Agent': np.where(rng.random(rows) < 0.9, agents[session % len(agents)], agents[rng.integers(0, len(agents), size=rows)]),
+    })
+
+
+@pytest.mark.parametrize('encoded', [False, True])
+def test_session_metrics_match_a_groupby(encoded):
+    df = _event_log()
+    table = UserAgentTable()
+    log = join_user_agents(df, table, columns=[], keep_user_agent=False) if encoded else df
+    breakdowns = session_metrics_by(log, table, DIMENSIONS_CHECKED)
+
+    times = pd.to_datetime(df['TimeStamp'], utc=True)
+    sessions = df.assign(TimeStamp=times).groupby('Session_ID').agg(
+        first_agent=('User_Agent', 'first'), Events=('Event', 'size'),
+        Duration=('TimeStamp', lambda t: (t.max() - t.min()).total_seconds() / 60),
+        Converted=('Event', lambda e: (e == 'Add_to_Cart').any()))
+    parsed = pd.DataFrame([parse_user_agent(ua) for ua in sessions['first_agent']], columns=user_agents.DIMENSIONS, index=sessions.index)
+    sessions = sessions.join(parsed)
+    for dimension in DIMENSIONS_CHECKED:
+        expected = sessions.groupby(dimension).agg(Sessions=('Events', 'size'), Events=('Events', 'sum'),
+                                                   Avg_Duration_Minutes=('Duration', 'mean'), Converting_Sessions=('Converted', 'sum'))
+        result = breakdowns[dimension].set_index(dimension).sort_index()
+        assert result['Sessions'].tolist() == expected['Sessions'].tolist()
+        assert result['Events'].tolist() == expected['Events'].tolist()
+        assert result['Converting_Sessions'].tolist() == expected['Converting_Sessions'].tolist()
+        np.testing.assert_allclose(result['Avg_Duration_Minutes'], expected['Avg_Duration_Minutes'].round(2), atol=0.01)
+        np.testing.assert_allclose(result['Conversion_Rate'], (expected['Converting_Sessions'] / expected['Sessions'] * 100).round(2))
+        assert result.index.tolist() == expected.index.tolist()
+        assert breakdowns[dimension]['Sessions'].is_monotonic_decreasing
+
+
+def test_pipeline_logs_are_analyzed_from_memory(tmp_path):
+    df = _event_log()
+    table = UserAgentTable(str(tmp_path / "user_agents.parquet"))
+    encoded = join_user_agents(df, table, columns=[], keep_user_agent=False)
+    df.to_csv(tmp_path / "event_logs.csv", index=False)
+    user_agents.analyze_user_agents(str(tmp_path / "event_logs.csv"), str(tmp_path / "file_reports"))
+    user_agents.analyze_user_agents(encoded, str(tmp_path / "memory_reports"), table_path=table)
+    for dimension in DIMENSIONS_CHECKED:
+        pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "file_reports" / f"sessions_by_{dimension}.csv"),
+                                      pd.read_csv(tmp_path / "memory_reports" / f"sessions_by_{dimension}.csv"))
+    with pytest.raises(ValueError):
+        user_agents.analyze_user_agents(encoded, str(tmp_path / "memory_reports"))